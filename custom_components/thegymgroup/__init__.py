@@ -5,40 +5,193 @@ import logging
 import asyncio
 from collections.abc import Awaitable
 
+import voluptuous as vol
+
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, ServiceCall, callback
 from homeassistant.const import Platform
+from homeassistant.exceptions import HomeAssistantError, ServiceValidationError
+from homeassistant.helpers import config_validation as cv, entity_registry as er
+from homeassistant.helpers.update_coordinator import UpdateFailed
+from homeassistant.util import dt as dt_util
 
-from .const import DATA_COORDINATOR, DOMAIN
+from .auth import GymGroupAuth
+from .backfill import GymGroupBackfill
+from .const import (
+    DATA_COORDINATOR,
+    DOMAIN,
+    CONF_MIN_UPDATE_INTERVAL,
+    CONF_MAX_UPDATE_INTERVAL,
+    CONF_GYMS,
+    MIN_UPDATE_INTERVAL,
+    MAX_UPDATE_INTERVAL,
+    SERVICE_SYNC_HISTORY,
+)
 from .coordinator import TheGymGroupCoordinator
+from .history import HistorySync
+from .journal import CheckInJournal, journal_path, remove_journal
+from .schedule import PollSchedule
+from .scheduler import async_get_scheduler
+from .session import async_get_session_manager
+from .store import GymGroupStore
 
 _LOGGER = logging.getLogger(__name__)
 
 PLATFORMS = [Platform.BINARY_SENSOR, Platform.SENSOR]
 
+CONFIG_SCHEMA = cv.config_entry_only_config_schema(DOMAIN)
 
-async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
-    """Set up The Gym Group from a config entry."""
-    coordinator = TheGymGroupCoordinator(hass, entry=entry)
+ATTR_CONFIG_ENTRY_ID = "config_entry_id"
+ATTR_START = "start"
+ATTR_END = "end"
+
+SYNC_HISTORY_SCHEMA = vol.Schema({
+    vol.Optional(ATTR_CONFIG_ENTRY_ID): cv.string,
+    vol.Required(ATTR_START): cv.date,
+    vol.Optional(ATTR_END): cv.date,
+})
+
+
+async def async_setup(hass: HomeAssistant, config):
+    """Register the integration's services."""
+
+    async def async_sync_history(call: ServiceCall):
+        start = call.data[ATTR_START]
+        end = call.data.get(ATTR_END) or dt_util.now().date()
+        if end < start:
+            raise ServiceValidationError(f"End {end} is before start {start}")
 
-    if not await coordinator.async_login():
-        return False
+        entry_id = call.data.get(ATTR_CONFIG_ENTRY_ID)
+        coordinators = [
+            hass.data[DOMAIN][entry.entry_id][DATA_COORDINATOR]
+            for entry in hass.config_entries.async_entries(DOMAIN)
+            if entry.entry_id in hass.data.get(DOMAIN, {})
+            and entry_id in (None, entry.entry_id)
+        ]
+        if not coordinators:
+            raise ServiceValidationError("No loaded account to sync")
 
-    await coordinator.async_config_entry_first_refresh()
+        # accounts sync together, the scheduler limits their requests overall
+        results = await asyncio.gather(
+            *(HistorySync(coordinator).async_sync(start, end + timedelta(days=1))
+              for coordinator in coordinators),
+            return_exceptions=True)
+        for coordinator, result in zip(coordinators, results):
+            if isinstance(result, UpdateFailed):
+                raise HomeAssistantError(
+                    f"Unable to sync {coordinator.name} history: {result}") from result
+            if isinstance(result, BaseException):
+                raise result
+
+    hass.services.async_register(DOMAIN, SERVICE_SYNC_HISTORY, async_sync_history,
+                                 schema=SYNC_HISTORY_SCHEMA)
+    return True
+
+
+async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
+    """Set up The Gym Group from a config entry."""
+    sessions = async_get_session_manager(hass)
+    session = sessions.acquire(entry.entry_id)
+    scheduler = async_get_scheduler(hass)
+    schedule = PollSchedule(
+        min_interval=timedelta(minutes=entry.options.get(
+            CONF_MIN_UPDATE_INTERVAL, MIN_UPDATE_INTERVAL.total_seconds() // 60)),
+        max_interval=timedelta(minutes=entry.options.get(
+            CONF_MAX_UPDATE_INTERVAL, MAX_UPDATE_INTERVAL.total_seconds() // 60)),
+    )
+    coordinator = TheGymGroupCoordinator(hass, entry=entry, session=session,
+                                         scheduler=scheduler, schedule=schedule,
+                                         store=GymGroupStore(hass, entry.entry_id),
+                                         auth=GymGroupAuth(hass, entry.entry_id),
+                                         journal=CheckInJournal(
+                                             hass, journal_path(hass, entry.entry_id)),
+                                         gyms=entry.options.get(CONF_GYMS, []))
+    await _async_migrate_unique_ids(hass, entry, coordinator.account_id)
+    # resume from the last sync instead of fetching all history again
+    await coordinator.async_restore()
+    scheduler.register(coordinator)
 
     hass.data.setdefault(DOMAIN, {})
     hass.data[DOMAIN][entry.entry_id] = {DATA_COORDINATOR: coordinator}
 
-    # TODO: setup historic data
-
+    # entities start from their restored state, the api is only reached once
+    # setup is done so a slow or unreachable api doesn't hold up startup
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
+    entry.async_create_background_task(
+        hass, _async_start(hass, coordinator),
+        f"{DOMAIN}_{coordinator.account_id}_start")
+    entry.async_on_unload(entry.add_update_listener(_async_update_listener))
 
     return True
 
 
+async def _async_start(hass: HomeAssistant, coordinator):
+    await coordinator.async_start()
+    # import historic data into long term statistics, once logged in
+    if coordinator.last_update_success:
+        await GymGroupBackfill(hass, coordinator).async_run()
+        return
+
+    entry = coordinator.entry
+    remove_listener = None
+
+    @callback
+    def _async_refreshed():
+        nonlocal remove_listener
+        if remove_listener is None or not coordinator.last_update_success:
+            return
+        remove_listener()
+        remove_listener = None
+        entry.async_create_background_task(
+            hass, GymGroupBackfill(hass, coordinator).async_run(),
+            f"{DOMAIN}_{coordinator.account_id}_backfill")
+
+    @callback
+    def _async_remove_listener():
+        if remove_listener is not None:
+            remove_listener()
+
+    # the api was unreachable, start once a refresh succeeds
+    remove_listener = coordinator.async_add_listener(_async_refreshed)
+    entry.async_on_unload(_async_remove_listener)
+
+
+async def _async_update_listener(hass: HomeAssistant, entry: ConfigEntry):
+    """Reload the entry when its options change."""
+    await hass.config_entries.async_reload(entry.entry_id)
+
+
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry):
     """Unload a config entry."""
     unload_ok = await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
     if unload_ok:
-        hass.data[DOMAIN].pop(entry.entry_id)
+        coordinator = hass.data[DOMAIN].pop(entry.entry_id)[DATA_COORDINATOR]
+        async_get_scheduler(hass).unregister(coordinator)
+        await coordinator.async_save()
+        await async_get_session_manager(hass).async_release(entry.entry_id)
     return unload_ok
+
+
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry):
+    """Remove persisted state when a config entry is deleted."""
+    await GymGroupStore(hass, entry.entry_id).async_remove()
+    await GymGroupStore(hass, entry.entry_id, "backfill").async_remove()
+    await GymGroupStore(hass, entry.entry_id, "session").async_remove()
+    await hass.async_add_executor_job(remove_journal,
+                                      journal_path(hass, entry.entry_id))
+
+
+async def _async_migrate_unique_ids(hass: HomeAssistant, entry: ConfigEntry,
+                                    account_id):
+    """Move entities off the shared `thegymgroup_` prefix to per-account ids."""
+    old_prefix = f"{DOMAIN}_"
+
+    @callback
+    def _migrate(entity_entry: er.RegistryEntry):
+        if not entity_entry.unique_id.startswith(old_prefix):
+            return None
+        key = entity_entry.unique_id[len(old_prefix):]
+        _LOGGER.debug(f"Migrating {entity_entry.entity_id} to {account_id}_{key}")
+        return {"new_unique_id": f"{account_id}_{key}"}
+
+    await er.async_migrate_entries(hass, entry.entry_id, _migrate)
@@ -0,0 +1,139 @@
+"""Day indexed workout totals."""
+import datetime as dt
+from array import array
+
+ONE_DAY = dt.timedelta(days=1)
+
+
+def _month_start(day, offset=0):
+    month = day.year * 12 + day.month - 1 + offset
+    return dt.date(month // 12, month % 12 + 1, 1)
+
+
+def window_bounds(window, today):
+    """Return the [start, end) dates of a named window relative to today."""
+    if window.startswith("rolling_"):
+        days = int(window.split("_")[1])
+        return today - dt.timedelta(days=days - 1), today + ONE_DAY
+
+    monday = today - dt.timedelta(days=today.weekday())
+    bounds = {
+        "today": (today, today + ONE_DAY),
+        "this_week": (monday, monday + 7 * ONE_DAY),
+        "last_week": (monday - 7 * ONE_DAY, monday),
+        "this_month": (_month_start(today), _month_start(today, 1)),
+        "last_month": (_month_start(today, -1), _month_start(today)),
+        "this_year": (dt.date(today.year, 1, 1), dt.date(today.year + 1, 1, 1)),
+        "last_year": (dt.date(today.year - 1, 1, 1), dt.date(today.year, 1, 1)),
+    }
+    return bounds[window]
+
+
+def window_period(window):
+    """Return the period after which a named window covers different days."""
+    if window == "today" or window.startswith("rolling_"):
+        return "day"
+    # eg. this_week, last_month
+    return window.split("_", 1)[1]
+
+
+def period_start(period, day):
+    """Return the first day of the day, ISO week, month or year holding a day."""
+    if period == "day":
+        return day
+    if period == "week":
+        return day - dt.timedelta(days=day.weekday())
+    if period == "month":
+        return _month_start(day)
+    return dt.date(day.year, 1, 1)
+
+
+def next_period_start(period, day):
+    """Return the first day of the period after the one holding a day."""
+    if period == "day":
+        return day + ONE_DAY
+    if period == "week":
+        return period_start(period, day) + 7 * ONE_DAY
+    if period == "month":
+        return _month_start(day, 1)
+    return dt.date(day.year + 1, 1, 1)
+
+
+class DailyTotals:
+    """Workout minutes and visits per day, backed by compact arrays.
+
+    Prefix sums are rebuilt lazily after the totals change, so the totals for
+    any range of days, eg. last week, this year or the last 30 days, take two
+    lookups no matter how much history has been recorded.
+    """
+
+    def __init__(self, start=None, minutes=(), visits=()):
+        self.start = start
+        self.minutes = array('d', minutes)
+        self.visits = array('L', visits)
+        self._minutes_sum = None
+        self._visits_sum = None
+
+    def _index(self, day):
+        if self.start is None:
+            self.start = day
+
+        ndx = (day - self.start).days
+        if ndx < 0:
+            # day is before anything seen so far, shift everything along
+            self.minutes = array('d', [0] * -ndx) + self.minutes
+            self.visits = array('L', [0] * -ndx) + self.visits
+            self.start = day
+            ndx = 0
+
+        if ndx >= len(self.minutes):
+            grow = ndx + 1 - len(self.minutes)
+            self.minutes.extend([0] * grow)
+            self.visits.extend([0] * grow)
+        return ndx
+
+    def add(self, day, minutes, visits=1):
+        """Add a workout to the totals of a day."""
+        ndx = self._index(day)
+        self.minutes[ndx] += minutes
+        self.visits[ndx] += visits
+        self._minutes_sum = self._visits_sum = None
+
+    def _prefix_sums(self):
+        if self._minutes_sum is None:
+            self._minutes_sum = array('d', [0])
+            self._visits_sum = array('L', [0])
+            for minutes, visits in zip(self.minutes, self.visits):
+                self._minutes_sum.append(self._minutes_sum[-1] + minutes)
+                self._visits_sum.append(self._visits_sum[-1] + visits)
+        return self._minutes_sum, self._visits_sum
+
+    def total(self, start, end):
+        """Return (minutes, visits) for the days in [start, end)."""
+        if self.start is None:
+            return 0, 0
+
+        minutes_sum, visits_sum = self._prefix_sums()
+        size = len(self.minutes)
+        lo = min(max((start - self.start).days, 0), size)
+        hi = min(max((end - self.start).days, 0), size)
+        if hi <= lo:
+            return 0, 0
+        return minutes_sum[hi] - minutes_sum[lo], visits_sum[hi] - visits_sum[lo]
+
+    def window(self, window, today):
+        """Return (minutes, visits) for a named window, eg. `last_month`."""
+        return self.total(*window_bounds(window, today))
+
+    def as_dict(self):
+        return {
+            "start": self.start.isoformat() if self.start else None,
+            "minutes": list(self.minutes),
+            "visits": list(self.visits),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        start = data.get("start")
+        return cls(dt.date.fromisoformat(start) if start else None,
+                   data.get("minutes", ()), data.get("visits", ()))
@@ -0,0 +1,90 @@
+"""Login session for a The Gym Group account."""
+import logging
+import datetime as dt
+from http.cookies import SimpleCookie, CookieError
+from email.utils import parsedate_to_datetime
+
+from homeassistant.core import HomeAssistant
+from homeassistant.util import dt as dt_util
+
+from .const import SESSION_LIFETIME, SESSION_REFRESH_MARGIN, SESSION_MIN_LIFETIME
+from .store import GymGroupStore, encode_dt, decode_dt
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def parse_cookies(set_cookies, now):
+    """Return the cookie header and earliest expiry from Set-Cookie headers."""
+    cookies = {}
+    expires = None
+    for header in set_cookies:
+        try:
+            jar = SimpleCookie(header)
+        except CookieError:
+            _LOGGER.warning(f"Unable to parse cookie {header!r}")
+            continue
+
+        for name, morsel in jar.items():
+            cookies[name] = morsel.value
+            expiry = None
+            if morsel["max-age"]:
+                try:
+                    expiry = now + dt.timedelta(seconds=int(morsel["max-age"]))
+                except (ValueError, OverflowError):
+                    _LOGGER.warning(f"Ignoring cookie {name} max-age "
+                                    f"{morsel['max-age']!r}")
+            if expiry is None and morsel["expires"]:
+                try:
+                    expiry = parsedate_to_datetime(morsel["expires"])
+                except (TypeError, ValueError):
+                    pass
+                else:
+                    if expiry.tzinfo is None:
+                        # "-0000" dates are utc too
+                        expiry = expiry.replace(tzinfo=dt.timezone.utc)
+            if expiry is not None and (expires is None or expiry < expires):
+                expires = expiry
+
+    cookie = "; ".join(f"{name}={value}" for name, value in cookies.items())
+    # session cookies don't say when they expire, assume a typical lifetime
+    return cookie, expires or now + SESSION_LIFETIME
+
+
+class GymGroupAuth:
+    """An account's login cookie and profile, kept between restarts.
+
+    The session is stored in a private file in Home Assistant's storage so
+    a restart can reuse it instead of logging in again.
+    """
+
+    def __init__(self, hass: HomeAssistant, entry_id):
+        self.store = GymGroupStore(hass, entry_id, "session", private=True)
+        self.cookie = None
+        self.refresh_at = None
+        self.profile = None
+
+    @property
+    def valid(self):
+        return bool(self.cookie and self.profile and self.refresh_at) and \
+            dt_util.utcnow() < self.refresh_at
+
+    async def async_update(self, set_cookies, profile):
+        """Keep the session from a successful login."""
+        now = dt_util.utcnow()
+        self.cookie, expires = parse_cookies(set_cookies, now)
+        # log in again ahead of expiry, but never straight away
+        margin = min(SESSION_REFRESH_MARGIN, (expires - now) / 2)
+        self.refresh_at = max(expires - margin, now + SESSION_MIN_LIFETIME)
+        self.profile = profile
+        await self.store.async_save({
+            "cookie": self.cookie,
+            "refresh_at": encode_dt(self.refresh_at),
+            "profile": self.profile,
+        })
+        return self.cookie
+
+    async def async_load(self):
+        stored = await self.store.async_load() or {}
+        self.cookie = stored.get("cookie")
+        self.refresh_at = decode_dt(stored.get("refresh_at"))
+        self.profile = stored.get("profile")
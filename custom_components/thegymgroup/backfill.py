@@ -0,0 +1,142 @@
+"""Import check in history into recorder long term statistics."""
+import logging
+import datetime as dt
+from collections import defaultdict
+
+from homeassistant.components.recorder import get_instance
+from homeassistant.components.recorder.models import StatisticData, StatisticMetaData
+from homeassistant.components.recorder.statistics import async_add_external_statistics
+from homeassistant.const import UnitOfTime
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.update_coordinator import UpdateFailed
+from homeassistant.util import dt as dt_util, slugify
+
+from .aggregates import ONE_DAY
+from .const import DOMAIN, BACKFILL_START, BACKFILL_WINDOW
+from .checkins import LocalDateFilter
+from .store import GymGroupStore, encode_dt, decode_dt
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class HourlyTotals:
+    """Finished check ins summed into (minutes, visits) per local hour.
+
+    Raw check ins are folded in as a history response streams in, only the
+    ones `keep` accepts are counted.
+    """
+
+    def __init__(self, keep):
+        self.keep = keep
+        self.reset()
+
+    def reset(self):
+        """Forget anything folded in, eg. before a failed response is retried."""
+        self.hours = defaultdict(lambda: [0, 0])
+        self.count = 0
+
+    def __call__(self, raw):
+        kept = self.keep(raw)
+        if kept is None:
+            return
+        check_in, _ = kept
+        self.count += 1
+        if check_in.duration_ms <= 0:
+            return
+        start = check_in.check_in_date.replace(minute=0, second=0, microsecond=0)
+        self.hours[start][0] += check_in.duration
+        self.hours[start][1] += 1
+
+    def items(self):
+        return sorted(self.hours.items())
+
+    def __len__(self):
+        return self.count
+
+
+class GymGroupBackfill:
+    """Stream an account's full check in history into external statistics.
+
+    History is streamed one window at a time and imported as hourly duration
+    and visit count statistics, so memory is bounded by the hours in a window
+    and never by the length of the history. Progress is saved after every window,
+    an interrupted backfill resumes where it stopped and later runs only
+    import days finished since the last one.
+    """
+
+    def __init__(self, hass: HomeAssistant, coordinator):
+        self.hass = hass
+        self.coordinator = coordinator
+        self.store = GymGroupStore(hass, coordinator.entry.entry_id, "backfill")
+
+        object_id = slugify(coordinator.account_id)
+        self.duration_metadata = StatisticMetaData(
+            has_mean=False,
+            has_sum=True,
+            name=f"{coordinator.account_id} workout duration",
+            source=DOMAIN,
+            statistic_id=f"{DOMAIN}:{object_id}_workout_duration",
+            unit_of_measurement=UnitOfTime.MINUTES,
+        )
+        self.visits_metadata = StatisticMetaData(
+            has_mean=False,
+            has_sum=True,
+            name=f"{coordinator.account_id} workout visits",
+            source=DOMAIN,
+            statistic_id=f"{DOMAIN}:{object_id}_workout_visits",
+            unit_of_measurement=None,
+        )
+
+    async def async_run(self):
+        """Import history from the saved cursor up to the start of today."""
+        if "recorder" not in self.hass.config.components:
+            _LOGGER.debug("Recorder not loaded, skipping history backfill")
+            return
+
+        progress = await self.store.async_load() or {}
+        start = decode_dt(progress.get("cursor"), BACKFILL_START)
+        duration_sum = progress.get("duration_sum", 0)
+        visits_sum = progress.get("visits_sum", 0)
+        # only import whole days, today's check ins may still be in progress
+        end = dt.datetime.combine(dt_util.now().date(), dt.time.min)
+
+        while start < end:
+            window_end = min(start + BACKFILL_WINDOW, end)
+            # the api filters in utc, ask for a day either side and keep local days
+            totals = HourlyTotals(LocalDateFilter(start.date(), window_end.date()))
+            try:
+                await self.coordinator.async_fetch_history(
+                    self.coordinator.history_url(start - ONE_DAY,
+                                                 window_end + ONE_DAY),
+                    check_ins=totals)
+            except UpdateFailed as e:
+                _LOGGER.warning(f"History backfill paused at {start}: {e}")
+                return
+
+            duration_stats, visits_stats = [], []
+            for hour, (minutes, count) in totals.items():
+                hour = dt_util.as_utc(hour.replace(tzinfo=dt_util.DEFAULT_TIME_ZONE))
+                duration_sum += minutes
+                visits_sum += count
+                duration_stats.append(
+                    StatisticData(start=hour, state=minutes, sum=duration_sum))
+                visits_stats.append(
+                    StatisticData(start=hour, state=count, sum=visits_sum))
+
+            if duration_stats:
+                async_add_external_statistics(
+                    self.hass, self.duration_metadata, duration_stats)
+                async_add_external_statistics(
+                    self.hass, self.visits_metadata, visits_stats)
+                # let the recorder catch up before queueing the next window
+                await get_instance(self.hass).async_block_till_done()
+
+            _LOGGER.debug(f"Backfilled {len(totals)} check ins for "
+                          f"{self.coordinator.name} up to {window_end}")
+
+            start = window_end
+            await self.store.async_save({
+                "cursor": encode_dt(start),
+                "duration_sum": duration_sum,
+                "visits_sum": visits_sum,
+            })
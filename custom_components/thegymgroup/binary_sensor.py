@@ -6,13 +6,21 @@ from homeassistant.components.binary_sensor import (
 )
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import CONF_ID
+from homeassistant.const import STATE_ON
 from homeassistant.core import HomeAssistant
+from homeassistant.helpers.restore_state import RestoreEntity
 from homeassistant.helpers.update_coordinator import (
     CoordinatorEntity, DataUpdateCoordinator,
 )
 
-from .const import DATA_COORDINATOR, DOMAIN, GYM_STATUS_ENTITIES
-from .entity import GymGroupBaseEntity
+from .const import (
+    DATA_COORDINATOR,
+    DOMAIN,
+    GYM_STATUS_ENTITIES,
+    PRESENCE_ENTITIES,
+    TRACKED_GYM_STATUS_ENTITIES,
+)
+from .entity import GymGroupBaseEntity, GymGroupTrackedGymEntity
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -27,19 +35,50 @@ async def async_setup_entry(
         DATA_COORDINATOR
     ]
     unique_id = entry.data[CONF_ID].split('@')[0]
+    occupancy = coordinator.occupancy_coordinator
 
     entities = []
     for descr in GYM_STATUS_ENTITIES:
+        _LOGGER.debug("Registering entity: %s", descr)
+        entities.append(GymGroupStatusSensor(unique_id, occupancy, descr))
+
+    for descr in PRESENCE_ENTITIES:
         _LOGGER.debug("Registering entity: %s", descr)
         entities.append(GymGroupStatusSensor(unique_id, coordinator, descr))
 
-    async_add_entities(entities, update_before_add=True)
+    for gym_id in coordinator.tracked_gyms:
+        for descr in TRACKED_GYM_STATUS_ENTITIES:
+            _LOGGER.debug("Registering entity for gym %s: %s", gym_id, descr)
+            entities.append(GymGroupTrackedGymStatusSensor(unique_id, occupancy,
+                                                           descr, gym_id))
+
+    # don't wait on the api, entities show their restored state until it's polled
+    async_add_entities(entities)
 
     return True
 
 
-class GymGroupStatusSensor(GymGroupBaseEntity, BinarySensorEntity):
+class GymGroupStatusSensor(GymGroupBaseEntity, BinarySensorEntity, RestoreEntity):
+    async def async_added_to_hass(self):
+        """Restore the last known state."""
+        await super().async_added_to_hass()
+        if (last_state := await self.async_get_last_state()) is not None:
+            self._restored_value = last_state.state == STATE_ON
+
+    def compile_value(self, description):
+        get_value = super().compile_value(description)
+
+        def is_on(now):
+            data = get_value(now)
+            if data is None:
+                return None
+            return data.lower() in ON_STATES
+        return is_on
+
     @property
     def is_on(self):
-        data = self.get_value(self.entity_description.path)
-        return data.lower() in ON_STATES
+        return self.restored(self.snapshot.value)
+
+
+class GymGroupTrackedGymStatusSensor(GymGroupTrackedGymEntity, GymGroupStatusSensor):
+    pass
@@ -0,0 +1,261 @@
+"""Check in records and a bounded store of recent check ins."""
+import heapq
+import itertools
+import datetime as dt
+from functools import lru_cache
+from collections import OrderedDict, Counter, defaultdict
+
+from homeassistant.util import dt as dt_util
+
+from .const import DEFAULT_CHECK_IN_WINDOW
+from .schedule import slot
+
+
+def check_in_key(check_in):
+    """Identify a raw check in by when and where it happened."""
+    return (check_in['checkInDate'], check_in.get('gymLocationName'))
+
+
+def _zone(timezone):
+    # time zones are looked up once and cached by home assistant
+    if isinstance(timezone, str):
+        timezone = dt_util.get_time_zone(timezone)
+    return timezone or dt_util.DEFAULT_TIME_ZONE
+
+
+@lru_cache(maxsize=4096)
+def _utc_offset(timezone, day):
+    """Return a timezone's offset over a whole UTC day, None if it changes."""
+    zone = _zone(timezone)
+    start = dt.datetime.fromordinal(day).replace(tzinfo=dt.timezone.utc)
+    offset = start.astimezone(zone).utcoffset()
+    if (start + dt.timedelta(days=1)).astimezone(zone).utcoffset() != offset:
+        return None
+    return offset
+
+
+def local_time(check_in_date, timezone):
+    """Convert a check in time, UTC unless it has an offset, to local time."""
+    ts = dt.datetime.fromisoformat(check_in_date)
+    if ts.tzinfo is None:
+        # the offset is only worked out again on days clocks change
+        offset = _utc_offset(timezone or dt_util.DEFAULT_TIME_ZONE, ts.toordinal())
+        if offset is not None:
+            return ts + offset
+        ts = ts.replace(tzinfo=dt.timezone.utc)
+    return ts.astimezone(_zone(timezone)).replace(tzinfo=None)
+
+
+class CheckIn:
+    """A check in from the history response, parsed once.
+
+    `check_in_date` is the local time in the check in's own timezone. The
+    time and duration are kept as sent as well, so a check in can be matched
+    against a later response without parsing it again.
+    """
+
+    __slots__ = ("raw_date", "check_in_date", "gym_location_name",
+                 "gym_location_address", "timezone", "duration_ms")
+
+    def __init__(self, raw_date, gym_location_name, gym_location_address=None,
+                 timezone=None, duration_ms=0):
+        self.raw_date = raw_date
+        self.check_in_date = local_time(raw_date, timezone)
+        self.gym_location_name = gym_location_name
+        self.gym_location_address = gym_location_address
+        self.timezone = timezone
+        self.duration_ms = duration_ms
+
+    @classmethod
+    def from_response(cls, check_in):
+        return cls(check_in['checkInDate'],
+                   check_in.get('gymLocationName'),
+                   check_in.get('gymLocationAddress'),
+                   check_in.get('timezone'),
+                   int(check_in.get('duration') or 0))
+
+    @property
+    def key(self):
+        return (self.raw_date, self.gym_location_name)
+
+    @property
+    def duration(self):
+        """Duration in minutes, 0 until checked out."""
+        return self.duration_ms / 1000 / 60
+
+    def as_dict(self):
+        """Return the check in as the api sent it."""
+        return {
+            'checkInDate': self.raw_date,
+            'gymLocationName': self.gym_location_name,
+            'gymLocationAddress': self.gym_location_address,
+            'timezone': self.timezone,
+            'duration': self.duration_ms,
+        }
+
+    def __eq__(self, other):
+        if not isinstance(other, CheckIn):
+            return NotImplemented
+        return self.as_dict() == other.as_dict()
+
+    def __repr__(self):
+        return (f"CheckIn({self.check_in_date.isoformat()}, "
+                f"{self.gym_location_name!r}, {self.duration:.0f} minutes)")
+
+
+class CheckInStore:
+    """Recent check ins keyed by time and location, oldest first.
+
+    Membership and updates are O(1). A check in seen again with a new
+    duration, eg. when leaving the gym, replaces the stored one in place.
+    Only the newest `maxlen` check ins are kept in memory.
+    """
+
+    def __init__(self, check_ins=(), maxlen=DEFAULT_CHECK_IN_WINDOW):
+        self.maxlen = maxlen
+        self._check_ins = OrderedDict()
+        for check_in in check_ins:
+            self.add(check_in)
+
+    def get(self, check_in):
+        """Return the stored version of a raw check in, if it has been seen."""
+        return self._check_ins.get(check_in_key(check_in))
+
+    def add(self, check_in):
+        """Add or update a check in."""
+        self._check_ins[check_in.key] = check_in
+        while len(self._check_ins) > self.maxlen:
+            self._check_ins.popitem(last=False)
+
+    @property
+    def last(self):
+        """Return the newest check in."""
+        if self._check_ins:
+            return next(reversed(self._check_ins.values()))
+
+    def __contains__(self, check_in):
+        return check_in.key in self._check_ins
+
+    def __len__(self):
+        return len(self._check_ins)
+
+    def __iter__(self):
+        return iter(self._check_ins.values())
+
+    def __getitem__(self, index):
+        if index == -1:
+            if not self._check_ins:
+                raise IndexError("check in index out of range")
+            return self.last
+
+        if index < 0:
+            index += len(self._check_ins)
+        try:
+            return next(itertools.islice(self._check_ins.values(), index, None))
+        except (StopIteration, ValueError):
+            raise IndexError("check in index out of range") from None
+
+
+class CheckInFilter:
+    """Choose which raw check ins from a response still need processing.
+
+    Check ins already processed with the same duration are dropped without
+    being parsed, as are any from before `since`. The others are returned
+    parsed, with the stored version if they have been seen before.
+    """
+
+    def __init__(self, check_ins, since):
+        self.check_ins = check_ins
+        self.since = since
+
+    def __call__(self, check_in):
+        seen = self.check_ins.get(check_in) if self.check_ins else None
+        if seen is not None and seen.duration_ms == check_in.get('duration'):
+            return None
+        parsed = CheckIn.from_response(check_in)
+        if parsed.check_in_date <= self.since:
+            return None
+        return parsed, seen
+
+
+class LocalDateFilter:
+    """Keep raw check ins made on local days in [start, end), parsed."""
+
+    def __init__(self, start, end):
+        self.start = start
+        self.end = end
+
+    def __call__(self, check_in):
+        parsed = CheckIn.from_response(check_in)
+        if not self.start <= parsed.check_in_date.date() < self.end:
+            return None
+        return parsed, None
+
+
+class CheckInBatch:
+    """New and updated check ins from a history response, folded as they arrive.
+
+    Each raw check in is filtered and deduplicated by `keep`, which parses
+    the ones it keeps and returns them with their stored version. Only per
+    day totals, the hours new check ins started in and the newest `maxlen`
+    check ins are kept, so memory doesn't grow with the length of the
+    response. With a `journal` every check in is also packed into a
+    compact record to be appended to it.
+    """
+
+    def __init__(self, check_ins, since, maxlen=DEFAULT_CHECK_IN_WINDOW, keep=None,
+                 journal=None):
+        self.check_ins = check_ins
+        self.keep = keep or CheckInFilter(check_ins, since)
+        self.maxlen = maxlen
+        self.journal = journal
+        self.reset()
+
+    def reset(self):
+        """Forget anything folded in, eg. before a failed response is retried."""
+        # date -> [minutes, visits] not counted before
+        self.days = defaultdict(lambda: [0, 0])
+        # poll schedule slot -> check ins never seen before
+        self.slots = Counter()
+        self._newest = []
+        self.latest = None
+        self.count = 0
+        # journal records of every check in folded in
+        self.records = bytearray()
+
+    def __call__(self, raw):
+        """Fold in a raw check in if it is new or has changed."""
+        kept = self.keep(raw)
+        if kept is None:
+            return
+        check_in, seen = kept
+
+        if seen is None:
+            self.slots[slot(check_in.check_in_date)] += 1
+        if check_in.duration_ms > 0:
+            # only count what wasn't counted when last seen
+            seen_duration = seen.duration if seen else 0
+            day = self.days[check_in.check_in_date.date()]
+            day[0] += check_in.duration - seen_duration
+            day[1] += 0 if seen_duration > 0 else 1
+
+        if self.journal is not None:
+            self.records += self.journal.pack(check_in)
+        heapq.heappush(self._newest, (check_in.check_in_date, self.count, check_in))
+        if len(self._newest) > self.maxlen:
+            heapq.heappop(self._newest)
+        if self.latest is None or check_in.check_in_date >= self.latest.check_in_date:
+            self.latest = check_in
+        self.count += 1
+
+    def extend(self, raw_check_ins):
+        for raw in raw_check_ins:
+            self(raw)
+
+    @property
+    def newest(self):
+        """The newest check ins, oldest first."""
+        return [check_in for _, _, check_in in sorted(self._newest)]
+
+    def __len__(self):
+        return self.count
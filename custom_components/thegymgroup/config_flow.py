@@ -6,8 +6,18 @@ from homeassistant import config_entries
 from homeassistant.const import (
     CONF_ID, CONF_PASSWORD, CONF_USERNAME, CONF_SCAN_INTERVAL
 )
+from homeassistant.core import callback
+from homeassistant.helpers.selector import TextSelector, TextSelectorConfig
 
-from .const import DOMAIN, DEFAULT_UPDATE_INTERVAL
+from .const import (
+    DOMAIN,
+    DEFAULT_UPDATE_INTERVAL,
+    CONF_MIN_UPDATE_INTERVAL,
+    CONF_MAX_UPDATE_INTERVAL,
+    CONF_GYMS,
+    MIN_UPDATE_INTERVAL,
+    MAX_UPDATE_INTERVAL,
+)
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -26,6 +36,11 @@ class TheGymGroupConfigFlowHandler(config_entries.ConfigFlow, domain=DOMAIN):
 
     VERSION = 1
 
+    @staticmethod
+    @callback
+    def async_get_options_flow(config_entry):
+        return TheGymGroupOptionsFlowHandler(config_entry)
+
     async def _show_setup_form(self, errors=None):
         """Show the setup form to the user."""
         return self.async_show_form(
@@ -58,3 +73,45 @@ class TheGymGroupConfigFlowHandler(config_entries.ConfigFlow, domain=DOMAIN):
                 CONF_PASSWORD: password,
             },
         )
+
+
+class TheGymGroupOptionsFlowHandler(config_entries.OptionsFlow):
+    """Handle options for The Gym Group."""
+
+    def __init__(self, config_entry):
+        self.config_entry = config_entry
+
+    async def async_step_init(self, user_input=None):
+        """Manage the poll schedule bounds and the gyms to track."""
+        errors = {}
+        if user_input is not None:
+            if user_input[CONF_MIN_UPDATE_INTERVAL] > \
+                    user_input[CONF_MAX_UPDATE_INTERVAL]:
+                errors["base"] = "invalid_interval"
+            else:
+                gyms = (gym_id.strip() for gym_id in user_input.get(CONF_GYMS, []))
+                user_input[CONF_GYMS] = list(dict.fromkeys(filter(None, gyms)))
+                return self.async_create_entry(title="", data=user_input)
+
+        options = self.config_entry.options
+        min_interval = MIN_UPDATE_INTERVAL.total_seconds() // 60
+        max_interval = MAX_UPDATE_INTERVAL.total_seconds() // 60
+        return self.async_show_form(
+            step_id="init",
+            data_schema=vol.Schema(
+                {
+                    vol.Required(CONF_MIN_UPDATE_INTERVAL,
+                                 default=options.get(CONF_MIN_UPDATE_INTERVAL,
+                                                     min_interval)):
+                        vol.All(vol.Coerce(int), vol.Range(min=1)),
+                    vol.Required(CONF_MAX_UPDATE_INTERVAL,
+                                 default=options.get(CONF_MAX_UPDATE_INTERVAL,
+                                                     max_interval)):
+                        vol.All(vol.Coerce(int), vol.Range(min=1)),
+                    vol.Optional(CONF_GYMS,
+                                 default=options.get(CONF_GYMS, [])):
+                        TextSelector(TextSelectorConfig(multiple=True)),
+                }
+            ),
+            errors=errors,
+        )
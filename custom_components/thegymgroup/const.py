@@ -1,5 +1,5 @@
 """Constants for the The Gym Group integration."""
-from datetime import timedelta
+from datetime import datetime, timedelta
 from typing import NamedTuple
 from dataclasses import dataclass
 
@@ -7,7 +7,9 @@ from homeassistant.const import (
     UnitOfMass,
     UnitOfTime,
     UnitOfLength,
+    UnitOfInformation,
     PERCENTAGE,
+    EntityCategory,
 )
 from homeassistant.components.binary_sensor import (
     BinarySensorEntityDescription,
@@ -21,8 +23,74 @@ from homeassistant.components.sensor import (
 
 DOMAIN = "thegymgroup"
 DATA_COORDINATOR = "coordinator"
+DATA_SESSION = "session"
+DATA_SCHEDULER = "scheduler"
 DEFAULT_UPDATE_INTERVAL = timedelta(minutes=15)
-EVENT_RESET = "reset"
+# occupancy and the profile are polled apart from check ins
+OCCUPANCY_UPDATE_INTERVAL = timedelta(minutes=5)
+PROFILE_UPDATE_INTERVAL = timedelta(days=1)
+# learned poll schedule, bounds can be changed in the options
+CONF_MIN_UPDATE_INTERVAL = "min_update_interval"
+CONF_MAX_UPDATE_INTERVAL = "max_update_interval"
+# other gyms to track occupancy for, as gym location ids
+CONF_GYMS = "gyms"
+MIN_UPDATE_INTERVAL = timedelta(minutes=5)
+MAX_UPDATE_INTERVAL = timedelta(minutes=60)
+# check ins seen before the schedule is trusted
+SCHEDULE_MIN_CHECK_INS = 10
+# poll decisions kept for diagnostics
+SCHEDULE_HISTORY = 96
+# weight of each new occupancy value in the forecast
+FORECAST_DECAY = 0.2
+# check ins are polled quickly while at the gym, within hard limits
+BURST_UPDATE_INTERVAL = timedelta(minutes=1)
+BURST_MAX_DURATION = timedelta(hours=3)
+BURST_MAX_CALLS = 180
+# most recent check ins kept in memory
+DEFAULT_CHECK_IN_WINDOW = 100
+
+# pooled http connections, shared by all accounts
+CONN_LIMIT = 100
+CONN_LIMIT_PER_HOST = 20
+DNS_CACHE_TTL = 300
+KEEPALIVE_TIMEOUT = 60
+
+# persisted sync state, bump the version when the stored layout changes
+STORAGE_VERSION = 3
+STORAGE_SAVE_DELAY = 30
+
+# history imported into long term statistics, the first gyms opened in 2008
+BACKFILL_START = datetime(2008, 1, 1)
+BACKFILL_WINDOW = timedelta(days=90)
+# sync_history service, a range is fetched as windows in parallel
+SERVICE_SYNC_HISTORY = "sync_history"
+SYNC_HISTORY_WINDOW = timedelta(days=30)
+SYNC_HISTORY_CONCURRENCY = 4
+
+# failed requests are retried with jittered exponential backoff
+RETRY_MAX_ATTEMPTS = 3
+RETRY_BASE_DELAY = 1
+RETRY_MAX_DELAY = 30
+REQUEST_TIMEOUT = 30
+# refreshes that fail in a row before polling pauses
+BREAKER_THRESHOLD = 5
+BREAKER_RESET_TIMEOUT = timedelta(minutes=30)
+
+# login sessions are reused until shortly before the cookie expires
+SESSION_LIFETIME = timedelta(hours=12)
+SESSION_REFRESH_MARGIN = timedelta(minutes=30)
+SESSION_MIN_LIFETIME = timedelta(minutes=5)
+
+# history fetches allowed in flight across all accounts
+MAX_CONCURRENT_HISTORY = 4
+# occupancy fetches allowed in flight, a slow gym is given up on for the cycle
+MAX_CONCURRENT_OCCUPANCY = 20
+GYM_FETCH_TIMEOUT = 10
+# history responses are parsed as they arrive, in chunks of this many bytes
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# upper bounds of the request latency histogram, in seconds
+TELEMETRY_LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
 
 
 @dataclass(kw_only=True)
@@ -30,6 +98,7 @@ class GymGroupEntityDescription(SensorEntityDescription):
     """Describes sensor entity"""
     path: str
     index: int = None
+    window: str = None
 
 
 @dataclass(kw_only=True)
@@ -65,12 +134,94 @@ GYM_ENTITIES = (
                               state_class=SensorStateClass.TOTAL),
 )
 
+FORECAST_ENTITIES = (
+    GymGroupEntityDescription(key="occupancy_forecast_1h",
+                              translation_key="occupancy_forecast_1h",
+                              path="forecast", index=1,
+                              unit_of_measurement=PERCENTAGE,
+                              icon="mdi:crystal-ball"),
+    GymGroupEntityDescription(key="occupancy_forecast_2h",
+                              translation_key="occupancy_forecast_2h",
+                              path="forecast", index=2,
+                              unit_of_measurement=PERCENTAGE,
+                              icon="mdi:crystal-ball"),
+    GymGroupEntityDescription(key="quietest_time_today",
+                              translation_key="quietest_time_today",
+                              path="forecastQuietest",
+                              icon="mdi:clock-check-outline",
+                              device_class=SensorDeviceClass.TIMESTAMP),
+)
+
+TELEMETRY_ENTITIES = (
+    GymGroupEntityDescription(key="api_requests",
+                              translation_key="api_requests",
+                              path="telemetry/requests",
+                              icon="mdi:api",
+                              entity_category=EntityCategory.DIAGNOSTIC,
+                              entity_registry_enabled_default=False,
+                              state_class=SensorStateClass.TOTAL_INCREASING),
+    GymGroupEntityDescription(key="api_retries",
+                              translation_key="api_retries",
+                              path="telemetry/retries",
+                              icon="mdi:reload-alert",
+                              entity_category=EntityCategory.DIAGNOSTIC,
+                              entity_registry_enabled_default=False,
+                              state_class=SensorStateClass.TOTAL_INCREASING),
+    GymGroupEntityDescription(key="api_relogins",
+                              translation_key="api_relogins",
+                              path="telemetry/relogins",
+                              icon="mdi:login",
+                              entity_category=EntityCategory.DIAGNOSTIC,
+                              entity_registry_enabled_default=False,
+                              state_class=SensorStateClass.TOTAL_INCREASING),
+    GymGroupEntityDescription(key="api_downloaded",
+                              translation_key="api_downloaded",
+                              path="telemetry/bytes",
+                              icon="mdi:download-network",
+                              unit_of_measurement=UnitOfInformation.BYTES,
+                              device_class=SensorDeviceClass.DATA_SIZE,
+                              entity_category=EntityCategory.DIAGNOSTIC,
+                              entity_registry_enabled_default=False,
+                              state_class=SensorStateClass.TOTAL_INCREASING),
+    GymGroupEntityDescription(key="api_latency",
+                              translation_key="api_latency",
+                              path="telemetry/mean_latency",
+                              icon="mdi:timer-outline",
+                              unit_of_measurement=UnitOfTime.MILLISECONDS,
+                              device_class=SensorDeviceClass.DURATION,
+                              entity_category=EntityCategory.DIAGNOSTIC,
+                              entity_registry_enabled_default=False,
+                              state_class=SensorStateClass.MEASUREMENT),
+    GymGroupEntityDescription(key="processing_time",
+                              translation_key="processing_time",
+                              path="telemetry/build_time",
+                              icon="mdi:cog-clockwise",
+                              unit_of_measurement=UnitOfTime.MILLISECONDS,
+                              device_class=SensorDeviceClass.DURATION,
+                              entity_category=EntityCategory.DIAGNOSTIC,
+                              entity_registry_enabled_default=False,
+                              state_class=SensorStateClass.MEASUREMENT),
+)
+
+# changes on every refresh, so kept off the other entities' attributes
+SYNC_ENTITIES = (
+    GymGroupEntityDescription(key="last_synced",
+                              translation_key="last_synced",
+                              path="last_sync",
+                              icon="mdi:cloud-sync-outline",
+                              device_class=SensorDeviceClass.TIMESTAMP,
+                              entity_category=EntityCategory.DIAGNOSTIC),
+)
+
 GYM_STATUS_ENTITIES = (
     GymGroupBinaryEntityDescription(key="gym_status",
                                     translation_key="gym_status",
                                     path="data/status",
                                     icon="mdi:store-clock",
                                     device_class=BinarySensorDeviceClass.DOOR),
+)
+
+PRESENCE_ENTITIES = (
     GymGroupBinaryEntityDescription(key="gym_presence",
                                     translation_key="gym_presence",
                                     path="data/gymPresence",
@@ -78,6 +229,10 @@ GYM_STATUS_ENTITIES = (
                                     device_class=BinarySensorDeviceClass.OCCUPANCY),
 )
 
+TRACKED_GYM_ENTITIES = GYM_ENTITIES
+
+TRACKED_GYM_STATUS_ENTITIES = GYM_STATUS_ENTITIES
+
 WORKOUT_ENTITIES = (
     GymGroupEntityDescription(key="last_workout_duration",
                               translation_key="last_workout_duration",
@@ -90,7 +245,7 @@ WORKOUT_ENTITIES = (
 
     GymGroupEntityDescription(key="workout_duration_this_week",
                               translation_key="workout_duration_this_week",
-                              path="weeklyTotal", index=0,
+                              path="workoutMinutes", window="this_week",
                               unit_of_measurement=UnitOfTime.MINUTES,
                               icon="mdi:weight-lifter",
                               state_class=SensorStateClass.MEASUREMENT,
@@ -99,7 +254,7 @@ WORKOUT_ENTITIES = (
 
     GymGroupEntityDescription(key="workout_duration_last_week",
                               translation_key="workout_duration_last_week",
-                              path="weeklyTotal", index=-1,
+                              path="workoutMinutes", window="last_week",
                               unit_of_measurement=UnitOfTime.MINUTES,
                               icon="mdi:weight-lifter",
                               state_class=SensorStateClass.MEASUREMENT,
@@ -108,7 +263,7 @@ WORKOUT_ENTITIES = (
 
     GymGroupEntityDescription(key="workout_duration_this_month",
                               translation_key="workout_duration_this_month",
-                              path="monthlyTotal", index=0,
+                              path="workoutMinutes", window="this_month",
                               unit_of_measurement=UnitOfTime.MINUTES,
                               icon="mdi:weight-lifter",
                               state_class=SensorStateClass.MEASUREMENT,
@@ -117,7 +272,7 @@ WORKOUT_ENTITIES = (
 
     GymGroupEntityDescription(key="workout_duration_last_month",
                               translation_key="workout_duration_last_month",
-                              path="monthlyTotal", index=-1,
+                              path="workoutMinutes", window="last_month",
                               unit_of_measurement=UnitOfTime.MINUTES,
                               icon="mdi:weight-lifter",
                               state_class=SensorStateClass.MEASUREMENT,
@@ -126,7 +281,7 @@ WORKOUT_ENTITIES = (
 
     GymGroupEntityDescription(key="workout_duration_this_year",
                               translation_key="workout_duration_this_year",
-                              path="yearlyTotal", index=0,
+                              path="workoutMinutes", window="this_year",
                               unit_of_measurement=UnitOfTime.MINUTES,
                               icon="mdi:weight-lifter",
                               state_class=SensorStateClass.MEASUREMENT,
@@ -134,7 +289,7 @@ WORKOUT_ENTITIES = (
 
     GymGroupEntityDescription(key="workout_duration_last_year",
                               translation_key="workout_duration_last_year",
-                              path="yearlyTotal", index=-1,
+                              path="workoutMinutes", window="last_year",
                               unit_of_measurement=UnitOfTime.MINUTES,
                               icon="mdi:weight-lifter",
                               state_class=SensorStateClass.MEASUREMENT,
@@ -142,28 +297,73 @@ WORKOUT_ENTITIES = (
 
     GymGroupEntityDescription(key="workout_visits_this_month",
                               translation_key="workout_visits_this_month",
-                              path="monthlyVisitCount", index=0,
+                              path="workoutVisits", window="this_month",
                               icon="mdi:weight-lifter",
                               state_class=SensorStateClass.MEASUREMENT,
                              ),
 
     GymGroupEntityDescription(key="workout_visits_last_month",
                               translation_key="workout_visits_last_month",
-                              path="monthlyVisitCount", index=-1,
+                              path="workoutVisits", window="last_month",
                               icon="mdi:weight-lifter",
                               state_class=SensorStateClass.MEASUREMENT,
                              ),
 
     GymGroupEntityDescription(key="workout_visits_this_year",
                               translation_key="workout_visits_this_year",
-                              path="yearlyVisitCount", index=0,
+                              path="workoutVisits", window="this_year",
                               icon="mdi:weight-lifter",
                               state_class=SensorStateClass.MEASUREMENT,
                              ),
 
     GymGroupEntityDescription(key="workout_visits_last_year",
                               translation_key="workout_visits_last_year",
-                              path="yearlyVisitCount", index=-1,
+                              path="workoutVisits", window="last_year",
+                              icon="mdi:weight-lifter",
+                              state_class=SensorStateClass.MEASUREMENT,
+                             ),
+
+    GymGroupEntityDescription(key="workout_duration_last_7_days",
+                              translation_key="workout_duration_last_7_days",
+                              path="workoutMinutes", window="rolling_7",
+                              unit_of_measurement=UnitOfTime.MINUTES,
+                              icon="mdi:weight-lifter",
+                              state_class=SensorStateClass.MEASUREMENT,
+                             ),
+
+    GymGroupEntityDescription(key="workout_duration_last_30_days",
+                              translation_key="workout_duration_last_30_days",
+                              path="workoutMinutes", window="rolling_30",
+                              unit_of_measurement=UnitOfTime.MINUTES,
+                              icon="mdi:weight-lifter",
+                              state_class=SensorStateClass.MEASUREMENT,
+                             ),
+
+    GymGroupEntityDescription(key="workout_duration_last_90_days",
+                              translation_key="workout_duration_last_90_days",
+                              path="workoutMinutes", window="rolling_90",
+                              unit_of_measurement=UnitOfTime.MINUTES,
+                              icon="mdi:weight-lifter",
+                              state_class=SensorStateClass.MEASUREMENT,
+                             ),
+
+    GymGroupEntityDescription(key="workout_visits_last_7_days",
+                              translation_key="workout_visits_last_7_days",
+                              path="workoutVisits", window="rolling_7",
+                              icon="mdi:weight-lifter",
+                              state_class=SensorStateClass.MEASUREMENT,
+                             ),
+
+    GymGroupEntityDescription(key="workout_visits_last_30_days",
+                              translation_key="workout_visits_last_30_days",
+                              path="workoutVisits", window="rolling_30",
+                              icon="mdi:weight-lifter",
+                              state_class=SensorStateClass.MEASUREMENT,
+                             ),
+
+    GymGroupEntityDescription(key="workout_visits_last_90_days",
+                              translation_key="workout_visits_last_90_days",
+                              path="workoutVisits", window="rolling_90",
                               icon="mdi:weight-lifter",
                               state_class=SensorStateClass.MEASUREMENT,
                              ),
@@ -1,17 +1,47 @@
 import time
-import aiohttp
 import asyncio
+import hashlib
 import logging
-import operator as op
 import datetime as dt
+from typing import NamedTuple
 
-from homeassistant.const import CONF_PASSWORD, CONF_USERNAME
-from homeassistant.core import HomeAssistant
-from homeassistant.exceptions import ConfigEntryAuthFailed
-from homeassistant.helpers.event import async_track_time_change
-from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
+import aiohttp
 
-from .const import DOMAIN, DEFAULT_UPDATE_INTERVAL, EVENT_RESET
+from homeassistant.const import CONF_ID, CONF_PASSWORD, CONF_USERNAME
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.exceptions import ConfigEntryAuthFailed
+from homeassistant.helpers.event import (
+    async_track_point_in_utc_time,
+)
+from homeassistant.helpers.update_coordinator import UpdateFailed
+from homeassistant.util import dt as dt_util
+from homeassistant.util.json import json_loads
+
+from .aggregates import DailyTotals, ONE_DAY
+from .auth import parse_cookies
+from .checkins import CheckIn, CheckInStore, CheckInBatch
+from .forecast import OccupancyForecast
+from .pipelines import (
+    GymGroupUpdateCoordinator,
+    GymGroupOccupancyCoordinator,
+    GymGroupProfileCoordinator,
+)
+from .retry import RetryPolicy, CircuitBreaker, RequestRejected, retryable
+from .rollover import PeriodRollover
+from .schedule import PollSchedule
+from .stream import async_read_items
+from .telemetry import Telemetry
+from .const import (
+    DOMAIN,
+    DEFAULT_UPDATE_INTERVAL,
+    DEFAULT_CHECK_IN_WINDOW,
+    BURST_UPDATE_INTERVAL,
+    BURST_MAX_DURATION,
+    BURST_MAX_CALLS,
+    GYM_FETCH_TIMEOUT,
+    STREAM_CHUNK_SIZE,
+)
+from .store import encode_dt, decode_dt, encode_totals, decode_totals
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -21,29 +51,99 @@ def dt2str(ts):
     return ts.strftime("%Y-%m-%dT%H:%M:%S")
 
 
-def set_dt(c):
-    # add 1 hour for daylight savings
-    c['checkInDate'] = dt.datetime.fromisoformat(c['checkInDate']) \
-        + dt.timedelta(hours=time.localtime().tm_isdst)
-    c['duration'] = c['duration'] / 1000 / 60
-    return c
-
-
-class TheGymGroupCoordinator(DataUpdateCoordinator):
-    """Coordinator is responsible for querying the device at a specified route."""
-
-    def __init__(self, hass: HomeAssistant, entry,
-                 poll_interval=DEFAULT_UPDATE_INTERVAL):
+def endpoint_name(url):
+    """Name an API endpoint after the last part of its path."""
+    return url.split('?', 1)[0].rsplit('/', 1)[-1]
+
+
+def add_day_totals(totals, day, minutes, visits):
+    """Add a day's workout minutes and visits to each of the running totals."""
+    cal = day.isocalendar()
+    wk_ndx = (cal.year, cal.week)
+    mnth_ndx = (day.year, day.month)
+    yr_ndx = day.year
+    week_visits = totals["weeklyTotal"]
+    month_visits = totals["monthlyTotal"]
+    year_visits = totals["yearlyTotal"]
+    month_visit_count = totals["monthlyVisitCount"]
+    year_visit_count = totals["yearlyVisitCount"]
+    week_visits[wk_ndx] = week_visits.get(wk_ndx, 0) + minutes
+    month_visits[mnth_ndx] = month_visits.get(mnth_ndx, 0) + minutes
+    year_visits[yr_ndx] = year_visits.get(yr_ndx, 0) + minutes
+    month_visit_count[mnth_ndx] = month_visit_count.get(mnth_ndx, 0) + visits
+    year_visit_count[yr_ndx] = year_visit_count.get(yr_ndx, 0) + visits
+    totals["dailyTotals"].add(day, minutes, visits)
+
+
+class ResponseValidator(NamedTuple):
+    """What is known about the last response from an endpoint."""
+    etag: str
+    last_modified: str
+    digest: bytes
+
+    @property
+    def headers(self):
+        headers = {}
+        if self.etag:
+            headers["if-none-match"] = self.etag
+        if self.last_modified:
+            headers["if-modified-since"] = self.last_modified
+        return headers
+
+
+class TheGymGroupCoordinator(GymGroupUpdateCoordinator):
+    """Coordinator is responsible for querying the device at a specified route.
+
+    It owns the account's session and polls check ins itself. Occupancy and
+    the profile are polled by pipelines of their own.
+    """
+
+    def __init__(self, hass: HomeAssistant, entry, session=None, scheduler=None,
+                 store=None, schedule=None, retry=None, auth=None, gyms=(),
+                 journal=None,
+                 poll_interval=DEFAULT_UPDATE_INTERVAL,
+                 check_in_window=DEFAULT_CHECK_IN_WINDOW,
+                 gym_fetch_timeout=GYM_FETCH_TIMEOUT):
         """Initialise a custom coordinator."""
         self.entry = entry
+        self.session = session
+        self.scheduler = scheduler
+        self.store = store
+        self.journal = journal
+        self.check_in_window = check_in_window
+        self.gym_fetch_timeout = gym_fetch_timeout
+        self.poll_interval = poll_interval
+        self.schedule = schedule or PollSchedule(default_interval=poll_interval)
+        self.retry = retry or RetryPolicy()
+        self.forecast = OccupancyForecast()
+        self.breaker = CircuitBreaker()
+        self.telemetry = Telemetry()
+        self.auth = auth
+        self._login_task = None
+        self._unsub_session_refresh = None
+        self.account_id = entry.data[CONF_ID].split('@')[0]
+        self.profile = {}
+        self._tracked_gyms = tuple(dict.fromkeys(gyms))
+        # occupancy of the tracked gyms, by gym id
+        self.gyms = {}
         self.last_sync = dt.datetime(1970, 1, 1)
         self.last_updated = dt.datetime(1970, 1, 1)
         self.last_check_in = dt.datetime(1970, 1, 1)
-
-        super().__init__(hass, _LOGGER, name=DOMAIN,
-                         update_interval=poll_interval,
-                         update_method=self.async_refresh_data)
-        self.data = {}
+        self._occupancy = {}
+        self._validators = {}
+        self.refresh_cycles = 0
+        self.unchanged_cycles = 0
+        # unique id -> entities showing the sync time, see async_add_sync_entity
+        self._sync_entities = {}
+        self._burst_started = None
+        self._burst_calls = 0
+        self._burst_exhausted = False
+
+        super().__init__(hass, _LOGGER, name=f"{DOMAIN}_{self.account_id}",
+                         update_interval=poll_interval)
+        self.rollover = PeriodRollover(hass, self.async_update_snapshot)
+        self.occupancy_coordinator = GymGroupOccupancyCoordinator(hass, self)
+        self.profile_coordinator = GymGroupProfileCoordinator(hass, self)
 
         self.base_url = "https://thegymgroup.netpulse.com/np"
         self.headers = {
@@ -60,86 +160,540 @@ class TheGymGroupCoordinator(DataUpdateCoordinator):
                                 "applicationVersionCode=38"),
         }
 
-        # async_track_time_change(hass, self._async_reset, hour=23, minute=58, second=0)
-
-    async def async_login(self, attempt=0):
-        headers = {**self.headers,
-                   "content-length": "56",
-                   "content-type": "application/x-www-form-urlencoded"}
-
+    async def async_login(self):
         creds = {"username": self.entry.data[CONF_USERNAME],
                  "password": self.entry.data[CONF_PASSWORD]}
+        timeout = aiohttp.ClientTimeout(total=self.retry.timeout)
+        stats = self.telemetry.endpoint("login")
+
+        error = None
+        for attempt in range(self.retry.max_attempts):
+            if attempt:
+                stats.retries += 1
+                await asyncio.sleep(self.retry.delay(attempt))
+
+            started = time.monotonic()
+            try:
+                async with self.session.post(f"{self.base_url}/exerciser/login",
+                                             data=creds, timeout=timeout) as resp:
+                    body = await resp.read()
+                    stats.record(resp.status, time.monotonic() - started,
+                                 len(body))
+                    if resp.status == 401:
+                        msg = f"Login failure: {body.decode(errors='replace')}"
+                        _LOGGER.error(msg)
+                        raise ConfigEntryAuthFailed(msg)
+
+                    resp.raise_for_status()
+                    set_cookies = resp.headers.getall("Set-Cookie", [])
+                    data = json_loads(body)
+            except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+                # responses were recorded when they arrived
+                if not isinstance(e, (aiohttp.ClientResponseError, ValueError)):
+                    stats.record(type(e).__name__, time.monotonic() - started)
+                _LOGGER.warning(f"login failed, attempt {attempt + 1}: {e!r}")
+                error = e
+                continue
+
+            if self.auth is None:
+                cookie, _ = parse_cookies(set_cookies, dt_util.utcnow())
+            else:
+                cookie = await self.auth.async_update(set_cookies, data)
+                self._schedule_session_refresh()
+
+            self.headers["cookie"] = cookie
+            self.profile = data
+            # the login answers with the profile, no need to fetch it again yet
+            self.profile_coordinator.async_set_updated_data(dict(data))
+            return True
+
+        raise UpdateFailed(f"Login failed: {error!r}")
+
+    async def async_relogin(self, cookie):
+        """Log in again after `cookie` was rejected.
+
+        Every request that failed with the same cookie waits on one login.
+        """
+        if self.headers.get("cookie") != cookie:
+            # already replaced since the request was made
+            return
+
+        if self._login_task is None or self._login_task.done():
+            self.telemetry.endpoint("login").relogins += 1
+            self._login_task = self.hass.async_create_task(self.async_login())
+        await asyncio.shield(self._login_task)
+
+    async def async_ensure_session(self):
+        """Log in if there is no session, pipelines share a single login."""
+        if "cookie" in self.headers:
+            return
+
+        if self._login_task is None or self._login_task.done():
+            self._login_task = self.hass.async_create_task(self.async_login())
+        await asyncio.shield(self._login_task)
+
+    async def async_start_session(self):
+        """Reuse the stored session, only logging in if it has run out."""
+        if self.auth is not None:
+            if self.auth.valid:
+                _LOGGER.debug(f"Reusing {self.name} session until "
+                              f"{self.auth.refresh_at}")
+                self.headers["cookie"] = self.auth.cookie
+                self.profile = self.auth.profile
+                self.profile_coordinator.async_set_updated_data(dict(self.profile))
+                self._schedule_session_refresh()
+                return True
+
+        return await self.async_login()
+
+    async def async_start(self):
+        """Log in and refresh, entities show their restored state until done."""
+        try:
+            await self.async_start_session()
+        except (UpdateFailed, ConfigEntryAuthFailed) as e:
+            # the refresh tries to log in again
+            _LOGGER.warning(f"Unable to log in {self.name}: {e}")
+
+        await asyncio.gather(self.occupancy_coordinator.async_refresh(),
+                             self.async_refresh())
+
+    @callback
+    def _schedule_session_refresh(self):
+        if self._unsub_session_refresh is not None:
+            self._unsub_session_refresh()
+        self._unsub_session_refresh = async_track_point_in_utc_time(
+            self.hass, self._async_refresh_session, self.auth.refresh_at)
+
+    async def _async_refresh_session(self, now):
+        """Log in again in the background before the cookie expires."""
+        self._unsub_session_refresh = None
+        try:
+            await self.async_relogin(self.headers.get("cookie"))
+        except (UpdateFailed, ConfigEntryAuthFailed) as e:
+            _LOGGER.warning(f"Unable to refresh {self.name} session: {e}")
+
+    async def async_shutdown(self):
+        self.rollover.async_cancel()
+        if self.journal is not None:
+            await self.journal.async_close()
+        await self.occupancy_coordinator.async_shutdown()
+        await self.profile_coordinator.async_shutdown()
+        if self._unsub_session_refresh is not None:
+            self._unsub_session_refresh()
+            self._unsub_session_refresh = None
+        await super().async_shutdown()
+
+    @property
+    def gym_id(self):
+        return self.profile.get("homeClubUuid")
+
+    @property
+    def tracked_gyms(self):
+        """Other gyms to fetch occupancy for, the home gym is always fetched."""
+        return tuple(gym_id for gym_id in self._tracked_gyms
+                     if gym_id != self.gym_id)
+
+    def as_stored(self):
+        """Return the sync state persisted between restarts."""
+        data = self.data or {}
+        return {
+            "last_sync": encode_dt(self.last_sync),
+            "last_updated": encode_dt(self.last_updated),
+            "last_check_in": encode_dt(self.last_check_in),
+            "gymPresence": data.get("gymPresence", "off"),
+            "checkIns": [c.as_dict() for c in data.get("checkIns", [])],
+            "totals": encode_totals(data),
+            "daily": data.get("dailyTotals", DailyTotals()).as_dict(),
+            "schedule": self.schedule.as_dict(),
+            "forecast": self.forecast.as_dict(),
+            "gyms": self.gyms,
+            "occupancy": {key: value
+                          for key, value in self.occupancy_coordinator.data.items()
+                          if key != "gyms"},
+        }
+
+    def restore(self, stored):
+        """Resume from persisted state so the next refresh only fetches the delta."""
+        if not stored:
+            return
+
+        epoch = dt.datetime(1970, 1, 1)
+        self.last_sync = decode_dt(stored.get("last_sync"), epoch)
+        self.last_updated = decode_dt(stored.get("last_updated"), epoch)
+        self.last_check_in = decode_dt(stored.get("last_check_in"), epoch)
+        self.data = {
+            "gymPresence": stored.get("gymPresence", "off"),
+            "checkIns": CheckInStore(
+                map(CheckIn.from_response, stored.get("checkIns", [])),
+                maxlen=self.check_in_window),
+            **decode_totals(stored.get("totals", {})),
+            "dailyTotals": DailyTotals.from_dict(stored.get("daily", {})),
+        }
+        self.schedule.restore(stored.get("schedule", {}))
+        self.forecast.restore(stored.get("forecast", {}))
+        self.gyms = {gym_id: gym_data
+                     for gym_id, gym_data in stored.get("gyms", {}).items()
+                     if gym_id in self._tracked_gyms}
+        self.occupancy_coordinator.data = {**stored.get("occupancy", {}),
+                                           "gyms": dict(self.gyms)}
+        _LOGGER.debug(f"Restored {self.name} sync state from {self.last_sync}")
+
+    async def async_rebuild_totals(self):
+        """Rebuild the totals from the journal, eg. when the stored state is lost.
+
+        Only check ins from the day of the newest one are loaded, the next
+        refresh fetches history from that day.
+        """
+        journal = self.journal
+        newest = journal.newest
+        if newest is None:
+            return
+
+        since = dt.datetime.combine(newest.date(), dt.time.min)
+        days, check_ins = await asyncio.gather(
+            self.hass.async_add_executor_job(journal.day_totals),
+            self.hass.async_add_executor_job(journal.check_ins, since))
+        self.data = {}
+        totals = self.totals()
+        for day, (minutes, visits) in days.items():
+            add_day_totals(totals, day, minutes, visits)
+
+        latest = check_ins[-1] if check_ins else None
+        self.data = {
+            "gymPresence": "on" if latest and latest.duration_ms == 0 else "off",
+            "checkIns": CheckInStore(check_ins, maxlen=self.check_in_window),
+            **totals,
+        }
+        self.last_sync = since
+        self.last_check_in = newest
+        _LOGGER.info(f"Rebuilt {self.name} totals of {len(days)} days from "
+                     f"its journal")
+
+    async def async_restore(self):
+        if self.journal is not None:
+            await self.journal.async_open()
+        if self.store is not None:
+            self.restore(await self.store.async_load())
+        if not self.data and self.journal is not None:
+            if self.journal.complete:
+                # nothing stored, the journal still has every check in synced
+                await self.async_rebuild_totals()
+            else:
+                # it may have gaps, journal all history as it is synced again
+                await self.hass.async_add_executor_job(self.journal.reset)
+        if self.auth is not None:
+            await self.auth.async_load()
+            self.profile = self.auth.profile or {}
+        self.profile_coordinator.data = dict(self.profile)
+
+    async def async_save(self):
+        if self.store is not None:
+            await self.store.async_save(self.as_stored())
+
+    async def fetch(self, url, cache_key=None, check_ins=None):
+        """Fetch json from the API.
+
+        With a cache_key the request is conditional on the last response for
+        that key, None is returned if the response hasn't changed since.
+
+        With a CheckInBatch as `check_ins` the check ins are folded into it
+        as the response arrives and the batch is returned, the body is never
+        held in memory as a whole.
+        """
+        timeout = aiohttp.ClientTimeout(total=self.retry.timeout)
+        stats = self.telemetry.endpoint(endpoint_name(url))
+
+        error = None
+        for attempt in range(self.retry.max_attempts):
+            if attempt:
+                stats.retries += 1
+                await asyncio.sleep(self.retry.delay(attempt))
+
+            headers = self.headers
+            cookie = headers.get("cookie")
+            validator = self._validators.get(cache_key)
+            if validator is not None:
+                headers = {**headers, **validator.headers}
+
+            started = time.monotonic()
+            try:
+                async with self.session.get(f"{self.base_url}/{url}",
+                                            headers=headers,
+                                            timeout=timeout) as response:
+                    if response.status == 304 and validator is not None:
+                        stats.record(response.status, time.monotonic() - started)
+                        return None
+
+                    if response.status != 200:
+                        err = await response.text()
+                        stats.record(response.status, time.monotonic() - started,
+                                     len(err))
+                        _LOGGER.warning(f"failed for {url}: {response.status}: {err}")
+                        error = f"{response.status}: {err}"
+                        if not retryable(response.status):
+                            raise RequestRejected(f"Failed fetching {url}: {error}")
+                        if response.status in (401, 403):
+                            await self.async_relogin(cookie)
+                        continue
+
+                    if check_ins is None:
+                        body = await response.read()
+                        size = len(body)
+                    else:
+                        check_ins.reset()
+                        size, digest = await async_read_items(
+                            response.content, "checkIns", check_ins,
+                            STREAM_CHUNK_SIZE)
+                    stats.record(response.status, time.monotonic() - started,
+                                 size)
+            except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+                stats.record(type(e).__name__, time.monotonic() - started)
+                _LOGGER.warning(f"failed for {url}: {e!r}")
+                error = repr(e)
+                continue
+
+            if cache_key is not None:
+                # fall back to comparing content when validators aren't supported
+                if check_ins is None:
+                    digest = hashlib.sha1(body).digest()
+                self._validators[cache_key] = ResponseValidator(
+                    response.headers.get("ETag"),
+                    response.headers.get("Last-Modified"),
+                    digest)
+                if validator is not None and validator.digest == digest:
+                    return None
+
+            return json_loads(body) if check_ins is None else check_ins
+
+        raise UpdateFailed(f"Failed fetching {url} after "
+                           f"{self.retry.max_attempts} attempts: {error}")
+
+    async def async_fetch_occupancy(self, gym_id):
+        user_id = self.profile["uuid"]
+        gym_data = await self.fetch(
+            f"thegymgroup/v1.0/exerciser/{user_id}/gym-busyness?"
+            f"gymLocationId={gym_id}",
+            cache_key=f"occupancy/{gym_id}"
+        )
+        if gym_data is not None:
+            self._occupancy[gym_id] = gym_data
+        return dict(self._occupancy[gym_id])
+
+    def history_url(self, start, end):
+        start_date = ''
+        if start:
+            start_date = f"startDate={dt2str(start)}"
 
-        async with aiohttp.ClientSession() as session:
-            async with session.post(f"{self.base_url}/exerciser/login",
-                                    data=creds) as resp:
-                if resp.status == 401:
-                    msg = f"Login failure: {resp.text}"
-                    _LOGGER.error(msg)
-                    raise ConfigEntryAuthFailed(msg)
-
-                try:
-                    cookie = resp.headers.get("Set-Cookie")
-                    data = await resp.json()
-                except Exception as e:
-                    _LOGGER.critical(f"login failed: {resp.status} {e}")
-                    await asyncio.sleep(attempt)
-                    await self.async_login(2 ** attempt)
-
-        self.headers["cookie"] = cookie
-        self.profile = data
-
-        return True
-
-    async def _async_reset(self, *args):
-        _LOGGER.info("Resetting thegymgroup sensor {}!".format(self.name))
-        self.data.pop("checkIns", None)
-        self.hass.bus.fire(f"{self.name}_{EVENT_RESET}")
-
-    async def fetch(self, url, session, attempt=0):
-        async with session.get(f"{self.base_url}/{url}", headers=self.headers) \
-                as response:
-            if response.status != 200:
-                err = await response.text()
-                _LOGGER.error(f"failed for {url}: {response.status}: {err}")
-                await asyncio.sleep(attempt)
-                await self.async_login()
-                return await self.fetch(url, session, 2 ** attempt)
-
-            return await response.json()
-
-    async def async_refresh_data(self):
-        """Fetch the data from the device."""
         user_id = self.profile["uuid"]
-        gym_id = self.profile["homeClubUuid"]
-        url = (f"{self.base_url}/exerciser/{user_id}/"
-               f"gym-busyness?gymLocationId={gym_id}")
-
-        async with aiohttp.ClientSession() as session:
-            # sync current occupancy
-            gym_occupancy = self.fetch(
-                f"thegymgroup/v1.0/exerciser/{user_id}/gym-busyness?"
-                f"gymLocationId={gym_id}",
-                session
-            )
-
-            start_date = ''
-            if self.last_sync:
-                start_date = f"startDate={dt2str(self.last_sync)}"
-
-            # sync gym visits
-            gym_visit = self.fetch(
-                f"exercisers/{user_id}/check-ins/history?"
-                f"{start_date}&endDate={dt2str(dt.datetime.now())}",
-                session
-            )
-
-            gym_data, visits = await asyncio.gather(gym_occupancy, gym_visit)
+        return (f"exercisers/{user_id}/check-ins/history?"
+                f"{start_date}&endDate={dt2str(end)}")
+
+    async def async_fetch_history(self, url, cache_key=None, check_ins=None):
+        if self.scheduler is None:
+            return await self.fetch(url, cache_key=cache_key, check_ins=check_ins)
+
+        # limit history fetches in flight across all accounts
+        async with self.scheduler.history_limit:
+            return await self.fetch(url, cache_key=cache_key, check_ins=check_ins)
+
+    def check_in_batch(self):
+        """Start a batch of check ins from today not processed yet."""
+        # last "check in" is always shown, ignore if it's already been processed
+        today = dt.datetime.combine(self.last_sync.date(), dt.time.min)
+        check_ins = self.data.get("checkIns") if self.data else None
+        return CheckInBatch(check_ins, today, maxlen=self.check_in_window,
+                            journal=self.journal)
+
+    @callback
+    def async_add_sync_entity(self, entity):
+        """Write an entity on refreshes that only move the sync time.
+
+        Returns a callback to stop.
+        """
+        key = entity.unique_id
+        self._sync_entities[key] = entity
+
+        @callback
+        def remove():
+            self._sync_entities.pop(key, None)
+        return remove
+
+    @callback
+    def _async_synced_unchanged(self):
+        self.last_sync = dt.datetime.now(dt.timezone.utc)
+        if self.store is not None:
+            self.store.async_schedule_save(self.as_stored)
+        # listeners are skipped, only the sync time entities are written
+        self.async_update_snapshot(list(self._sync_entities))
+        for entity in self._sync_entities.values():
+            entity.async_write_state_if_changed()
+
+    @callback
+    def async_set_occupancy(self, gym_id, gym_data):
+        """Update occupancy of a gym fetched by another account."""
+        occupancy = self.occupancy_coordinator
+        if gym_id in self.tracked_gyms:
+            self.gyms[gym_id] = gym_data
+            data = {**occupancy.data, "gyms": dict(self.gyms)}
+        elif gym_id == self.gym_id:
+            data = {**occupancy.data, **gym_data}
+        else:
+            return
+        # counts as this cycle's fetch, the next one is pushed back
+        occupancy.async_set_updated_data(data)
+
+    async def async_sync_occupancy(self, gym_id):
+        # shared with other accounts at the same gym
+        if self.scheduler is None:
+            return await self.async_fetch_occupancy(gym_id)
+        return await self.scheduler.async_get_occupancy(self, gym_id)
+
+    async def _async_fetch_gym(self, gym_id):
+        if self.scheduler is None:
+            fetch = self.async_fetch_occupancy(gym_id)
+        else:
+            fetch = self.scheduler.async_get_occupancy(self, gym_id)
+        return await asyncio.wait_for(fetch, self.gym_fetch_timeout)
+
+    async def async_sync_gyms(self):
+        """Fetch the tracked gyms together, return True if any changed.
+
+        A gym that fails or is too slow keeps its last occupancy until the
+        next cycle instead of holding up the others.
+        """
+        gym_ids = self.tracked_gyms
+        results = await asyncio.gather(*map(self._async_fetch_gym, gym_ids),
+                                       return_exceptions=True)
+
+        changed = False
+        for gym_id, gym_data in zip(gym_ids, results):
+            if isinstance(gym_data, BaseException):
+                _LOGGER.warning(f"Unable to fetch occupancy for gym {gym_id}: "
+                                f"{gym_data!r}")
+                continue
+            if gym_data != self.gyms.get(gym_id):
+                self.gyms[gym_id] = gym_data
+                changed = True
+        return changed
+
+    @property
+    def bursting(self):
+        return self._burst_started is not None
+
+    def _update_burst(self, gym_presence, status=None):
+        """Poll check ins quickly while at the gym, up to the burst limits."""
+        now = time.monotonic()
+        if gym_presence != "on":
+            if self.bursting:
+                _LOGGER.debug(f"Checked out, {self.name} ending burst after "
+                              f"{self._burst_calls} polls")
+            self._burst_started = None
+            self._burst_exhausted = False
+
+        elif not self.bursting and not self._burst_exhausted:
+            _LOGGER.debug(f"Checked in, {self.name} starting burst polling")
+            self._burst_started = now
+            self._burst_calls = 0
+
+        elif self.bursting:
+            self._burst_calls += 1
+            if now - self._burst_started >= BURST_MAX_DURATION.total_seconds() or \
+                    self._burst_calls >= BURST_MAX_CALLS:
+                _LOGGER.debug(f"Burst limit reached, {self.name} slowing down")
+                self._burst_started = None
+                # don't burst again until checked out
+                self._burst_exhausted = True
+
+        if self.bursting:
+            self.update_interval = BURST_UPDATE_INTERVAL
+        else:
+            # poll less often when the member isn't likely to be at the gym
+            self.update_interval = self.schedule.next_interval(dt_util.now(),
+                                                               status)
+
+    async def _async_refresh_data(self):
+        await self.async_ensure_session()
+
+        # sync gym visits
+        # new check ins are picked out as the response arrives
+        visits = await self.async_fetch_history(
+            self.history_url(self.last_sync, dt.datetime.now()),
+            cache_key="history", check_ins=self.check_in_batch())
+
+        # the schedule stretches while the gym is closed
+        status = self.occupancy_coordinator.data.get("status")
+        self.refresh_cycles += 1
+        if visits is None and self.data:
+            # nothing changed upstream, keep the same data so listeners are skipped
+            self.unchanged_cycles += 1
+            self._async_synced_unchanged()
+            self._update_burst(self.data["gymPresence"], status)
+            return self.data
+
+        if visits is None:
+            visits = self.check_in_batch()
 
         sync_dt = dt.datetime.now(dt.timezone.utc)
-        return self.build_visit_data(sync_dt, gym_data, visits)
+        data = self.build_visit_data(sync_dt, {}, visits)
+        self._update_burst(data["gymPresence"], status)
+        return data
+
+    def totals(self):
+        """The running workout totals, empty ones if nothing is synced yet."""
+        data = self.data or {}
+        daily_totals = data.get("dailyTotals")
+        return {
+            "weeklyTotal": data.get("weeklyTotal", {}),
+            "monthlyTotal": data.get("monthlyTotal", {}),
+            "yearlyTotal": data.get("yearlyTotal", {}),
+            "monthlyVisitCount": data.get("monthlyVisitCount", {}),
+            "yearlyVisitCount": data.get("yearlyVisitCount", {}),
+            "dailyTotals": DailyTotals() if daily_totals is None else daily_totals,
+        }
+
+    @callback
+    def async_merge_history(self, windows):
+        """Replace the totals of resynced days, window by window in date order.
+
+        `windows` are (start, end, CheckInBatch) of the days in [start, end).
+        """
+        data = dict(self.data or {})
+        totals = self.totals()
+        daily_totals = totals["dailyTotals"]
+        # synced check ins replace the stored ones, eg. given a duration since
+        newest = {check_in.key: check_in for check_in in data.get("checkIns", ())}
+        for start, end, batch in windows:
+            day = start
+            while day < end:
+                # only the difference to what was counted before is added
+                minutes, visits = batch.days.get(day, (0, 0))
+                counted_minutes, counted_visits = daily_totals.total(day,
+                                                                     day + ONE_DAY)
+                if (minutes, visits) != (counted_minutes, counted_visits):
+                    add_day_totals(totals, day, minutes - counted_minutes,
+                                   visits - counted_visits)
+                day += ONE_DAY
+            newest.update((check_in.key, check_in) for check_in in batch.newest)
+            if self.journal is not None:
+                self.journal.async_append(batch.records)
+
+        data["checkIns"] = CheckInStore(
+            sorted(newest.values(), key=lambda check_in: check_in.check_in_date),
+            maxlen=self.check_in_window)
+        data.update(totals)
+        data.setdefault("gymPresence", "off")
+
+        if self.store is not None:
+            self.store.async_schedule_save(self.as_stored)
+        self.async_set_updated_data(data)
 
     def build_visit_data(self, sync_dt, gym_data, visits):
+        """Fold new check ins into the totals.
+
+        `visits` is either a CheckInBatch already filled from a streamed
+        response, or a history response.
+        """
+        started = time.perf_counter()
         last_updated = self.last_updated
 
         # totals = self.data.get("totals", {})
@@ -147,58 +701,44 @@ class TheGymGroupCoordinator(DataUpdateCoordinator):
                                  # self.data.get("weeklyTotal", {}))
         # month_visits = totals.get("totals",
                                   # self.data.get("monthlyTotal", {}))
-        new_check_ins = visits.get("checkIns")
-        check_ins = self.data.get("checkIns", [])
+        batch = visits
+        if not isinstance(batch, CheckInBatch):
+            batch = self.check_in_batch()
+            batch.extend(visits.get("checkIns", []))
+        check_ins = self.data.get("checkIns")
+        if check_ins is None:
+            check_ins = CheckInStore(maxlen=self.check_in_window)
         gym_presence = self.data.get("gymPresence", "off")
-        week_visits = self.data.get("weeklyTotal", {})
-        month_visits = self.data.get("monthlyTotal", {})
-        year_visits = self.data.get("yearlyTotal", {})
-        month_visit_count = self.data.get("monthlyVisitCount", {})
-        year_visit_count = self.data.get("yearlyVisitCount", {})
+        totals = self.totals()
 
-        # last "check in" is always shown, ignore if it's already been processed
-        today = dt.datetime.combine(self.last_sync.date(), dt.time.min)
-        # check in will be after sync time
-        last_check_in = max(today, self.last_check_in)
-        todays_check_ins = sorted(filter(lambda c: c['checkInDate'] > today,
-                                         map(set_dt, new_check_ins)),
-                                  key=op.itemgetter('checkInDate'),
-                                  reverse=False)
-
-        # for check_in in unseen_check_ins:
-        for check_in in todays_check_ins:
-            # an unseen check in
-            if check_in not in check_ins:
-                duration = check_in['duration']
-                check_in_date = check_in['checkInDate']
-                self.last_check_in = check_in_date
-                check_ins = check_ins + [check_in]
-                last_updated = sync_dt
-
-                if duration > 0:
-                    gym_presence = "off"
-                    cal = check_in_date.isocalendar()
-                    wk_ndx = (cal.year, cal.week)
-                    mnth_ndx = (check_in_date.year, check_in_date.month)
-                    yr_ndx = check_in_date.year
-                    week_visits[wk_ndx] = week_visits.get(wk_ndx, 0) + duration
-                    month_visits[mnth_ndx] = month_visits.get(mnth_ndx, 0) + duration
-                    year_visits[yr_ndx] = year_visits.get(yr_ndx, 0) + duration
-                    month_visit_count[mnth_ndx] = month_visit_count.get(mnth_ndx, 0) + 1
-                    year_visit_count[yr_ndx] = year_visit_count.get(yr_ndx, 0) + 1
-                else:
-                    gym_presence = "on"
-
-        _LOGGER.debug(f"Found {len(visits)} since {self.last_sync}")
+        # the batch only holds unseen check ins, or ones since given a duration
+        for day, (duration, visit) in sorted(batch.days.items()):
+            add_day_totals(totals, day, duration, visit)
+
+        self.schedule.add_slots(batch.slots)
+        if self.journal is not None:
+            self.journal.async_append(batch.records)
+        for check_in in batch.newest:
+            check_ins.add(check_in)
 
+        if (latest := batch.latest) is not None:
+            # still at the gym until the newest check in has a duration
+            gym_presence = "off" if latest.duration_ms > 0 else "on"
+            self.last_check_in = latest.check_in_date
+            last_updated = sync_dt
+
+        _LOGGER.debug(f"Found {len(batch)} since {self.last_sync}")
+
+        gym_data["lastSync"] = sync_dt
         gym_data["gymPresence"] = gym_presence
         gym_data["checkIns"] = check_ins
-        gym_data["weeklyTotal"] = week_visits
-        gym_data["monthlyTotal"] = month_visits
-        gym_data["yearlyTotal"] = year_visits
-        gym_data["monthlyVisitCount"] = month_visit_count
-        gym_data["yearlyVisitCount"] = year_visit_count
+        gym_data.update(totals)
 
         self.last_sync = sync_dt
         self.last_updated = last_updated
+
+        if self.store is not None:
+            self.store.async_schedule_save(self.as_stored)
+
+        self.telemetry.record_build(time.perf_counter() - started)
         return gym_data
@@ -0,0 +1,37 @@
+"""Diagnostics support for The Gym Group integration."""
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import CONF_ID, CONF_PASSWORD, CONF_USERNAME
+from homeassistant.core import HomeAssistant
+
+from .const import DATA_COORDINATOR, DOMAIN
+
+TO_REDACT = {CONF_ID, CONF_PASSWORD, CONF_USERNAME, "title", "unique_id"}
+
+
+async def async_get_config_entry_diagnostics(hass: HomeAssistant,
+                                             entry: ConfigEntry):
+    """Return diagnostics for a config entry."""
+    coordinator = hass.data[DOMAIN][entry.entry_id][DATA_COORDINATOR]
+
+    return {
+        "entry": async_redact_data(entry.as_dict(), TO_REDACT),
+        "update_interval": coordinator.update_interval.total_seconds(),
+        "refresh": {
+            "cycles": coordinator.refresh_cycles,
+            "unchanged": coordinator.unchanged_cycles,
+        },
+        "pipelines": {
+            pipeline.name: {
+                "update_interval": pipeline.update_interval.total_seconds(),
+                "last_update_success": pipeline.last_update_success,
+            }
+            for pipeline in (coordinator, coordinator.occupancy_coordinator,
+                             coordinator.profile_coordinator)
+        },
+        "poll_schedule": coordinator.schedule.as_diagnostics(),
+        "forecast": coordinator.forecast.as_dict(),
+        "telemetry": coordinator.telemetry.as_dict(),
+        "journal": (coordinator.journal.as_diagnostics()
+                    if coordinator.journal is not None else None),
+    }
@@ -1,41 +1,112 @@
+import operator
+import functools
+from types import MappingProxyType
+from typing import Any, Mapping, NamedTuple
+
+from homeassistant.core import callback
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
+from homeassistant.util import dt as dt_util
 
 from .const import DOMAIN
 
 
+class EntityState(NamedTuple):
+    """An entity's value and attributes, as of the last coordinator update."""
+    value: Any
+    attributes: Mapping
+
+
+@functools.lru_cache(maxsize=None)
+def compile_path(path):
+    """Return a function reading `path`, eg. `profile/customInfo.accountStatus`,
+    from a coordinator, so the path is only split once.
+    """
+    field, locs = path.split('/')
+    get_field = operator.attrgetter(field)
+    locs = tuple(locs.split('.'))
+
+    def get_value(coordinator):
+        data = get_field(coordinator)
+        for loc in locs:
+            if data:
+                data = data.get(loc)
+        return data
+
+    return get_value
+
+
 class GymGroupBaseEntity(CoordinatorEntity):
     def __init__(self, unique_id, coordinator, description):
         super().__init__(coordinator)
 
         self._unique_id = unique_id
         self.entity_description = description
-        self._attr_unique_id = f"{coordinator.name}_{description.translation_key}"
+        self._attr_unique_id = f"{unique_id}_{description.translation_key}"
         self._attr_has_entity_name = True
+        self._restored_value = None
+        self._compute_value = self.compile_value(description)
+        # what the state machine was last given, see async_write_state_if_changed
+        self._written = None
+
+    async def async_added_to_hass(self):
+        """Have the coordinator materialise this entity's state on each update."""
+        await super().async_added_to_hass()
+        self.async_on_remove(self.coordinator.async_add_snapshot_source(
+            self._attr_unique_id, self.compute_state))
+
+    def compile_value(self, description):
+        """Return a function computing the entity's value at `now`."""
+        get_value = compile_path(description.path)
+        return lambda now: get_value(self.coordinator)
 
     def get_value(self, path):
         """Return the state of the sensor."""
-        field, locs = path.split('/')
-        locs = locs.split('.')
+        return compile_path(path)(self.coordinator)
 
-        data = getattr(self.coordinator, field)
-        for loc in locs:
-            if data:
-                data = data.get(loc)
+    def compute_attributes(self, now):
+        """Sensor attributes"""
+        return {}
 
-        return data
+    def compute_state(self, now):
+        return EntityState(self._compute_value(now),
+                           MappingProxyType(self.compute_attributes(now)))
 
     @property
-    def extra_state_attributes(self):
-        """Sensor attributes"""
-        if not self.coordinator.data:
-            return {}
+    def snapshot(self):
+        """The state computed at the last update, property reads only look it up."""
+        state = self.coordinator.snapshot.get(self._attr_unique_id)
+        if state is None:
+            # not added to hass, nothing is kept up to date
+            state = self.compute_state(dt_util.now())
+        return state
 
-        attributes = {
-            "last_synced": self.coordinator.last_sync,
-            "last_updated": self.coordinator.last_updated,
-        }
+    @callback
+    def async_write_state_if_changed(self):
+        """Write the state, unless it is what was last written.
+
+        Refreshes that only move the sync time don't add a state to the
+        recorder for every entity.
+        """
+        written = (self.available, self.coordinator.refreshed, self.snapshot)
+        if written == self._written:
+            return
+        self._written = written
+        self.async_write_ha_state()
+
+    @callback
+    def _handle_coordinator_update(self):
+        self.async_write_state_if_changed()
 
-        return attributes
+    def restored(self, value):
+        """Fall back to the last known state until the first refresh."""
+        if value is None and not self.coordinator.refreshed:
+            return self._restored_value
+        return value
+
+    @property
+    def extra_state_attributes(self):
+        """Sensor attributes"""
+        return self.snapshot.attributes
 
     @property
     def device_info(self):
@@ -48,9 +119,37 @@ class GymGroupBaseEntity(CoordinatorEntity):
     @property
     def entity_registry_enabled_default(self):
         """if entity should be enabled when first added to the entity registry"""
-        # return self._enabled_default
-        return True
+        return self.entity_description.entity_registry_enabled_default
 
     @property
     def available(self):
-        return super().available and self.coordinator.data
+        return super().available and bool(self.coordinator.data)
+
+
+class GymGroupTrackedGymEntity(GymGroupBaseEntity):
+    """Entity of another gym tracked by an account, on a device of its own."""
+
+    def __init__(self, unique_id, coordinator, description, gym_id):
+        # needed to compile the value
+        self.gym_id = gym_id
+        super().__init__(unique_id, coordinator, description)
+
+        self._attr_unique_id = f"{unique_id}_{gym_id}_{description.translation_key}"
+
+    def compile_value(self, description):
+        _, loc = description.path.split('/')
+        return lambda now: self.coordinator.gyms.get(self.gym_id, {}).get(loc)
+
+    def get_value(self, path):
+        """Return the value from the tracked gym's occupancy."""
+        _, loc = path.split('/')
+        return self.coordinator.gyms.get(self.gym_id, {}).get(loc)
+
+    @property
+    def device_info(self):
+        return {
+            "identifiers": {(DOMAIN, self.gym_id)},
+            "name": self.get_value("data/gymLocationName") or self.gym_id,
+            "manufacturer": "The Gym Group",
+            "via_device": (DOMAIN, self._unique_id),
+        }
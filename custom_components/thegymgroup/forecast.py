@@ -0,0 +1,89 @@
+"""Occupancy forecast for The Gym Group integration."""
+import math
+import datetime as dt
+from array import array
+
+from .const import FORECAST_DECAY
+from .schedule import SLOTS, slot
+
+
+def parse_hour(label):
+    """Convert a busyness label such as `12AM` or `2PM` to an hour of day."""
+    hour = int(label[:-2]) % 12
+    return hour + 12 if label[-2:].upper() == "PM" else hour
+
+
+class OccupancyForecast:
+    """Expected gym occupancy for each weekday and hour.
+
+    Every value seen for a slot is blended in with exponential decay, so the
+    table follows changes in how busy the gym is while older weeks fade
+    out. The gym's own busyness curve is folded in once a day and our
+    `currentPercentage` samples on every refresh.
+    """
+
+    def __init__(self, decay=FORECAST_DECAY):
+        self.decay = decay
+        self.table = array('f', [math.nan] * SLOTS)
+        self.historical_date = None
+
+    def _add(self, ndx, value):
+        current = self.table[ndx]
+        if math.isnan(current):
+            self.table[ndx] = value
+        else:
+            self.table[ndx] = current + self.decay * (value - current)
+
+    def add_historical(self, now, historical):
+        """Fold in the gym's busyness curve for today, once per day."""
+        if not historical or self.historical_date == now.date():
+            return
+
+        day = now.weekday() * 24
+        for point in historical:
+            try:
+                hour = parse_hour(point["hour"])
+                percentage = float(point["percentage"])
+            except (KeyError, TypeError, ValueError):
+                continue
+            # the curve has a point every two hours
+            self._add(day + hour, percentage)
+            self._add(day + (hour + 1) % 24, percentage)
+        self.historical_date = now.date()
+
+    def add_sample(self, now, percentage):
+        if percentage is not None:
+            self._add(slot(now), float(percentage))
+
+    def add_occupancy(self, now, gym_data):
+        self.add_historical(now, gym_data.get("historical"))
+        self.add_sample(now, gym_data.get("currentPercentage"))
+
+    def expected(self, when):
+        """Expected occupancy percentage at a time, None if not known yet."""
+        value = self.table[slot(when)]
+        return None if math.isnan(value) else round(value)
+
+    def quietest_today(self, now):
+        """Start of the quietest hour left today, None if not known yet."""
+        day = now.weekday() * 24
+        hours = [(self.table[day + hour], hour) for hour in range(now.hour, 24)
+                 if not math.isnan(self.table[day + hour])]
+        if not hours:
+            return None
+        _, hour = min(hours)
+        return now.replace(hour=hour, minute=0, second=0, microsecond=0)
+
+    def as_dict(self):
+        return {
+            "table": [None if math.isnan(v) else round(v, 2) for v in self.table],
+            "historical_date": (self.historical_date.isoformat()
+                                if self.historical_date else None),
+        }
+
+    def restore(self, data):
+        table = data.get("table", ())
+        if len(table) == SLOTS:
+            self.table = array('f', [math.nan if v is None else v for v in table])
+        if historical_date := data.get("historical_date"):
+            self.historical_date = dt.date.fromisoformat(historical_date)
@@ -0,0 +1,94 @@
+"""Fetch a range of check in history as windows in parallel."""
+import asyncio
+import logging
+import datetime as dt
+
+from homeassistant.helpers.update_coordinator import UpdateFailed
+
+from .aggregates import ONE_DAY
+from .checkins import CheckInBatch, LocalDateFilter
+from .const import SYNC_HISTORY_WINDOW, SYNC_HISTORY_CONCURRENCY
+from .retry import RequestRejected
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def history_windows(start, end, window=SYNC_HISTORY_WINDOW):
+    """Split the days in [start, end) into consecutive windows."""
+    windows = []
+    while start < end:
+        windows.append((start, min(start + window, end)))
+        start = windows[-1][1]
+    return windows
+
+
+class HistorySync:
+    """Resync an account's check ins for a range of days.
+
+    The range is split into windows fetched concurrently, at most `limit`
+    at a time, each streamed into a batch of its own. Requests are retried
+    as usual, a window that still fails doesn't stop the others and none
+    are fetched while the circuit breaker is open. Windows are merged in
+    date order, each replacing the totals of its days, so syncing a range
+    again doesn't count anything twice.
+    """
+
+    def __init__(self, coordinator, window=SYNC_HISTORY_WINDOW,
+                 limit=SYNC_HISTORY_CONCURRENCY):
+        self.coordinator = coordinator
+        self.window = window
+        self.limit = asyncio.Semaphore(limit)
+
+    async def _async_fetch_window(self, start, end):
+        coordinator = self.coordinator
+        # the api filters in utc, ask for a day either side and keep local days
+        url = coordinator.history_url(dt.datetime.combine(start - ONE_DAY, dt.time.min),
+                                      dt.datetime.combine(end + ONE_DAY, dt.time.min))
+        batch = CheckInBatch(None, None, maxlen=coordinator.check_in_window,
+                             keep=LocalDateFilter(start, end),
+                             journal=coordinator.journal)
+
+        breaker = coordinator.breaker
+        async with self.limit:
+            if not breaker.allow():
+                raise UpdateFailed(f"API unavailable, retrying in "
+                                   f"{breaker.retry_in:.0f}s")
+            try:
+                # fetch retries the requests, the window isn't tried again
+                batch = await coordinator.async_fetch_history(url, check_ins=batch)
+            except RequestRejected:
+                raise
+            except UpdateFailed as e:
+                _LOGGER.warning(f"History from {start} to {end} failed: {e}")
+                breaker.record_failure()
+                raise
+        breaker.record_success()
+        return batch
+
+    async def async_sync(self, start, end):
+        """Sync the days in [start, end), return the number of check ins.
+
+        Raises UpdateFailed if any window still failed, after merging the
+        ones that didn't.
+        """
+        windows = history_windows(start, end, self.window)
+        await self.coordinator.async_ensure_session()
+        results = await asyncio.gather(
+            *(self._async_fetch_window(*window) for window in windows),
+            return_exceptions=True)
+
+        merged, failed = [], []
+        for (window_start, window_end), batch in zip(windows, results):
+            if isinstance(batch, BaseException):
+                failed.append(batch)
+            else:
+                merged.append((window_start, window_end, batch))
+        self.coordinator.async_merge_history(merged)
+
+        count = sum(len(batch) for _, _, batch in merged)
+        _LOGGER.debug(f"Synced {count} check ins for {self.coordinator.name} "
+                      f"in {len(merged)} of {len(windows)} windows")
+        if failed:
+            raise UpdateFailed(f"{len(failed)} of {len(windows)} history "
+                               f"windows failed, first: {failed[0]}")
+        return count
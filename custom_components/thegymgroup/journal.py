@@ -0,0 +1,383 @@
+"""Append-only on-disk journal of an account's check ins."""
+import os
+import json
+import mmap
+import bisect
+import struct
+import logging
+import threading
+import datetime as dt
+from collections import defaultdict
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.storage import STORAGE_DIR
+
+from .checkins import CheckIn
+from .const import DOMAIN
+
+_LOGGER = logging.getLogger(__name__)
+
+# local time and utc time in seconds since the epoch, duration in ms, place
+RECORD = struct.Struct("<qqII")
+# local time of each record, in the same order as the records
+INDEX = struct.Struct("<q")
+EPOCH = dt.datetime(1970, 1, 1)
+
+
+def journal_path(hass: HomeAssistant, entry_id):
+    return hass.config.path(STORAGE_DIR, f"{DOMAIN}.{entry_id}.journal")
+
+
+def remove_journal(path):
+    """Delete a journal's files, eg. when its config entry is removed."""
+    for name in (path, f"{path}.idx", f"{path}.places"):
+        try:
+            os.remove(name)
+        except FileNotFoundError:
+            pass
+
+
+def _seconds(ts):
+    return int((ts - EPOCH).total_seconds())
+
+
+def _utc_seconds(raw_date):
+    ts = dt.datetime.fromisoformat(raw_date)
+    if ts.tzinfo is not None:
+        ts = ts.astimezone(dt.timezone.utc).replace(tzinfo=None)
+    return _seconds(ts)
+
+
+class CheckInJournal:
+    """Every check in synced for an account, one fixed-width record each.
+
+    Records are only ever appended, a check in given a duration later is
+    appended again and the newest record of a check in wins. Gyms are kept
+    once in a small table of places that records point into. The local time
+    of every record is kept in a memory-mapped index, so the records of a
+    range of days are found without reading the others, with a binary
+    search while the journal is in time order. Appends grow the maps in
+    place and only check the new records are still in order. Compacting
+    drops superseded records and puts the journal back in time order.
+
+    A journal is `complete` if it was started with a sync of all history
+    and every check in since has been written. Only a complete journal can
+    stand in for the synced totals.
+
+    File access blocks, so outside of tests it runs in the executor. The
+    async methods write appends in the order they were made.
+    """
+
+    def __init__(self, hass: HomeAssistant, path):
+        self.hass = hass
+        self.path = path
+        self._lock = threading.Lock()
+        # (gym location name, address, timezone) of each place id
+        self._places = []
+        self._place_ids = {}
+        self.complete = False
+        # (places, complete) last saved
+        self._saved_meta = (0, False)
+        # completeness to go back to once records that failed are written
+        self._was_complete = False
+        self._data = self._index = None
+        self._records = self._timestamps = None
+        self._maps = []
+        self.sorted = True
+        self._pending = bytearray()
+        self._write_task = None
+
+    def open(self):
+        """Open the journal, recovering from a write cut short."""
+        with self._lock:
+            try:
+                with open(f"{self.path}.places", encoding="utf-8") as f:
+                    meta = json.load(f)
+            except FileNotFoundError:
+                meta = {}
+            self._places = [tuple(place) for place in meta.get("places", [])]
+            self._place_ids = {place: ndx for ndx, place in enumerate(self._places)}
+            self.complete = meta.get("complete", False)
+            self._saved_meta = (len(self._places), self.complete)
+
+            self._data = open(self.path, "a+b")
+            self._index = open(f"{self.path}.idx", "a+b")
+            # drop a partly written record, the index is rebuilt to match
+            count = os.fstat(self._data.fileno()).st_size // RECORD.size
+            self._data.truncate(count * RECORD.size)
+            indexed = min(os.fstat(self._index.fileno()).st_size // INDEX.size, count)
+            self._index.truncate(indexed * INDEX.size)
+            if indexed < count:
+                _LOGGER.info(f"Reindexing {count - indexed} records of {self.path}")
+                self._data.seek(indexed * RECORD.size)
+                self._write_index(self._data.read())
+            self._map()
+
+    def _save_meta(self):
+        meta = (len(self._places), self.complete)
+        if meta == self._saved_meta:
+            return
+        with open(f"{self.path}.places.tmp", "w", encoding="utf-8") as f:
+            json.dump({"complete": self.complete,
+                       "places": self._places[:meta[0]]}, f)
+        os.replace(f"{self.path}.places.tmp", f"{self.path}.places")
+        self._saved_meta = meta
+
+    def save_meta(self):
+        """Save the places and whether the journal is complete."""
+        with self._lock:
+            self._save_meta()
+
+    def reset(self):
+        """Empty the journal ahead of syncing all history into it."""
+        with self._lock:
+            self._unmap()
+            self._data.truncate(0)
+            self._index.truncate(0)
+            self.complete = True
+            self._was_complete = False
+            self._save_meta()
+            self._map()
+
+    def _write_index(self, records):
+        """Index records written to the journal, returns their local times."""
+        stamps = [local for local, _, _, _ in RECORD.iter_unpack(records)]
+        self._index.write(b"".join(INDEX.pack(local) for local in stamps))
+        self._index.flush()
+        return stamps
+
+    def _unmap(self):
+        if self._records is not None:
+            self._records.release()
+            self._timestamps.release()
+        for mapped in self._maps:
+            mapped.close()
+        self._records = self._timestamps = None
+        self._maps = []
+
+    def _view(self):
+        # the maps are writable so they can grow, the journal is only read
+        # through them
+        if self._maps:
+            records, timestamps = (memoryview(mapped).toreadonly()
+                                   for mapped in self._maps)
+        else:
+            records = timestamps = memoryview(b"")
+        self._records = records
+        self._timestamps = timestamps.cast("q")
+
+    def _remap(self):
+        self._unmap()
+        if os.fstat(self._data.fileno()).st_size:
+            # the index always has an entry for every record
+            self._maps = [mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_WRITE)
+                          for f in (self._data, self._index)]
+        self._view()
+
+    def _map(self):
+        """Map the whole journal and check whether it is in time order."""
+        self._remap()
+        timestamps = self._timestamps
+        self.sorted = all(timestamps[ndx - 1] <= timestamps[ndx]
+                          for ndx in range(1, len(timestamps)))
+
+    def _grow(self):
+        """Extend the maps over records just appended."""
+        if not self._maps:
+            self._remap()
+            return
+        self._records.release()
+        self._timestamps.release()
+        try:
+            for mapped, f in zip(self._maps, (self._data, self._index)):
+                # the file already has this size, only the map grows
+                mapped.resize(os.fstat(f.fileno()).st_size)
+        except (OSError, SystemError, TypeError):
+            # eg. no mremap on this platform
+            self._remap()
+            return
+        self._view()
+
+    def close(self):
+        with self._lock:
+            self._unmap()
+            for f in (self._data, self._index):
+                if f is not None:
+                    f.close()
+            self._data = self._index = None
+
+    def __len__(self):
+        return len(self._timestamps) if self._timestamps is not None else 0
+
+    @property
+    def newest(self):
+        """Return the local time of the newest check in, None if there isn't one."""
+        timestamps = self._timestamps
+        if not timestamps:
+            return None
+        newest = timestamps[-1] if self.sorted else max(timestamps)
+        return EPOCH + dt.timedelta(seconds=newest)
+
+    def pack(self, check_in):
+        """Return a check in's record, without writing it."""
+        place = (check_in.gym_location_name, check_in.gym_location_address,
+                 check_in.timezone)
+        place_id = self._place_ids.get(place)
+        if place_id is None:
+            place_id = self._place_ids[place] = len(self._places)
+            self._places.append(place)
+        return RECORD.pack(_seconds(check_in.check_in_date),
+                           _utc_seconds(check_in.raw_date),
+                           check_in.duration_ms, place_id)
+
+    def append(self, records):
+        """Write packed records to the end of the journal."""
+        with self._lock:
+            self._save_meta()
+            newest = self._timestamps[-1] if len(self) else None
+            self._data.write(records)
+            self._data.flush()
+            stamps = self._write_index(records)
+            if self.sorted and stamps:
+                # only the new records need checking
+                self.sorted = (newest is None or newest <= stamps[0]) and all(
+                    stamps[ndx - 1] <= stamps[ndx] for ndx in range(1, len(stamps)))
+            self._grow()
+
+    def _indices(self, start, end):
+        """Return the indices of records made in local [start, end)."""
+        timestamps = self._timestamps
+        lo = -2 ** 63 if start is None else _seconds(start)
+        hi = 2 ** 63 - 1 if end is None else _seconds(end)
+        if self.sorted:
+            return range(bisect.bisect_left(timestamps, lo),
+                         bisect.bisect_left(timestamps, hi))
+        return [ndx for ndx, ts in enumerate(timestamps) if lo <= ts < hi]
+
+    def _latest(self, start, end):
+        """Return the newest record of each check in, by (utc time, place)."""
+        latest = {}
+        for ndx in self._indices(start, end):
+            record = RECORD.unpack_from(self._records, ndx * RECORD.size)
+            latest[record[1], record[3]] = record
+        return latest
+
+    def check_ins(self, start=None, end=None):
+        """Return the check ins made in local [start, end), oldest first."""
+        with self._lock:
+            records = sorted(self._latest(start, end).values())
+            places = self._places
+        return [CheckIn((EPOCH + dt.timedelta(seconds=utc)).isoformat(),
+                        *places[place], duration_ms=duration)
+                for _, utc, duration, place in records]
+
+    def day_totals(self, start=None, end=None):
+        """Return {day: (minutes, visits)} of finished visits in local [start, end).
+
+        Only the local time and duration of each check in are kept while
+        the records are read.
+        """
+        days = defaultdict(lambda: [0, 0])
+        with self._lock:
+            for local, _, duration, _ in self._latest(start, end).values():
+                if duration > 0:
+                    day = days[(EPOCH + dt.timedelta(seconds=local)).date()]
+                    day[0] += duration / 1000 / 60
+                    day[1] += 1
+        return {day: tuple(totals) for day, totals in sorted(days.items())}
+
+    def compact(self):
+        """Drop superseded records and sort the rest by time.
+
+        Returns the number of records dropped.
+        """
+        with self._lock:
+            count = len(self)
+            latest = self._latest(None, None)
+            if self.sorted and len(latest) == count:
+                return 0
+
+            records = b"".join(RECORD.pack(*record)
+                               for record in sorted(latest.values()))
+            for name, data in ((self.path, records),
+                               (f"{self.path}.idx", b"".join(
+                                   INDEX.pack(local) for local, _, _, _
+                                   in RECORD.iter_unpack(records)))):
+                with open(f"{name}.tmp", "wb") as f:
+                    f.write(data)
+                    f.flush()
+                    os.fsync(f.fileno())
+
+            self._unmap()
+            self._data.close()
+            self._index.close()
+            os.replace(f"{self.path}.tmp", self.path)
+            os.replace(f"{self.path}.idx.tmp", f"{self.path}.idx")
+            self._data = open(self.path, "a+b")
+            self._index = open(f"{self.path}.idx", "a+b")
+            self._map()
+        return count - len(latest)
+
+    async def async_open(self):
+        await self.hass.async_add_executor_job(self.open)
+        dropped = await self.hass.async_add_executor_job(self.compact)
+        _LOGGER.debug(f"Opened {len(self)} check ins from {self.path}, "
+                      f"compacted {dropped}")
+
+    @callback
+    def async_append(self, records):
+        """Queue packed records, written in order in the background."""
+        if not records:
+            return
+        self._pending += records
+        if self._write_task is None or self._write_task.done():
+            self._write_task = self.hass.async_create_background_task(
+                self._async_write(), f"{DOMAIN} journal {self.path}")
+
+    async def _async_write(self):
+        while self._pending:
+            records = bytes(self._pending)
+            try:
+                await self.hass.async_add_executor_job(self.append, records)
+            except OSError as e:
+                # kept to be written with the next append
+                _LOGGER.warning(f"Unable to write {len(records) // RECORD.size} "
+                                f"check ins to {self.path}, retrying later: {e}")
+                if self.complete:
+                    # they would be lost with a restart, don't rely on it until then
+                    self.complete = False
+                    self._was_complete = True
+                    await self._async_save_meta()
+                return
+
+            # more may have been queued meanwhile
+            del self._pending[:len(records)]
+            if self._was_complete:
+                self.complete = True
+                self._was_complete = False
+                await self._async_save_meta()
+
+    async def _async_save_meta(self):
+        try:
+            await self.hass.async_add_executor_job(self.save_meta)
+        except OSError as e:
+            _LOGGER.warning(f"Unable to save {self.path}.places: {e}")
+
+    async def async_close(self):
+        """Finish queued writes and close the journal."""
+        if self._write_task is not None:
+            await self._write_task
+        if self._pending:
+            # a last try for any that failed
+            await self._async_write()
+        if self._data is not None:
+            await self.hass.async_add_executor_job(self.close)
+
+    def as_diagnostics(self):
+        return {
+            "records": len(self),
+            "places": len(self._places),
+            "sorted": self.sorted,
+            "complete": self.complete,
+            "pending": len(self._pending) // RECORD.size,
+        }
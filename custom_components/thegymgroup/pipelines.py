@@ -0,0 +1,156 @@
+"""Update pipelines of a The Gym Group account."""
+import asyncio
+import logging
+from abc import ABC, abstractmethod
+from types import MappingProxyType
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
+from homeassistant.util import dt as dt_util
+
+from .const import OCCUPANCY_UPDATE_INTERVAL, PROFILE_UPDATE_INTERVAL
+from .retry import RequestRejected
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class GymGroupUpdateCoordinator(DataUpdateCoordinator, ABC):
+    """One update pipeline, with its own interval, error state and entities.
+
+    The state of every entity subscribed to the pipeline is materialised
+    once per update, before the entities are told to write it.
+    """
+
+    def __init__(self, hass: HomeAssistant, logger, *, name, update_interval):
+        # entity unique id -> function computing its state, see async_update_snapshot
+        self._snapshot_sources = {}
+        self.snapshot = MappingProxyType({})
+        self.refreshed = False
+
+        super().__init__(hass, logger, name=name,
+                         update_interval=update_interval,
+                         update_method=self.async_refresh_data,
+                         # unchanged refreshes return the same data, skip listeners
+                         always_update=False)
+        self.data = {}
+
+    @callback
+    def async_add_snapshot_source(self, key, compute_state):
+        """Materialise an entity's state on every update.
+
+        Returns a callback that stops it.
+        """
+        self._snapshot_sources[key] = compute_state
+        self.snapshot = MappingProxyType({**self.snapshot,
+                                          key: compute_state(dt_util.now())})
+
+        @callback
+        def remove():
+            self._snapshot_sources.pop(key, None)
+            self.snapshot = MappingProxyType({k: v for k, v in self.snapshot.items()
+                                              if k != key})
+        return remove
+
+    @callback
+    def async_update_snapshot(self, keys=None):
+        """Compute every entity's value and attributes once for this update.
+
+        Entities only look their state up, however often it is read. With
+        `keys` only those entities are recomputed.
+        """
+        now = dt_util.now()
+        sources = self._snapshot_sources
+        snapshot = {} if keys is None else dict(self.snapshot)
+        snapshot.update((key, sources[key](now))
+                        for key in (sources if keys is None else keys)
+                        if key in sources)
+        self.snapshot = MappingProxyType(snapshot)
+
+    @callback
+    def async_update_listeners(self):
+        self.async_update_snapshot()
+        super().async_update_listeners()
+
+    async def async_refresh_data(self):
+        """Fetch the data from the device."""
+        if not self.breaker.allow():
+            raise UpdateFailed(f"API unavailable, retrying in "
+                               f"{self.breaker.retry_in:.0f}s")
+
+        try:
+            data = await self._async_refresh_data()
+        except RequestRejected:
+            raise
+        except UpdateFailed:
+            self.breaker.record_failure()
+            raise
+
+        self.breaker.record_success()
+        self.refreshed = True
+        return data
+
+    @abstractmethod
+    async def _async_refresh_data(self):
+        """Fetch the pipeline's data, failures are counted by the breaker."""
+
+
+class GymGroupOccupancyCoordinator(GymGroupUpdateCoordinator):
+    """Occupancy of the home gym and any tracked gyms, polled quickly.
+
+    Requests go through the account's session. The tracked gyms are part
+    of the data so a change to any of them reaches the listeners.
+    """
+
+    def __init__(self, hass: HomeAssistant, account,
+                 update_interval=OCCUPANCY_UPDATE_INTERVAL):
+        self.account = account
+        super().__init__(hass, _LOGGER, name=f"{account.name}_occupancy",
+                         update_interval=update_interval)
+
+    @property
+    def breaker(self):
+        # the api is shared, so is knowing it's down
+        return self.account.breaker
+
+    @property
+    def gyms(self):
+        return self.account.gyms
+
+    @property
+    def forecast(self):
+        return self.account.forecast
+
+    async def _async_refresh_data(self):
+        account = self.account
+        await account.async_ensure_session()
+
+        gym_data, _ = await asyncio.gather(
+            account.async_sync_occupancy(account.gym_id), account.async_sync_gyms())
+
+        now = dt_util.now()
+        account.schedule.add_status(now, gym_data.get("status"))
+        account.forecast.add_occupancy(now, gym_data)
+        return {**gym_data, "gyms": dict(account.gyms)}
+
+
+class GymGroupProfileCoordinator(GymGroupUpdateCoordinator):
+    """The member's profile, it rarely changes so is refreshed daily."""
+
+    def __init__(self, hass: HomeAssistant, account,
+                 update_interval=PROFILE_UPDATE_INTERVAL):
+        self.account = account
+        super().__init__(hass, _LOGGER, name=f"{account.name}_profile",
+                         update_interval=update_interval)
+
+    @property
+    def breaker(self):
+        return self.account.breaker
+
+    @property
+    def profile(self):
+        return self.data or {}
+
+    async def _async_refresh_data(self):
+        # the api only sends the profile with a login
+        await self.account.async_login()
+        return dict(self.account.profile)
@@ -0,0 +1,92 @@
+"""Retry and circuit breaker policies for API requests."""
+import time
+import random
+import logging
+from dataclasses import dataclass
+
+from homeassistant.helpers.update_coordinator import UpdateFailed
+
+from .const import (
+    RETRY_MAX_ATTEMPTS,
+    RETRY_BASE_DELAY,
+    RETRY_MAX_DELAY,
+    REQUEST_TIMEOUT,
+    BREAKER_THRESHOLD,
+    BREAKER_RESET_TIMEOUT,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+# client errors worth retrying, 401 and 403 after logging in again
+RETRY_CLIENT_STATUSES = (401, 403, 408, 429)
+
+
+def retryable(status):
+    """Whether a request that failed with a http status may succeed if retried."""
+    return status in RETRY_CLIENT_STATUSES or status >= 500
+
+
+class RequestRejected(UpdateFailed):
+    """The API refused a request, eg. 404, retrying won't help.
+
+    The API did answer, so it doesn't count towards the circuit breaker.
+    """
+
+
+@dataclass
+class RetryPolicy:
+    """How often and how quickly a failed request is retried."""
+    max_attempts: int = RETRY_MAX_ATTEMPTS
+    base_delay: float = RETRY_BASE_DELAY
+    max_delay: float = RETRY_MAX_DELAY
+    timeout: float = REQUEST_TIMEOUT
+
+    def delay(self, attempt):
+        """Seconds to wait before a retry, exponential with full jitter."""
+        return random.uniform(0, min(self.max_delay,
+                                     self.base_delay * 2 ** attempt))
+
+
+class CircuitBreaker:
+    """Stop calling the API after repeated failures.
+
+    After `threshold` failed refreshes in a row the breaker opens and calls
+    are refused until `reset_timeout` has passed. Then a single trial call is
+    let through, closing the breaker again if it succeeds.
+    """
+
+    def __init__(self, threshold=BREAKER_THRESHOLD,
+                 reset_timeout=BREAKER_RESET_TIMEOUT):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout.total_seconds()
+        self.failures = 0
+        self.opened = None
+
+    @property
+    def is_open(self):
+        return self.opened is not None
+
+    @property
+    def retry_in(self):
+        """Seconds until a trial call is allowed."""
+        if self.opened is None:
+            return 0
+        return max(0, self.opened + self.reset_timeout - time.monotonic())
+
+    def allow(self):
+        return self.retry_in == 0
+
+    def record_success(self):
+        if self.opened is not None:
+            _LOGGER.info("API recovered, closing circuit breaker")
+        self.failures = 0
+        self.opened = None
+
+    def record_failure(self):
+        self.failures += 1
+        if self.failures >= self.threshold:
+            if self.opened is None:
+                _LOGGER.warning(f"API failed {self.failures} times in a row, "
+                                f"pausing requests for {self.reset_timeout}s")
+            # a failed trial call keeps the breaker open for another period
+            self.opened = time.monotonic()
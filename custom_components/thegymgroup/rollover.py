@@ -0,0 +1,93 @@
+"""Roll windowed totals over at local period boundaries."""
+import logging
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.event import async_track_point_in_time
+from homeassistant.util import dt as dt_util
+
+from .aggregates import period_start, next_period_start
+
+_LOGGER = logging.getLogger(__name__)
+
+PERIODS = ("day", "week", "month", "year")
+
+
+class PeriodRollover:
+    """Rewrite windowed sensors when their day, week, month or year ends.
+
+    One timer per coordinator is set for the nearest local boundary that
+    any registered entity needs. When it fires only the entities whose
+    period rolled over are recomputed and written, then the next boundary
+    is scheduled.
+    """
+
+    def __init__(self, hass: HomeAssistant, update_snapshot):
+        self.hass = hass
+        self._update_snapshot = update_snapshot
+        # period -> {unique id: entity}
+        self._entities = {period: {} for period in PERIODS}
+        self._unsub = None
+        self._next = None
+        self._today = None
+
+    @callback
+    def async_add_entity(self, period, entity):
+        """Roll an entity over with its period, returns a callback to stop."""
+        key = entity.unique_id
+        self._entities[period][key] = entity
+        self._async_schedule(dt_util.now())
+
+        @callback
+        def remove():
+            self._entities[period].pop(key, None)
+            self._async_schedule(dt_util.now())
+        return remove
+
+    def next_rollover(self, now):
+        """Return when the next registered period ends, None without any."""
+        today = now.date()
+        boundaries = [next_period_start(period, today)
+                      for period, entities in self._entities.items() if entities]
+        if not boundaries:
+            return None
+        return dt_util.start_of_local_day(min(boundaries))
+
+    @callback
+    def _async_schedule(self, now):
+        when = self.next_rollover(now)
+        if when == self._next and self._unsub is not None:
+            # eg. another sensor of a period already registered
+            return
+
+        self.async_cancel()
+        if when is None:
+            return
+
+        self._next = when
+        self._today = now.date()
+        self._unsub = async_track_point_in_time(self.hass, self._async_rollover,
+                                                when)
+
+    @callback
+    def _async_rollover(self, now):
+        self._unsub = self._next = None
+        now = dt_util.as_local(now)
+        today = now.date()
+        entities = {key: entity
+                    for period, registered in self._entities.items()
+                    if period_start(period, self._today) != period_start(period,
+                                                                         today)
+                    for key, entity in registered.items()}
+
+        _LOGGER.debug(f"Rolling over {len(entities)} sensors on {today}")
+        self._update_snapshot(entities)
+        for entity in entities.values():
+            entity.async_write_state_if_changed()
+
+        self._async_schedule(now)
+
+    @callback
+    def async_cancel(self):
+        if self._unsub is not None:
+            self._unsub()
+            self._unsub = self._next = None
@@ -0,0 +1,128 @@
+"""Learned poll schedule for The Gym Group integration."""
+from array import array
+from collections import deque
+
+from .const import (
+    DEFAULT_UPDATE_INTERVAL,
+    MIN_UPDATE_INTERVAL,
+    MAX_UPDATE_INTERVAL,
+    SCHEDULE_MIN_CHECK_INS,
+    SCHEDULE_HISTORY,
+)
+
+SLOTS = 7 * 24
+
+
+def slot(ts):
+    """Index of the weekday and hour of a local time."""
+    return ts.weekday() * 24 + ts.hour
+
+
+class PollSchedule:
+    """Choose the poll interval from when the member usually visits.
+
+    Check ins are counted per weekday and hour, and the gym's status is
+    sampled per slot. Polling stretches to `max_interval` in hours the member
+    has never been in, or when the gym is closed, and tightens towards
+    `min_interval` in the hours they usually check in or out.
+    """
+
+    def __init__(self, min_interval=MIN_UPDATE_INTERVAL,
+                 max_interval=MAX_UPDATE_INTERVAL,
+                 default_interval=DEFAULT_UPDATE_INTERVAL):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.default_interval = default_interval
+        self.check_ins = array('L', [0] * SLOTS)
+        self.open = array('L', [0] * SLOTS)
+        self.closed = array('L', [0] * SLOTS)
+        self.decisions = deque(maxlen=SCHEDULE_HISTORY)
+        self.polls = 0
+        self.polled_seconds = 0
+
+    def add_check_in(self, check_in_date):
+        self.check_ins[slot(check_in_date)] += 1
+
+    def add_slots(self, slots):
+        """Count check ins already grouped by slot."""
+        for ndx, count in slots.items():
+            self.check_ins[ndx] += count
+
+    def add_status(self, now, status):
+        if status is None:
+            return
+        if status.lower() == "closed":
+            self.closed[slot(now)] += 1
+        else:
+            self.open[slot(now)] += 1
+
+    def probability(self, now, until=None):
+        """Relative chance of a check in or out from now until `until`, 0 to 1."""
+        busiest = max(self.check_ins)
+        if busiest == 0:
+            return 0
+        ndx = slot(now)
+        hours = 0
+        if until is not None:
+            hour = now.replace(minute=0, second=0, microsecond=0)
+            hours = int((until - hour).total_seconds() // 3600)
+        # members checked in last hour may be checking out in this one
+        return max(self.check_ins[(ndx + hour) % SLOTS]
+                   for hour in range(-1, hours + 1)) / busiest
+
+    def closed_now(self, now, status):
+        if status is not None:
+            return status.lower() == "closed"
+        ndx = slot(now)
+        return self.closed[ndx] > self.open[ndx]
+
+    def next_interval(self, now, status=None):
+        """Return the interval until the next poll and record why."""
+        if self.closed_now(now, status):
+            interval, reason, prob = self.max_interval, "gym closed", 0
+        elif sum(self.check_ins) < SCHEDULE_MIN_CHECK_INS:
+            interval, reason, prob = self.default_interval, "learning", None
+        else:
+            # the interval may run into a busier hour, don't poll past it
+            prob = self.probability(now, now + self.max_interval)
+            span = self.max_interval - self.min_interval
+            interval = self.max_interval - span * prob
+            reason = "learned"
+
+        self.polls += 1
+        self.polled_seconds += interval.total_seconds()
+        self.decisions.append({
+            "time": now.isoformat(),
+            "probability": prob,
+            "interval": interval.total_seconds(),
+            "reason": reason,
+        })
+        return interval
+
+    @property
+    def calls_saved(self):
+        """Polls avoided compared with polling at the default interval."""
+        default_polls = self.polled_seconds / self.default_interval.total_seconds()
+        return round(default_polls - self.polls)
+
+    def as_diagnostics(self):
+        return {
+            "min_interval": self.min_interval.total_seconds(),
+            "max_interval": self.max_interval.total_seconds(),
+            "polls": self.polls,
+            "calls_saved": self.calls_saved,
+            "check_ins": list(self.check_ins),
+            "decisions": list(self.decisions),
+        }
+
+    def as_dict(self):
+        return {
+            "check_ins": list(self.check_ins),
+            "open": list(self.open),
+            "closed": list(self.closed),
+        }
+
+    def restore(self, data):
+        for name in ("check_ins", "open", "closed"):
+            if len(values := data.get(name, ())) == SLOTS:
+                setattr(self, name, array('L', values))
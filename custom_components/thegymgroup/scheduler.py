@@ -0,0 +1,97 @@
+"""Polling scheduler shared by all The Gym Group accounts."""
+import time
+import asyncio
+import logging
+from collections import defaultdict
+
+from homeassistant.core import HomeAssistant, callback
+
+from .const import (
+    DOMAIN,
+    DATA_SCHEDULER,
+    MAX_CONCURRENT_HISTORY,
+    MAX_CONCURRENT_OCCUPANCY,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class GymGroupScheduler:
+    """Group accounts by gym so occupancy is fetched once per gym per cycle.
+
+    The first account to poll a gym in a cycle fetches its occupancy, every
+    other account using or tracking that gym is handed the same result.
+    History and occupancy fetches for all accounts share semaphores so dozens
+    of entries and gyms don't hit the API at once.
+    """
+
+    def __init__(self, hass: HomeAssistant, history_limit=MAX_CONCURRENT_HISTORY,
+                 occupancy_limit=MAX_CONCURRENT_OCCUPANCY):
+        self.hass = hass
+        self.history_limit = asyncio.Semaphore(history_limit)
+        self.occupancy_limit = asyncio.Semaphore(occupancy_limit)
+        self._coordinators = {}
+        # gym id -> (fetch time, account that fetched, shared fetch task)
+        self._occupancy = {}
+
+    def register(self, coordinator):
+        self._coordinators[coordinator.entry.entry_id] = coordinator
+
+    def unregister(self, coordinator):
+        self._coordinators.pop(coordinator.entry.entry_id, None)
+        for gym_id, (_, source, _) in list(self._occupancy.items()):
+            if source is coordinator:
+                del self._occupancy[gym_id]
+
+    @property
+    def gyms(self):
+        """Map each gym to the coordinators of accounts using or tracking it."""
+        gyms = defaultdict(list)
+        for coordinator in self._coordinators.values():
+            if gym_id := coordinator.gym_id:
+                gyms[gym_id].append(coordinator)
+            for gym_id in coordinator.tracked_gyms:
+                gyms[gym_id].append(coordinator)
+        return gyms
+
+    async def _async_fetch_occupancy(self, coordinator, gym_id):
+        async with self.occupancy_limit:
+            return await coordinator.async_fetch_occupancy(gym_id)
+
+    async def async_get_occupancy(self, coordinator, gym_id):
+        """Return occupancy for a gym, reusing this cycle's fetch if there is one."""
+        now = time.monotonic()
+        max_age = coordinator.occupancy_coordinator.update_interval.total_seconds()
+
+        fetched, source, task = self._occupancy.get(gym_id, (None, None, None))
+        # an account never reuses its own fetch from the previous cycle
+        if task is None or source is coordinator or now - fetched >= max_age or \
+                (task.done() and (task.cancelled() or task.exception())):
+            task = self.hass.async_create_task(
+                self._async_fetch_occupancy(coordinator, gym_id))
+            self._occupancy[gym_id] = (now, coordinator, task)
+            shared = False
+        else:
+            _LOGGER.debug(f"Sharing occupancy for gym {gym_id}")
+            shared = True
+
+        gym_data = await asyncio.shield(task)
+        if not shared:
+            self._fan_out(coordinator, gym_id, gym_data)
+        return dict(gym_data)
+
+    @callback
+    def _fan_out(self, source, gym_id, gym_data):
+        """Push new occupancy to every other account of the gym."""
+        for coordinator in self.gyms.get(gym_id, []):
+            if coordinator is not source:
+                coordinator.async_set_occupancy(gym_id, gym_data)
+
+
+@callback
+def async_get_scheduler(hass: HomeAssistant) -> GymGroupScheduler:
+    """Return the polling scheduler for the integration."""
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    if DATA_SCHEDULER not in domain_data:
+        domain_data[DATA_SCHEDULER] = GymGroupScheduler(hass)
+    return domain_data[DATA_SCHEDULER]
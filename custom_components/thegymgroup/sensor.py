@@ -2,10 +2,10 @@
 import logging
 import datetime as dt
 
-from homeassistant.components.sensor import SensorEntity
+from homeassistant.components.sensor import RestoreSensor
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import CONF_ID
-from homeassistant.core import HomeAssistant, Event, callback
+from homeassistant.core import HomeAssistant
 from homeassistant.helpers.update_coordinator import (
     CoordinatorEntity, DataUpdateCoordinator,
 )
@@ -16,13 +16,16 @@ from .const import (
     ACCOUNT_ENTITIES,
     WORKOUT_ENTITIES,
     GYM_ENTITIES,
-    EVENT_RESET,
+    FORECAST_ENTITIES,
+    TRACKED_GYM_ENTITIES,
+    TELEMETRY_ENTITIES,
+    SYNC_ENTITIES,
 )
-from .entity import GymGroupBaseEntity
+from .aggregates import window_period
+from .entity import GymGroupBaseEntity, GymGroupTrackedGymEntity
 
 _LOGGER = logging.getLogger(__name__)
 
-CHECK_IN_NDX = -1
 
 async def async_setup_entry(
     hass: HomeAssistant, entry: ConfigEntry, async_add_entities
@@ -32,101 +35,173 @@ async def async_setup_entry(
         DATA_COORDINATOR
     ]
     unique_id = entry.data[CONF_ID].split('@')[0]
+    # entities subscribe to the pipeline their data comes from
+    occupancy = coordinator.occupancy_coordinator
+    profile = coordinator.profile_coordinator
 
     entities = []
     for descr in ACCOUNT_ENTITIES:
         _LOGGER.debug("Registering entity: %s", descr)
-        entities.append(GymGroupMemberSensor(unique_id, coordinator, descr))
+        entities.append(GymGroupMemberSensor(unique_id, profile, descr))
 
     for descr in GYM_ENTITIES:
         _LOGGER.debug("Registering entity: %s", descr)
-        entities.append(GymGroupGymSensor(unique_id, coordinator, descr))
+        entities.append(GymGroupGymSensor(unique_id, occupancy, descr))
+
+    for gym_id in coordinator.tracked_gyms:
+        for descr in TRACKED_GYM_ENTITIES:
+            _LOGGER.debug("Registering entity for gym %s: %s", gym_id, descr)
+            entities.append(GymGroupTrackedGymSensor(unique_id, occupancy,
+                                                     descr, gym_id))
+
+    for descr in FORECAST_ENTITIES:
+        _LOGGER.debug("Registering entity: %s", descr)
+        entities.append(GymGroupForecastSensor(unique_id, occupancy, descr))
+
+    for descr in TELEMETRY_ENTITIES:
+        _LOGGER.debug("Registering entity: %s", descr)
+        entities.append(GymGroupTelemetrySensor(unique_id, coordinator, descr))
+
+    for descr in SYNC_ENTITIES:
+        _LOGGER.debug("Registering entity: %s", descr)
+        entities.append(GymGroupSyncSensor(unique_id, coordinator, descr))
 
     for descr in WORKOUT_ENTITIES:
         _LOGGER.debug("Registering entity: %s", descr)
         entities.append(GymGroupVisitSensor(unique_id, coordinator, descr))
 
-    async_add_entities(entities, update_before_add=True)
+    # don't wait on the api, entities show their restored state until it's polled
+    async_add_entities(entities)
 
     return True
 
 
-class GymGroupMemberSensor(GymGroupBaseEntity, SensorEntity):
+class GymGroupMemberSensor(GymGroupBaseEntity, RestoreSensor):
+    async def async_added_to_hass(self):
+        """Restore the last known state."""
+        await super().async_added_to_hass()
+        if (last_data := await self.async_get_last_sensor_data()) is not None:
+            self._restored_value = last_data.native_value
+
     @property
     def native_value(self):
         """Return the state of the sensor."""
-        return self.get_value(self.entity_description.path)
+        return self.restored(self.snapshot.value)
 
 
 class GymGroupGymSensor(GymGroupMemberSensor):
-    @property
-    def extra_state_attributes(self):
+    def compute_attributes(self, now):
         """Sensor attributes"""
         if not self.coordinator.data:
             return {}
 
-        attributes = super().extra_state_attributes
+        attributes = super().compute_attributes(now)
         attributes.update({
-            "location": self.coordinator.data["gymLocationName"],
+            "location": self.get_value("data/gymLocationName"),
         })
 
         return attributes
 
 
-class GymGroupVisitSensor(GymGroupMemberSensor):
+class GymGroupTrackedGymSensor(GymGroupTrackedGymEntity, GymGroupGymSensor):
+    pass
+
+
+class GymGroupForecastSensor(GymGroupMemberSensor):
+    def compile_value(self, description):
+        forecast = self.coordinator.forecast
+        if description.path == "forecastQuietest":
+            return forecast.quietest_today
+
+        hours = dt.timedelta(hours=description.index)
+        return lambda now: forecast.expected(now + hours)
+
+    @property
+    def native_unit_of_measurement(self):
+        return self.entity_description.unit_of_measurement
+
+
+class GymGroupTelemetrySensor(GymGroupMemberSensor):
+    def compile_value(self, description):
+        _, name = description.path.split('/')
+        return lambda now: self.coordinator.telemetry.summary()[name]
+
+    def compute_attributes(self, now):
+        """Per endpoint breakdown of the total"""
+        _, name = self.entity_description.path.split('/')
+        endpoints = self.coordinator.telemetry.endpoints
+        if name not in ("requests", "retries", "relogins", "bytes"):
+            return {}
+        return {endpoint: getattr(stats, name)
+                for endpoint, stats in endpoints.items()}
+
+    @property
+    def native_unit_of_measurement(self):
+        return self.entity_description.unit_of_measurement
+
+
+def synced_at(ts):
+    # the epoch stands in for never
+    return ts if ts and ts.tzinfo is not None else None
+
+
+class GymGroupSyncSensor(GymGroupMemberSensor):
     async def async_added_to_hass(self):
         """Complete the initialization."""
         await super().async_added_to_hass()
-        # register this sensor in the coordinator
-        # self.coordinator.register_entity(self.name, self.entity_id)
+        self.async_on_remove(self.coordinator.async_add_sync_entity(self))
 
-        event_to_listen = f"{self.coordinator.name}_{EVENT_RESET}"
-        self.hass.bus.async_listen(event_to_listen,
-                                   lambda event: self._handle_reset(event))
+    def compile_value(self, description):
+        return lambda now: synced_at(getattr(self.coordinator, description.path))
 
-    @callback
-    def _handle_reset(self, event: Event):
-        # write the updated state
-        self.hass.add_job(self.async_write_ha_state)
+    def compute_attributes(self, now):
+        """Sensor attributes"""
+        return {"last_updated": synced_at(self.coordinator.last_updated)}
 
-    @property
-    def native_value(self):
-        """Return the state of the sensor."""
-        check_ins =  self.coordinator.data.get("checkIns")
-        today = dt.datetime.combine(dt.date.today(), dt.time.min)
 
-        path = self.entity_description.path
-        index = self.entity_description.index
-        if path == "checkIns.duration":
-            # get last check in value
-            if check_ins:
-                return check_ins[index]["duration"]
-
-        else:
-            duration_indexes = {
-                "weeklyTotal": (today.year,
-                                dt.date.today().isocalendar().week + index),
-                "monthlyTotal": (today.year, today.month + index),
-                "monthlyVisitCount": (today.year, today.month + index),
-                "yearlyTotal": (today.year + index),
-                "yearlyVisitCount": (today.year + index),
-            }
-            index = duration_indexes[path]
-            totals = self.coordinator.data.get(path, [None])
-            return totals.get(index)
+class GymGroupVisitSensor(GymGroupMemberSensor):
+    async def async_added_to_hass(self):
+        """Complete the initialization."""
+        await super().async_added_to_hass()
+        if (window := self.entity_description.window) is not None:
+            # totals move on at the end of the day, week, month or year
+            self.async_on_remove(self.coordinator.rollover.async_add_entity(
+                window_period(window), self))
 
-    @property
-    def extra_state_attributes(self):
+    def compile_value(self, description):
+        path = description.path
+        if path == "checkIns.duration":
+            index = description.index
+
+            def last_duration(now):
+                # get last check in value
+                check_ins = self.coordinator.data.get("checkIns")
+                if check_ins:
+                    return check_ins[index].duration
+            return last_duration
+
+        window = description.window
+        field = 0 if path == "workoutMinutes" else 1
+
+        def window_total(now):
+            daily_totals = self.coordinator.data.get("dailyTotals")
+            if daily_totals is None:
+                return None
+            return daily_totals.window(window, now.date())[field]
+        return window_total
+
+    def compute_attributes(self, now):
         """Sensor attributes"""
         if not self.coordinator.data:
             return {}
 
-        attributes = super().extra_state_attributes
+        attributes = super().compute_attributes(now)
         check_ins =  self.coordinator.data.get("checkIns")
         if check_ins:
+            last_check_in = check_ins.last
             attributes.update({
-                "check_in": check_ins[CHECK_IN_NDX]["checkInDate"],
-                "location": check_ins[CHECK_IN_NDX]["gymLocationName"],
+                "check_in": last_check_in.check_in_date,
+                "location": last_check_in.gym_location_name,
             })
 
         return attributes
@@ -0,0 +1,74 @@
+"""Shared HTTP session for The Gym Group integration."""
+import logging
+
+import aiohttp
+
+from homeassistant.const import EVENT_HOMEASSISTANT_CLOSE
+from homeassistant.core import HomeAssistant, callback
+
+from .const import (
+    DOMAIN,
+    DATA_SESSION,
+    CONN_LIMIT,
+    CONN_LIMIT_PER_HOST,
+    DNS_CACHE_TTL,
+    KEEPALIVE_TIMEOUT,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class GymGroupSessionManager:
+    """Own one pooled client session shared by every config entry.
+
+    The connector keeps connections to the Netpulse host alive between polls
+    so each refresh reuses an open TLS connection instead of handshaking again.
+    Cookies are never stored on the session, each coordinator sends its own.
+    """
+
+    def __init__(self, hass: HomeAssistant):
+        self.hass = hass
+        self._session = None
+        self._entries = set()
+
+        hass.bus.async_listen_once(EVENT_HOMEASSISTANT_CLOSE, self._async_close)
+
+    def acquire(self, entry_id) -> aiohttp.ClientSession:
+        """Return the shared session, creating it for the first entry."""
+        if self._session is None or self._session.closed:
+            _LOGGER.debug("Creating pooled session")
+            connector = aiohttp.TCPConnector(
+                limit=CONN_LIMIT,
+                limit_per_host=CONN_LIMIT_PER_HOST,
+                ttl_dns_cache=DNS_CACHE_TTL,
+                keepalive_timeout=KEEPALIVE_TIMEOUT,
+                enable_cleanup_closed=True,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                cookie_jar=aiohttp.DummyCookieJar(),
+            )
+
+        self._entries.add(entry_id)
+        return self._session
+
+    async def async_release(self, entry_id):
+        """Drop an entry, closing the session once no entry uses it."""
+        self._entries.discard(entry_id)
+        if not self._entries:
+            await self._async_close()
+
+    async def _async_close(self, *args):
+        if self._session is not None and not self._session.closed:
+            _LOGGER.debug("Closing pooled session")
+            await self._session.close()
+        self._session = None
+
+
+@callback
+def async_get_session_manager(hass: HomeAssistant) -> GymGroupSessionManager:
+    """Return the session manager for the integration."""
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    if DATA_SESSION not in domain_data:
+        domain_data[DATA_SESSION] = GymGroupSessionManager(hass)
+    return domain_data[DATA_SESSION]
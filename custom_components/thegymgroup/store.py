@@ -0,0 +1,96 @@
+"""Persistent sync state for The Gym Group integration."""
+import logging
+import datetime as dt
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.storage import Store
+from homeassistant.util import dt as dt_util
+
+from .const import DOMAIN, STORAGE_VERSION, STORAGE_SAVE_DELAY
+
+_LOGGER = logging.getLogger(__name__)
+
+# totals keyed by (year, week) or (year, month) tuples
+TUPLE_TOTALS = ("weeklyTotal", "monthlyTotal", "monthlyVisitCount")
+# totals keyed by year
+YEAR_TOTALS = ("yearlyTotal", "yearlyVisitCount")
+
+
+def encode_totals(data):
+    """Convert totals dicts to json friendly string keys."""
+    totals = {}
+    for name in TUPLE_TOTALS:
+        totals[name] = {f"{k[0]}-{k[1]}": v for k, v in data.get(name, {}).items()}
+    for name in YEAR_TOTALS:
+        totals[name] = {str(k): v for k, v in data.get(name, {}).items()}
+    return totals
+
+
+def decode_totals(totals):
+    """Convert stored totals back to the keys used by the coordinator."""
+    data = {}
+    for name in TUPLE_TOTALS:
+        data[name] = {tuple(map(int, k.split('-'))): v
+                      for k, v in totals.get(name, {}).items()}
+    for name in YEAR_TOTALS:
+        data[name] = {int(k): v for k, v in totals.get(name, {}).items()}
+    return data
+
+
+def encode_dt(ts):
+    return ts.isoformat() if ts else None
+
+
+def decode_dt(ts, default=None):
+    return dt.datetime.fromisoformat(ts) if ts else default
+
+
+def migrate_check_in(check_in):
+    """Convert a v2 check in, local time and minutes, back to how the api sent it."""
+    timezone = check_in.get("timezone")
+    zone = (timezone and dt_util.get_time_zone(timezone)) or dt_util.DEFAULT_TIME_ZONE
+    local = dt.datetime.fromisoformat(check_in["checkInDate"]).replace(tzinfo=zone)
+    return {
+        **check_in,
+        "checkInDate": dt_util.as_utc(local).replace(tzinfo=None).isoformat(),
+        "duration": round(check_in.get("duration", 0) * 60 * 1000),
+    }
+
+
+class _Storage(Store):
+    async def _async_migrate_func(self, old_major_version, old_minor_version,
+                                  old_data):
+        if old_major_version < 2 and "totals" in old_data:
+            # per day totals can't be derived from v1 totals, sync from scratch
+            _LOGGER.info(f"Resyncing {self.key}, stored totals are out of date")
+            return {}
+        if old_major_version < 3 and "checkIns" in old_data:
+            old_data = {**old_data,
+                        "checkIns": list(map(migrate_check_in, old_data["checkIns"]))}
+        return old_data
+
+
+class GymGroupStore:
+    """Versioned on-disk store for an account's sync cursor and totals.
+
+    Saves are debounced so a burst of refreshes results in a single write.
+    """
+
+    def __init__(self, hass: HomeAssistant, entry_id, name=None, private=False):
+        key = f"{DOMAIN}.{entry_id}" if name is None else f"{DOMAIN}.{entry_id}.{name}"
+        self._store = _Storage(hass, STORAGE_VERSION, key, private=private)
+
+    async def async_load(self):
+        """Return the stored state, or None if nothing was saved yet."""
+        return await self._store.async_load()
+
+    @callback
+    def async_schedule_save(self, data_func):
+        """Write the state returned by data_func once saves settle."""
+        self._store.async_delay_save(data_func, STORAGE_SAVE_DELAY)
+
+    async def async_save(self, data):
+        await self._store.async_save(data)
+
+    async def async_remove(self):
+        await self._store.async_remove()
@@ -0,0 +1,77 @@
+"""Incremental parsing of large json responses."""
+import re
+import json
+import codecs
+import hashlib
+
+_DECODER = json.JSONDecoder()
+_SEPARATOR = re.compile(r'[\s,]*')
+
+
+async def async_iter_items(chunks, key):
+    """Yield the items of the array under `key` from a streamed json object.
+
+    Items are decoded one at a time as their bytes arrive, so memory is
+    bounded by the largest item rather than the whole body. Nothing is
+    yielded if the body has no such array.
+    """
+    marker = f'"{key}"'
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    buf = ""
+    in_array = False
+
+    async for chunk in chunks:
+        buf += decoder.decode(chunk)
+        if not in_array:
+            ndx = buf.find(marker)
+            if ndx < 0:
+                # the key may be split across chunks
+                buf = buf[-len(marker):]
+                continue
+            start = buf.find('[', ndx + len(marker))
+            if start < 0:
+                buf = buf[ndx:]
+                continue
+            buf = buf[start + 1:]
+            in_array = True
+
+        pos = 0
+        while True:
+            pos = _SEPARATOR.match(buf, pos).end()
+            if pos == len(buf):
+                break
+            if buf[pos] == ']':
+                return
+            try:
+                item, pos = _DECODER.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                # wait for the rest of the item
+                break
+            yield item
+        buf = buf[pos:]
+
+    if in_array:
+        raise ValueError(f"Response ended inside the {key} array")
+
+
+async def async_read_items(content, key, consume, chunk_size):
+    """Stream a response body, passing each item of an array to `consume`.
+
+    Returns the size of the body and its sha1 digest.
+    """
+    digest = hashlib.sha1()
+    size = 0
+
+    async def chunks():
+        nonlocal size
+        async for chunk in content.iter_chunked(chunk_size):
+            digest.update(chunk)
+            size += len(chunk)
+            yield chunk
+
+    async for item in async_iter_items(chunks(), key):
+        consume(item)
+    # drain anything after the array so the digest covers the whole body
+    async for _ in chunks():
+        pass
+    return size, digest.digest()
@@ -0,0 +1,94 @@
+"""Request telemetry for The Gym Group integration."""
+import bisect
+from collections import Counter
+
+from .const import TELEMETRY_LATENCY_BUCKETS
+
+
+class EndpointStats:
+    """Counters and a latency histogram for one API endpoint."""
+
+    def __init__(self, buckets=TELEMETRY_LATENCY_BUCKETS):
+        self.buckets = buckets
+        # the last bucket counts anything slower than the largest bound
+        self.latency = [0] * (len(buckets) + 1)
+        self.latency_sum = 0
+        self.requests = 0
+        self.statuses = Counter()
+        self.retries = 0
+        self.relogins = 0
+        self.bytes = 0
+
+    def record(self, status, latency, size=0):
+        self.requests += 1
+        self.statuses[str(status)] += 1
+        self.latency[bisect.bisect_left(self.buckets, latency)] += 1
+        self.latency_sum += latency
+        self.bytes += size
+
+    @property
+    def mean_latency(self):
+        return self.latency_sum / self.requests if self.requests else None
+
+    def as_dict(self):
+        return {
+            "requests": self.requests,
+            "statuses": dict(self.statuses),
+            "retries": self.retries,
+            "relogins": self.relogins,
+            "bytes": self.bytes,
+            "mean_latency": self.mean_latency,
+            "latency_histogram": {
+                **{f"le_{bound}": count
+                   for bound, count in zip(self.buckets, self.latency)},
+                "le_inf": self.latency[-1],
+            },
+        }
+
+
+class Telemetry:
+    """What an account's coordinator asks of the API and how long it takes.
+
+    Kept in memory only, counters start again from zero after a restart.
+    """
+
+    def __init__(self):
+        self.endpoints = {}
+        self.builds = 0
+        self.build_time = None
+        self.build_time_sum = 0
+
+    def endpoint(self, name):
+        if name not in self.endpoints:
+            self.endpoints[name] = EndpointStats()
+        return self.endpoints[name]
+
+    def record_build(self, seconds):
+        self.builds += 1
+        self.build_time = seconds
+        self.build_time_sum += seconds
+
+    def summary(self):
+        """Totals across every endpoint, latencies in milliseconds."""
+        stats = self.endpoints.values()
+        requests = sum(s.requests for s in stats)
+        latency_sum = sum(s.latency_sum for s in stats)
+        return {
+            "requests": requests,
+            "retries": sum(s.retries for s in stats),
+            "relogins": sum(s.relogins for s in stats),
+            "bytes": sum(s.bytes for s in stats),
+            "mean_latency": (round(latency_sum / requests * 1000, 1)
+                             if requests else None),
+            "build_time": (round(self.build_time * 1000, 2)
+                           if self.build_time is not None else None),
+        }
+
+    def as_dict(self):
+        return {
+            "summary": self.summary(),
+            "builds": self.builds,
+            "build_time_sum": self.build_time_sum,
+            "endpoints": {name: stats.as_dict()
+                          for name, stats in self.endpoints.items()},
+        }
@@ -0,0 +1,262 @@
+"""Micro-benchmarks for check in processing and sensor value resolution.
+
+Synthetic check in histories of increasing size are pushed through the
+coordinator and sensors, recording the time taken and peak memory of each.
+
+    python tests/benchmarks/bench_coordinator.py
+    python tests/benchmarks/bench_coordinator.py --sizes 1000 10000 --save
+
+Saved results are kept per integration version in `results.json` next to this
+file. Every run is compared with the saved run of its own version, or the newest
+saved run if its version has none, so regressions show up before a release.
+Each saved run records the commit it measured, a run of another commit isn't
+saved over it without `--force`, eg. a run of changes not yet released.
+
+To measure a release, point the benchmarks at a checkout of it:
+
+    git worktree add /tmp/thegymgroup-0.1.0 <release commit>
+    BENCH_CUSTOM_COMPONENTS=/tmp/thegymgroup-0.1.0/custom_components \
+        python tests/benchmarks/bench_coordinator.py --save
+"""
+import os
+import sys
+path = os.environ.get("BENCH_CUSTOM_COMPONENTS") or os.path.abspath(
+    os.path.join(os.path.abspath(__file__), '../../../custom_components'))
+sys.path.insert(0, path)
+import gc
+import json
+import time
+import random
+import argparse
+import subprocess
+import platform
+import tracemalloc
+import datetime as dt
+from unittest.mock import MagicMock
+
+from thegymgroup.const import (
+    WORKOUT_ENTITIES, GYM_ENTITIES, ACCOUNT_ENTITIES,
+)
+try:
+    from thegymgroup.checkins import CheckIn
+    parse_check_in = CheckIn.from_response
+except ImportError:
+    # releases before check ins were parsed into records
+    from thegymgroup.coordinator import set_dt as parse_check_in
+from thegymgroup.coordinator import TheGymGroupCoordinator
+from thegymgroup.sensor import (
+    GymGroupMemberSensor, GymGroupGymSensor, GymGroupVisitSensor,
+)
+
+RESULTS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results.json")
+MANIFEST = os.path.join(path, "thegymgroup", "manifest.json")
+
+DEFAULT_SIZES = (1_000, 10_000, 100_000, 1_000_000)
+# sensor properties are cheap, time enough calls to get a stable number
+SENSOR_CALLS = 10_000
+# slower than the saved run by more than this is a regression
+REGRESSION = 1.2
+
+
+def build_check_ins(size, seed=0):
+    """Return `size` raw check ins as the history endpoint sends them."""
+    rng = random.Random(seed)
+    start = dt.datetime(2008, 1, 1, 6, 0, 0)
+    gyms = [f"Gym {i}" for i in range(20)]
+    return [{'gymLocationName': rng.choice(gyms),
+             'gymLocationAddress': 'Marshall Road',
+             'checkInDate': (start + dt.timedelta(hours=3 * i)).isoformat(),
+             'timezone': 'Europe/London',
+             'duration': rng.randint(20, 120) * 60 * 1000}
+            for i in range(size)]
+
+
+def build_coordinator():
+    return TheGymGroupCoordinator(MagicMock(), MagicMock())
+
+
+def build_visit_data(size):
+    coordinator = build_coordinator()
+    visits = {'checkIns': build_check_ins(size)}
+
+    def run():
+        coordinator.build_visit_data(dt.datetime.now(dt.timezone.utc), {},
+                                     visits)
+    return run
+
+
+def parse_check_ins(size):
+    check_ins = build_check_ins(size)
+
+    def run():
+        for check_in in check_ins:
+            parse_check_in(check_in)
+    return run
+
+
+def synced_coordinator(size):
+    coordinator = build_coordinator()
+    coordinator.data = coordinator.build_visit_data(
+        dt.datetime.now(dt.timezone.utc), {}, {'checkIns': build_check_ins(size)})
+    coordinator.refreshed = True
+    return coordinator
+
+
+def add_sensor(coordinator, sensor_cls, descr):
+    """Create a sensor whose state is kept in the coordinator's snapshot."""
+    sensor = sensor_cls("account", coordinator, descr)
+    if hasattr(coordinator, "async_add_snapshot_source"):
+        coordinator.async_add_snapshot_source(sensor.unique_id,
+                                              sensor.compute_state)
+    return sensor
+
+
+def sensor_call(sensor_cls, descr, call):
+    def setup(size):
+        sensor = add_sensor(synced_coordinator(size), sensor_cls, descr)
+
+        def run():
+            for _ in range(SENSOR_CALLS):
+                call(sensor)
+        return run
+    return setup
+
+
+def update_snapshot(size):
+    coordinator = synced_coordinator(size)
+    for descr in ACCOUNT_ENTITIES:
+        add_sensor(coordinator, GymGroupMemberSensor, descr)
+    for descr in GYM_ENTITIES:
+        add_sensor(coordinator, GymGroupGymSensor, descr)
+    for descr in WORKOUT_ENTITIES:
+        add_sensor(coordinator, GymGroupVisitSensor, descr)
+
+    def run():
+        coordinator.async_update_snapshot()
+    return run
+
+
+# name -> function taking a history size, returning the code to measure
+BENCHMARKS = {
+    "build_visit_data": build_visit_data,
+    "parse_check_ins": parse_check_ins,
+    "get_value": sensor_call(GymGroupGymSensor, GYM_ENTITIES[0],
+                             lambda s: s.get_value(s.entity_description.path)),
+    "native_value": sensor_call(GymGroupVisitSensor, WORKOUT_ENTITIES[-1],
+                                lambda s: s.native_value),
+    "extra_state_attributes": sensor_call(GymGroupVisitSensor,
+                                          WORKOUT_ENTITIES[0],
+                                          lambda s: s.extra_state_attributes),
+}
+if hasattr(TheGymGroupCoordinator, "async_update_snapshot"):
+    BENCHMARKS["update_snapshot"] = update_snapshot
+
+
+def measure(setup, size):
+    """Return seconds taken and peak bytes allocated by one run."""
+    # runs mutate their input, each measurement gets its own
+    run = setup(size)
+    gc.collect()
+    started = time.perf_counter()
+    run()
+    elapsed = time.perf_counter() - started
+
+    # tracing slows everything down, so memory is measured separately
+    run = setup(size)
+    gc.collect()
+    tracemalloc.start()
+    run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def load_results():
+    if not os.path.exists(RESULTS):
+        return {}
+    with open(RESULTS) as f:
+        return json.load(f)
+
+
+def integration_version():
+    with open(MANIFEST) as f:
+        return json.load(f)["version"]
+
+
+def source_commit():
+    """Return the commit of the code being measured, None outside of git."""
+    try:
+        return subprocess.run(["git", "-C", path, "rev-parse", "--short", "HEAD"],
+                              capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def baseline_run(results, version):
+    """Return the saved run of this version, else the newest saved run."""
+    if version in results:
+        return results[version]
+    return results[list(results)[-1]] if results else None
+
+
+def report(name, size, elapsed, peak, baseline):
+    line = f"{name:<24}{size:>10,}{elapsed * 1000:>12.2f}ms{peak / 1024:>12.1f}KiB"
+    if baseline and (base := baseline["benchmarks"].get(name, {}).get(str(size))):
+        ratio = elapsed / base["time"] if base["time"] else 1
+        line += f"{ratio:>8.2f}x"
+        if ratio > REGRESSION:
+            line += "  REGRESSION"
+    print(line)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--only", nargs="+", choices=list(BENCHMARKS),
+                        default=list(BENCHMARKS))
+    parser.add_argument("--save", action="store_true",
+                        help="store the results for this version, "
+                             "eg. when measuring a release")
+    parser.add_argument("--force", action="store_true",
+                        help="save over the results of another commit")
+    args = parser.parse_args(argv)
+
+    results = load_results()
+    version = integration_version()
+    commit = source_commit()
+    saved = results.get(version)
+    if args.save and saved and saved.get("commit") != commit and not args.force:
+        parser.error(f"version {version} was measured on commit "
+                     f"{saved.get('commit')}, not {commit}, use --force to "
+                     f"replace it")
+    baseline = baseline_run(results, version)
+    if baseline:
+        print(f"Comparing with version {baseline['version']} "
+              f"({baseline.get('commit')})")
+
+    run = {
+        "version": version,
+        "commit": commit,
+        "date": dt.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "benchmarks": {},
+    }
+    for name in args.only:
+        timings = run["benchmarks"][name] = {}
+        for size in args.sizes:
+            elapsed, peak = measure(BENCHMARKS[name], size)
+            timings[str(size)] = {"time": elapsed, "peak": peak}
+            report(name, size, elapsed, peak, baseline)
+
+    if args.save:
+        # re-running a version replaces its results and moves it to the end
+        results.pop(version, None)
+        results[version] = run
+        with open(RESULTS, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Saved results for version {version}")
+
+
+if __name__ == "__main__":
+    main()
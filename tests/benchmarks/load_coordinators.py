@@ -0,0 +1,134 @@
+"""Drive many coordinators against the local Netpulse stand-in.
+
+Each coordinator logs in and refreshes its check in and occupancy pipelines
+for a number of rounds through the shared session and scheduler, like a Home
+Assistant instance with many accounts. Refresh latency percentiles, request
+counts and logins are reported at the end.
+
+    python tests/benchmarks/load_coordinators.py --coordinators 50 --rounds 5 \\
+        --latency 0.05 --jitter 0.1 --error-rate 0.05 --cookie-ttl 2
+"""
+import os
+import sys
+path = os.path.abspath(os.path.join(os.path.abspath(__file__),
+                                    '../../../custom_components'))
+sys.path.insert(0, path)
+import time
+import asyncio
+import logging
+import argparse
+import statistics
+from unittest.mock import MagicMock
+
+from homeassistant.const import CONF_ID, CONF_PASSWORD, CONF_USERNAME
+from homeassistant.exceptions import ConfigEntryAuthFailed
+from homeassistant.helpers.update_coordinator import UpdateFailed
+
+from thegymgroup.coordinator import TheGymGroupCoordinator
+from thegymgroup.retry import RetryPolicy
+from thegymgroup.scheduler import GymGroupScheduler
+from thegymgroup.session import GymGroupSessionManager
+
+from netpulse import PASSWORD, NetpulseStandIn, config_parser, config_from_args
+
+
+def build_hass():
+    hass = MagicMock()
+    hass.data = {}
+    hass.async_create_task = asyncio.ensure_future
+    return hass
+
+
+def build_entry(ndx):
+    username = f"member{ndx}@example.com"
+    entry = MagicMock()
+    entry.entry_id = f"entry{ndx}"
+    entry.data = {CONF_ID: username, CONF_USERNAME: username,
+                  CONF_PASSWORD: PASSWORD}
+    entry.options = {}
+    return entry
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    ndx = min(len(values) - 1, round(pct / 100 * (len(values) - 1)))
+    return values[ndx]
+
+
+async def async_refresh(coordinator, latencies, failures):
+    """Refresh a pipeline, check ins or occupancy, timing how long it takes."""
+    started = time.perf_counter()
+    try:
+        coordinator.data = await coordinator.async_refresh_data()
+    except (UpdateFailed, ConfigEntryAuthFailed) as e:
+        failures.append(repr(e))
+    latencies.append(time.perf_counter() - started)
+
+
+async def async_run(args):
+    server = NetpulseStandIn(config_from_args(args))
+    url = await server.async_start()
+
+    hass = build_hass()
+    sessions = GymGroupSessionManager(hass)
+    scheduler = GymGroupScheduler(hass)
+    retry = RetryPolicy(base_delay=args.retry_delay, max_delay=args.retry_delay * 4)
+
+    coordinators = []
+    for ndx in range(args.coordinators):
+        entry = build_entry(ndx)
+        coordinator = TheGymGroupCoordinator(
+            hass, entry, session=sessions.acquire(entry.entry_id),
+            scheduler=scheduler, retry=retry)
+        coordinator.base_url = url
+        scheduler.register(coordinator)
+        coordinators.append(coordinator)
+
+    latencies, failures = [], []
+    started = time.perf_counter()
+    for _ in range(args.rounds):
+        await asyncio.gather(*(async_refresh(pipeline, latencies, failures)
+                               for coordinator in coordinators
+                               for pipeline in (coordinator,
+                                                coordinator.occupancy_coordinator)))
+        if args.interval:
+            await asyncio.sleep(args.interval)
+    elapsed = time.perf_counter() - started
+
+    for coordinator in coordinators:
+        await sessions.async_release(coordinator.entry.entry_id)
+    await server.async_stop()
+
+    stats = server.stats
+    print(f"{args.coordinators} coordinators x {args.rounds} rounds "
+          f"in {elapsed:.2f}s")
+    print(f"refresh latency  p50 {percentile(latencies, 50) * 1000:.1f}ms  "
+          f"p90 {percentile(latencies, 90) * 1000:.1f}ms  "
+          f"p99 {percentile(latencies, 99) * 1000:.1f}ms  "
+          f"max {max(latencies) * 1000:.1f}ms  "
+          f"mean {statistics.mean(latencies) * 1000:.1f}ms")
+    print(f"refreshes failed {len(failures)} of {len(latencies)}")
+    print(f"logins {stats.logins}, expired cookies {stats.expired}, "
+          f"not modified {stats.not_modified}")
+    for endpoint, count in sorted(stats.requests.items()):
+        print(f"  {endpoint:<55}{count:>8} requests{stats.errors[endpoint]:>6} "
+              f"injected errors")
+
+
+def main(argv=None):
+    parser = config_parser(argparse.ArgumentParser(
+        description=__doc__.splitlines()[0]))
+    parser.add_argument("--coordinators", type=int, default=20)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--interval", type=float, default=0,
+                        help="seconds between rounds")
+    parser.add_argument("--retry-delay", type=float, default=0.1)
+    parser.add_argument("--verbose", action="store_true",
+                        help="log the integration's retries and failures")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.ERROR)
+    asyncio.run(async_run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+"""Local stand-in for the Netpulse API used by The Gym Group app.
+
+Serves the login, gym busyness and check in history endpoints with
+configurable latency, error rate, cookie lifetime and payload size, so the
+coordinator can be driven end to end without reaching
+`thegymgroup.netpulse.com`.
+
+    python tests/benchmarks/netpulse.py --port 8080 --latency 0.2 --error-rate 0.1
+"""
+import time
+import random
+import asyncio
+import hashlib
+import argparse
+import datetime as dt
+from dataclasses import dataclass, field
+from collections import Counter
+
+from aiohttp import web
+
+PASSWORD = "1234"
+
+
+@dataclass
+class NetpulseConfig:
+    """How the stand-in behaves."""
+    # seconds added to every response, plus up to `jitter` more
+    latency: float = 0
+    jitter: float = 0
+    # chance of a request failing with a 500
+    error_rate: float = 0
+    # seconds before a login cookie is refused, 0 never expires
+    cookie_ttl: float = 0
+    # check ins in each member's history
+    history_size: int = 10
+    gyms: int = 5
+    seed: int = 0
+
+
+@dataclass
+class NetpulseStats:
+    requests: Counter = field(default_factory=Counter)
+    errors: Counter = field(default_factory=Counter)
+    not_modified: int = 0
+    logins: int = 0
+    expired: int = 0
+
+
+def gym_id(ndx):
+    return f"00000000-0000-0000-0000-{ndx:012d}"
+
+
+class NetpulseStandIn:
+    """aiohttp application mimicking the endpoints the coordinator calls."""
+
+    def __init__(self, config=None):
+        self.config = config or NetpulseConfig()
+        self.stats = NetpulseStats()
+        self.rng = random.Random(self.config.seed)
+        # cookie -> (user, issued at)
+        self.sessions = {}
+        self.histories = {}
+        self.app = web.Application(middlewares=[self._middleware])
+        self.app.add_routes([
+            web.post("/np/exerciser/login", self.login),
+            web.get("/np/thegymgroup/v1.0/exerciser/{user}/gym-busyness",
+                    self.gym_busyness),
+            web.get("/np/exercisers/{user}/check-ins/history", self.history),
+        ])
+        self._runner = None
+        self.url = None
+
+    def endpoint(self, request):
+        return request.match_info.route.resource.canonical \
+            if request.match_info.route.resource else request.path
+
+    @web.middleware
+    async def _middleware(self, request, handler):
+        endpoint = self.endpoint(request)
+        self.stats.requests[endpoint] += 1
+
+        config = self.config
+        if config.latency or config.jitter:
+            await asyncio.sleep(config.latency + self.rng.uniform(0, config.jitter))
+        if self.rng.random() < config.error_rate:
+            self.stats.errors[endpoint] += 1
+            raise web.HTTPInternalServerError(text="injected failure")
+
+        return await handler(request)
+
+    def _authorise(self, request):
+        cookie = request.headers.get("cookie", "")
+        token = cookie.partition("JSESSIONID=")[2].split(";")[0]
+        user, issued = self.sessions.get(token, (None, None))
+        if user is None or user != request.match_info["user"]:
+            raise web.HTTPUnauthorized(text="not logged in")
+        if self.config.cookie_ttl and \
+                time.monotonic() - issued > self.config.cookie_ttl:
+            self.stats.expired += 1
+            raise web.HTTPUnauthorized(text="session expired")
+
+    def _json(self, request, data):
+        """Respond with json, or a 304 if the client already has it."""
+        body = web.json_response(data).body
+        etag = f'"{hashlib.sha1(body).hexdigest()}"'
+        if request.headers.get("if-none-match") == etag:
+            self.stats.not_modified += 1
+            return web.Response(status=304, headers={"ETag": etag})
+        return web.Response(body=body, content_type="application/json",
+                            headers={"ETag": etag})
+
+    def home_gym(self, username):
+        digest = hashlib.sha1(username.encode()).digest()
+        return gym_id(int.from_bytes(digest[:4], "big") % self.config.gyms)
+
+    async def login(self, request):
+        form = await request.post()
+        username = form.get("username")
+        if not username or form.get("password") != PASSWORD:
+            raise web.HTTPUnauthorized(text="invalid credentials")
+
+        self.stats.logins += 1
+        user = hashlib.sha1(username.encode()).hexdigest()
+        token = f"{user}{self.stats.logins}"
+        self.sessions[token] = (user, time.monotonic())
+
+        cookie = f"JSESSIONID={token}; Path=/np; HttpOnly"
+        if self.config.cookie_ttl:
+            cookie += f"; Max-Age={int(self.config.cookie_ttl)}"
+        return web.json_response({
+            "uuid": user,
+            "homeClubUuid": self.home_gym(username),
+            "homeClubName": "Stand-in Gym",
+            "chainName": "The Gym Group",
+            "membershipType": "Core",
+            "customInfo": {"accountStatus": "Active"},
+        }, headers={"Set-Cookie": cookie})
+
+    async def gym_busyness(self, request):
+        self._authorise(request)
+        location = request.query.get("gymLocationId", "")
+        # busyness changes every minute, like the real api
+        rng = random.Random(f"{location}{int(time.time() // 60)}")
+        return self._json(request, {
+            "gymLocationId": location,
+            "gymLocationName": f"Gym {location[-4:]}",
+            "currentCapacity": rng.randint(0, 200),
+            "currentPercentage": rng.randint(0, 100),
+            "historical": [{"hour": f"{h % 12 or 12}{'AM' if h < 12 else 'PM'}",
+                            "percentage": rng.randint(0, 100)}
+                           for h in range(0, 24, 2)],
+            "status": "open",
+        })
+
+    def _history(self, user):
+        if user not in self.histories:
+            rng = random.Random(user)
+            now = dt.datetime.now().replace(microsecond=0)
+            size = self.config.history_size
+            self.histories[user] = [
+                {"gymLocationName": f"Gym {rng.randint(0, 9999):04d}",
+                 "gymLocationAddress": "Marshall Road",
+                 "checkInDate": (now - dt.timedelta(hours=6 * (size - i)))
+                 .isoformat(),
+                 "timezone": "Europe/London",
+                 "duration": rng.randint(20, 120) * 60 * 1000}
+                for i in range(size)]
+        return self.histories[user]
+
+    async def history(self, request):
+        self._authorise(request)
+        start = request.query.get("startDate", "")
+        end = request.query.get("endDate", "9999")
+        check_ins = [c for c in self._history(request.match_info["user"])
+                     if start <= c["checkInDate"] <= end]
+        return self._json(request, {"checkIns": check_ins})
+
+    async def async_start(self, host="127.0.0.1", port=0):
+        self._runner = web.AppRunner(self.app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        port = self._runner.addresses[0][1]
+        self.url = f"http://{host}:{port}/np"
+        return self.url
+
+    async def async_stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+def config_parser(parser=None):
+    """Add the stand-in's settings to an argument parser."""
+    parser = parser or argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    defaults = NetpulseConfig()
+    parser.add_argument("--latency", type=float, default=defaults.latency)
+    parser.add_argument("--jitter", type=float, default=defaults.jitter)
+    parser.add_argument("--error-rate", type=float, default=defaults.error_rate)
+    parser.add_argument("--cookie-ttl", type=float, default=defaults.cookie_ttl)
+    parser.add_argument("--history-size", type=int, default=defaults.history_size)
+    parser.add_argument("--gyms", type=int, default=defaults.gyms)
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    return parser
+
+
+def config_from_args(args):
+    return NetpulseConfig(latency=args.latency, jitter=args.jitter,
+                          error_rate=args.error_rate, cookie_ttl=args.cookie_ttl,
+                          history_size=args.history_size, gyms=args.gyms,
+                          seed=args.seed)
+
+
+def main(argv=None):
+    parser = config_parser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    args = parser.parse_args(argv)
+
+    server = NetpulseStandIn(config_from_args(args))
+    web.run_app(server.app, host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
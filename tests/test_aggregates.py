@@ -0,0 +1,76 @@
+import os
+import sys
+path = os.path.abspath(os.path.join(os.path.abspath(__file__),
+                                    '../../custom_components'))
+sys.path.insert(0, path)
+import json
+import datetime as dt
+
+from thegymgroup.aggregates import (
+    DailyTotals, window_bounds, window_period, period_start, next_period_start,
+)
+
+
+def do_assert(v1, v2):
+    assert v1 == v2, f"{v1} does not match {v2}"
+
+
+def test_window_bounds_across_year_end():
+    today = dt.date(2025, 1, 2)
+
+    do_assert(window_bounds("this_week", today),
+              (dt.date(2024, 12, 30), dt.date(2025, 1, 6)))
+    do_assert(window_bounds("last_week", today),
+              (dt.date(2024, 12, 23), dt.date(2024, 12, 30)))
+    do_assert(window_bounds("last_month", today),
+              (dt.date(2024, 12, 1), dt.date(2025, 1, 1)))
+    do_assert(window_bounds("last_year", today),
+              (dt.date(2024, 1, 1), dt.date(2025, 1, 1)))
+    do_assert(window_bounds("rolling_7", today),
+              (dt.date(2024, 12, 27), dt.date(2025, 1, 3)))
+
+
+def test_period_boundaries():
+    # a wednesday at the end of a year
+    day = dt.date(2025, 12, 31)
+
+    do_assert(window_period("rolling_30"), "day")
+    do_assert(window_period("last_week"), "week")
+    do_assert(window_period("this_year"), "year")
+    do_assert(period_start("week", day), dt.date(2025, 12, 29))
+    do_assert(period_start("month", day), dt.date(2025, 12, 1))
+    do_assert(next_period_start("day", day), dt.date(2026, 1, 1))
+    do_assert(next_period_start("week", day), dt.date(2026, 1, 5))
+    do_assert(next_period_start("month", day), dt.date(2026, 1, 1))
+    do_assert(next_period_start("year", day), dt.date(2026, 1, 1))
+    # every window covers different days once its period has rolled over
+    for window in ("this_week", "last_month", "this_year", "rolling_7"):
+        period = window_period(window)
+        do_assert(window_bounds(window, day)
+                  != window_bounds(window, next_period_start(period, day)), True)
+
+
+def test_daily_totals():
+    totals = DailyTotals()
+    totals.add(dt.date(2024, 12, 31), 60)
+    totals.add(dt.date(2025, 1, 2), 45)
+    totals.add(dt.date(2025, 1, 2), 30)
+    # earlier than anything seen so far
+    totals.add(dt.date(2024, 11, 15), 50)
+
+    today = dt.date(2025, 1, 2)
+    do_assert(totals.window("this_week", today), (135, 3))
+    do_assert(totals.window("this_month", today), (75, 2))
+    do_assert(totals.window("last_month", today), (60, 1))
+    do_assert(totals.window("last_year", today), (110, 2))
+    do_assert(totals.window("rolling_90", today), (185, 4))
+    do_assert(totals.total(dt.date(2030, 1, 1), dt.date(2031, 1, 1)), (0, 0))
+
+    restored = DailyTotals.from_dict(json.loads(json.dumps(totals.as_dict())))
+    do_assert(restored.window("rolling_90", today), (185, 4))
+
+
+if __name__ == "__main__":
+    test_window_bounds_across_year_end()
+    test_period_boundaries()
+    test_daily_totals()
@@ -0,0 +1,89 @@
+import os
+import sys
+path = os.path.abspath(os.path.join(os.path.abspath(__file__),
+                                    '../../custom_components'))
+sys.path.insert(0, path)
+import asyncio
+import datetime as dt
+from unittest.mock import MagicMock, patch
+
+from homeassistant.util import dt as dt_util
+
+from thegymgroup.auth import GymGroupAuth, parse_cookies
+from thegymgroup.const import SESSION_LIFETIME, SESSION_MIN_LIFETIME
+
+NOW = dt.datetime(2025, 4, 3, 9, 0, 0, tzinfo=dt.timezone.utc)
+
+
+def do_assert(v1, v2):
+    assert v1 == v2, f"{v1} does not match {v2}"
+
+
+class FakeStore:
+    def __init__(self):
+        self.stored = None
+
+    async def async_load(self):
+        return self.stored
+
+    async def async_save(self, data):
+        self.stored = data
+
+
+def test_parse_cookies():
+    expires = "Thu, 03 Apr 2025 13:00:00 GMT"
+
+    # the soonest expiry of any cookie is when the session ends
+    do_assert(parse_cookies(['a=1; Max-Age=3600', f'b=2; Expires={expires}'], NOW),
+              ("a=1; b=2", NOW + dt.timedelta(hours=1)))
+    do_assert(parse_cookies([f'a=1; Expires={expires}'], NOW),
+              ("a=1", dt.datetime(2025, 4, 3, 13, 0, 0, tzinfo=dt.timezone.utc)))
+    # session cookies last a typical lifetime
+    do_assert(parse_cookies(['a=1'], NOW), ("a=1", NOW + SESSION_LIFETIME))
+
+    # a bad max-age falls back to expires, then to the typical lifetime
+    do_assert(parse_cookies([f'a=1; Max-Age=abc; Expires={expires}'], NOW)[1],
+              dt.datetime(2025, 4, 3, 13, 0, 0, tzinfo=dt.timezone.utc))
+    do_assert(parse_cookies(['a=1; Max-Age=abc'], NOW),
+              ("a=1", NOW + SESSION_LIFETIME))
+    do_assert(parse_cookies(['a=1; Max-Age=99999999999999999'], NOW),
+              ("a=1", NOW + SESSION_LIFETIME))
+    do_assert(parse_cookies(['a=1; Expires=never'], NOW),
+              ("a=1", NOW + SESSION_LIFETIME))
+
+
+def test_session_reuse():
+    auth = GymGroupAuth(MagicMock(), "entry")
+    # the cookie is a credential, it is kept out of shared storage
+    do_assert(auth.store._store._private, True)
+    do_assert(auth.store._store.key, "thegymgroup.entry.session")
+    auth.store = FakeStore()
+    do_assert(auth.valid, False)
+
+    profile = {"homeClubUuid": "gym"}
+    with patch.object(dt_util, "utcnow", lambda: NOW):
+        cookie = asyncio.run(auth.async_update(['a=1; Max-Age=3600'], profile))
+        do_assert(cookie, "a=1")
+        # logged in again ahead of expiry
+        do_assert(auth.refresh_at, NOW + dt.timedelta(minutes=30))
+        do_assert(auth.valid, True)
+
+        # a restart reuses the stored session
+        restored = GymGroupAuth(MagicMock(), "entry")
+        restored.store = auth.store
+        asyncio.run(restored.async_load())
+        do_assert((restored.cookie, restored.refresh_at, restored.profile),
+                  ("a=1", NOW + dt.timedelta(minutes=30), profile))
+        do_assert(restored.valid, True)
+
+        # short sessions aren't refreshed straight away
+        asyncio.run(auth.async_update(['a=2; Max-Age=60'], profile))
+        do_assert(auth.refresh_at, NOW + SESSION_MIN_LIFETIME)
+
+    with patch.object(dt_util, "utcnow", lambda: NOW + dt.timedelta(hours=1)):
+        do_assert(restored.valid, False)
+
+
+if __name__ == "__main__":
+    test_parse_cookies()
+    test_session_reuse()
@@ -0,0 +1,148 @@
+import os
+import sys
+path = os.path.abspath(os.path.join(os.path.abspath(__file__),
+                                    '../../custom_components'))
+sys.path.insert(0, path)
+import asyncio
+import datetime as dt
+from unittest.mock import MagicMock, patch
+
+from homeassistant.util import dt as dt_util
+
+from thegymgroup import backfill as backfill_module
+from thegymgroup.backfill import GymGroupBackfill, HourlyTotals
+from thegymgroup.checkins import LocalDateFilter
+
+LONDON = dt_util.get_time_zone("Europe/London")
+
+
+def do_assert(v1, v2):
+    assert v1 == v2, f"{v1} does not match {v2}"
+
+
+def raw(check_in_date, minutes=60):
+    return {'gymLocationName': 'London Leyton',
+            'gymLocationAddress': 'Marshall Road',
+            'checkInDate': check_in_date,
+            'timezone': 'Europe/London',
+            'duration': minutes * 60 * 1000}
+
+
+class FakeStore:
+    def __init__(self, progress=None):
+        self.progress = progress
+
+    async def async_load(self):
+        return self.progress
+
+    async def async_save(self, progress):
+        self.progress = progress
+
+
+class FakeCoordinator:
+    """Answers history requests filtered in utc, like the api."""
+
+    def __init__(self, history):
+        self.history = history
+        self.requests = []
+        self.entry = MagicMock()
+        self.account_id = "account"
+        self.name = "thegymgroup_account"
+
+    def history_url(self, start, end):
+        return start, end
+
+    async def async_fetch_history(self, url, cache_key=None, check_ins=None):
+        start, end = url
+        self.requests.append(url)
+        check_ins.reset()
+        for check_in in self.history:
+            if start <= dt.datetime.fromisoformat(check_in['checkInDate']) < end:
+                check_ins(check_in)
+        return check_ins
+
+
+def test_hourly_totals():
+    keep = LocalDateFilter(dt.date(2024, 6, 30), dt.date(2024, 7, 1))
+    # check ins kept are handed on parsed, so they are only parsed once
+    do_assert(keep(raw('2024-06-29T22:30:00')), None)
+    check_in, seen = keep(raw('2024-06-29T23:30:00'))
+    do_assert((check_in.check_in_date, seen), (dt.datetime(2024, 6, 30, 0, 30), None))
+
+    totals = HourlyTotals(keep)
+    for check_in in (raw('2024-06-29T22:30:00'), raw('2024-06-29T23:30:00'),
+                     raw('2024-06-29T23:45:00', 30), raw('2024-06-30T07:00:00', 0)):
+        totals(check_in)
+
+    # the first is still on the 29th in local time, the last hasn't finished
+    do_assert(len(totals), 3)
+    do_assert(totals.items(), [(dt.datetime(2024, 6, 30, 0, 0), [90, 2])])
+    totals.reset()
+    do_assert((len(totals), totals.items()), (0, []))
+
+
+def test_backfill():
+    added = []
+
+    def add_statistics(hass, metadata, statistics):
+        added.extend((metadata["statistic_id"], s["start"], s["state"], s["sum"])
+                     for s in statistics)
+
+    recorder = MagicMock()
+
+    async def block_till_done():
+        pass
+    recorder.async_block_till_done = block_till_done
+
+    hass = MagicMock()
+    hass.config.components = {"recorder"}
+    coordinator = FakeCoordinator([
+        # 23:30 on the 31st in local time, before the cursor
+        raw('2024-03-31T22:30:00'),
+        raw('2024-04-01T08:00:00'),
+        # just after midnight local time, on the edge of two windows
+        raw('2024-06-29T23:30:00'),
+        raw('2024-07-31T06:00:00', 30),
+        # today, may still be in progress
+        raw('2024-08-01T06:00:00', 30),
+    ])
+    obj = GymGroupBackfill(hass, coordinator)
+    obj.store = FakeStore({"cursor": "2024-04-01T00:00:00"})
+
+    def run(now):
+        with patch.object(backfill_module, "async_add_external_statistics",
+                          add_statistics), \
+                patch.object(backfill_module, "get_instance",
+                             lambda hass: recorder), \
+                patch.object(dt_util, "DEFAULT_TIME_ZONE", LONDON), \
+                patch.object(dt_util, "now", lambda: now):
+            asyncio.run(obj.async_run())
+
+    run(dt.datetime(2024, 8, 1, 12, 0, tzinfo=LONDON))
+    # 90 day windows, each asked for with a day either side
+    do_assert(coordinator.requests,
+              [(dt.datetime(2024, 3, 31), dt.datetime(2024, 7, 1)),
+               (dt.datetime(2024, 6, 29), dt.datetime(2024, 8, 2))])
+    duration = [a for a in added if a[0] == "thegymgroup:account_workout_duration"]
+    visits = [a for a in added if a[0] == "thegymgroup:account_workout_visits"]
+    do_assert([(start, state, total) for _, start, state, total in duration],
+              [(dt.datetime(2024, 4, 1, 8, tzinfo=dt.timezone.utc), 60, 60),
+               (dt.datetime(2024, 6, 29, 23, tzinfo=dt.timezone.utc), 60, 120),
+               (dt.datetime(2024, 7, 31, 6, tzinfo=dt.timezone.utc), 30, 150)])
+    do_assert([total for _, _, _, total in visits], [1, 2, 3])
+    do_assert(obj.store.progress, {"cursor": "2024-08-01T00:00:00",
+                                   "duration_sum": 150, "visits_sum": 3})
+
+    # later runs carry on from the cursor and the running sums
+    added.clear()
+    coordinator.requests.clear()
+    run(dt.datetime(2024, 8, 1, 20, 0, tzinfo=LONDON))
+    do_assert((coordinator.requests, added), ([], []))
+    run(dt.datetime(2024, 8, 2, 9, 0, tzinfo=LONDON))
+    do_assert([total for _, _, _, total in added], [180, 4])
+    do_assert(obj.store.progress["cursor"], "2024-08-02T00:00:00")
+
+
+if __name__ == "__main__":
+    test_hourly_totals()
+    test_backfill()
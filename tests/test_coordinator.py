@@ -4,16 +4,45 @@ path = os.path.abspath(os.path.join(os.path.abspath(__file__),
                                     '../../custom_components'))
 sys.path.insert(0, path)
 # import pytest
+import json
+import time
+import asyncio
 import datetime as dt
 from unittest.mock import MagicMock
 
+from homeassistant.helpers.update_coordinator import UpdateFailed
+
+from thegymgroup.const import (
+    DEFAULT_UPDATE_INTERVAL,
+    BURST_UPDATE_INTERVAL,
+    BURST_MAX_CALLS,
+    GYM_ENTITIES,
+    GYM_STATUS_ENTITIES,
+    WORKOUT_ENTITIES,
+    SYNC_ENTITIES,
+)
+from thegymgroup import rollover as rollover_module
 from thegymgroup.coordinator import TheGymGroupCoordinator
+from thegymgroup.checkins import CheckIn
+from thegymgroup.schedule import PollSchedule
+from thegymgroup.store import migrate_check_in
+from thegymgroup.forecast import OccupancyForecast
+from thegymgroup.history import HistorySync, history_windows
+from thegymgroup.retry import RequestRejected
+from thegymgroup.sensor import (
+    GymGroupGymSensor, GymGroupVisitSensor, GymGroupSyncSensor,
+)
+from thegymgroup.binary_sensor import GymGroupStatusSensor
 
 
 def do_assert(v1, v2):
     assert v1 == v2, f"{v1} does not match {v2}"
 
 
+VISITS_THIS_MONTH = next(d for d in WORKOUT_ENTITIES
+                         if d.translation_key == "workout_visits_this_month")
+
+
 # @pytest.fixture
 def coordinator():
     hass = MagicMock()
@@ -100,13 +129,681 @@ def test_build_visit_data(coordinator):
 
         check_ins = data.get('checkIns')
         if exp_duration is None:
-            do_assert(check_ins, [])
+            do_assert(len(check_ins), 0)
         else:
-            do_assert( check_ins[-1]['duration'], exp_duration)
+            do_assert( check_ins[-1].duration, exp_duration)
 
         do_assert(exp_weekly, data['weeklyTotal'])
 
 
+def test_restore_sync_state():
+    def visits():
+        return {'checkIns': [{'gymLocationName': 'London Leyton',
+                              'gymLocationAddress': 'Marshall Road',
+                              'checkInDate': '2025-04-03T07:00:00',
+                              'timezone': 'Europe/London',
+                              'duration': 4500000}]}
+
+    obj = coordinator()
+    obj.data = obj.build_visit_data(dt.datetime(2025, 4, 3, 9, 0, 0),
+                                    build_gym_data(), visits())
+
+    # stored state must survive a round trip through json
+    stored = json.loads(json.dumps(obj.as_stored()))
+    restored = coordinator()
+    restored.restore(stored)
+
+    do_assert(obj.last_sync, restored.last_sync)
+    do_assert(obj.last_check_in, restored.last_check_in)
+    for total in ('weeklyTotal', 'monthlyTotal', 'yearlyTotal',
+                  'monthlyVisitCount', 'yearlyVisitCount'):
+        do_assert(obj.data[total], restored.data[total])
+    do_assert(list(obj.data['checkIns']), list(restored.data['checkIns']))
+
+    # the same check in seen again after a restart is not counted twice
+    data = restored.build_visit_data(dt.datetime(2025, 4, 3, 9, 15, 0),
+                                     build_gym_data(), visits())
+    do_assert({(2025, 14): 75.0}, data['weeklyTotal'])
+
+
+def test_check_in_window():
+    obj = coordinator()
+    obj.check_in_window = 3
+
+    for day in range(1, 6):
+        visits = {'checkIns': [{'gymLocationName': 'London Leyton',
+                                'gymLocationAddress': 'Marshall Road',
+                                'checkInDate': f'2025-04-0{day}T07:00:00',
+                                'timezone': 'Europe/London',
+                                'duration': 3600000}]}
+        obj.data = obj.build_visit_data(dt.datetime(2025, 4, day, 9, 0, 0),
+                                        build_gym_data(), visits)
+
+    # only the newest check ins are kept, totals still count every visit
+    check_ins = obj.data['checkIns']
+    do_assert(len(check_ins), 3)
+    do_assert(check_ins.last.check_in_date.day, 5)
+    do_assert(check_ins[0].check_in_date.day, 3)
+    do_assert(obj.data['monthlyVisitCount'], {(2025, 4): 5})
+
+
+def test_check_in_local_time():
+    def raw(check_in_date):
+        return {'gymLocationName': 'London Leyton',
+                'gymLocationAddress': 'Marshall Road',
+                'checkInDate': check_in_date,
+                'timezone': 'Europe/London',
+                'duration': 4500000}
+
+    # times are sent in UTC and shown in the gym's own timezone
+    winter = CheckIn.from_response(raw('2025-01-10T07:00:00'))
+    summer = CheckIn.from_response(raw('2025-04-03T07:00:00'))
+    do_assert(winter.check_in_date, dt.datetime(2025, 1, 10, 7, 0, 0))
+    do_assert(summer.check_in_date, dt.datetime(2025, 4, 3, 8, 0, 0))
+    do_assert(summer.duration, 75)
+    do_assert(summer.as_dict(), raw('2025-04-03T07:00:00'))
+
+    # either side of the clocks changing on the same day
+    do_assert([CheckIn.from_response(raw(f'2025-03-30T0{hour}:30:00')).check_in_date
+               for hour in (0, 1)],
+              [dt.datetime(2025, 3, 30, 0, 30), dt.datetime(2025, 3, 30, 2, 30)])
+    do_assert(CheckIn.from_response(raw('2025-10-26T00:30:00+00:00')).check_in_date,
+              dt.datetime(2025, 10, 26, 1, 30))
+
+    # check ins stored by earlier versions are converted back
+    stored = {**raw('2025-04-03T08:00:00'), 'duration': 75.0}
+    do_assert(migrate_check_in(stored), raw('2025-04-03T07:00:00'))
+
+
+def test_entity_snapshot():
+    obj = coordinator()
+    obj.refreshed = True
+    today = dt.date.today()
+    visits = {'checkIns': [{'gymLocationName': 'London Leyton',
+                            'gymLocationAddress': 'Marshall Road',
+                            'checkInDate': f'{today}T07:00:00',
+                            'timezone': 'Europe/London',
+                            'duration': 3600000}]}
+    obj.data = obj.build_visit_data(dt.datetime.now(dt.timezone.utc), {}, visits)
+    occupancy = obj.occupancy_coordinator
+    occupancy.refreshed = True
+    occupancy.data = {**build_gym_data(), 'gyms': {}}
+
+    capacity = GymGroupGymSensor("account", occupancy, GYM_ENTITIES[0])
+    visits_month = GymGroupVisitSensor("account", obj, VISITS_THIS_MONTH)
+    status = GymGroupStatusSensor("account", occupancy, GYM_STATUS_ENTITIES[0])
+    for entity in (capacity, visits_month, status):
+        entity.coordinator.async_add_snapshot_source(entity.unique_id,
+                                                     entity.compute_state)
+
+    do_assert(capacity.native_value, 105)
+    do_assert(capacity.extra_state_attributes["location"], "London Leyton")
+    do_assert(visits_month.native_value, 1)
+    do_assert(visits_month.extra_state_attributes["location"], "London Leyton")
+    do_assert(status.is_on, True)
+
+    # reads return what was computed at the last update
+    occupancy.data = {**occupancy.data, 'currentCapacity': 80, 'status': 'closed'}
+    do_assert(capacity.native_value, 105)
+    occupancy.async_update_listeners()
+    do_assert(capacity.native_value, 80)
+    do_assert(status.is_on, False)
+    do_assert(capacity.snapshot is occupancy.snapshot[capacity.unique_id], True)
+    try:
+        capacity.extra_state_attributes["location"] = None
+    except TypeError:
+        pass
+    else:
+        raise AssertionError("snapshot attributes can be changed")
+
+
+def test_change_only_writes():
+    obj = coordinator()
+    obj.refreshed = True
+
+    visits_month = GymGroupVisitSensor("account", obj, VISITS_THIS_MONTH)
+    synced = GymGroupSyncSensor("account", obj, SYNC_ENTITIES[0])
+    for entity in (visits_month, synced):
+        entity.async_write_ha_state = MagicMock()
+        obj.async_add_snapshot_source(entity.unique_id, entity.compute_state)
+
+    def update(check_ins):
+        obj.data = obj.build_visit_data(dt.datetime.now(dt.timezone.utc), {},
+                                        {'checkIns': check_ins})
+        obj.async_update_snapshot()
+        for entity in (visits_month, synced):
+            entity._handle_coordinator_update()
+        return (visits_month.async_write_ha_state.call_count,
+                synced.async_write_ha_state.call_count)
+
+    do_assert(update([]), (1, 1))
+    # only the sync time moved, just the diagnostic sensor is written
+    do_assert(update([]), (1, 2))
+    do_assert(synced.native_value, obj.last_sync)
+    do_assert("last_synced" in visits_month.extra_state_attributes, False)
+    do_assert(update([{'gymLocationName': 'London Leyton',
+                       'gymLocationAddress': 'Marshall Road',
+                       'checkInDate': f'{dt.date.today()}T07:00:00',
+                       'timezone': 'Europe/London',
+                       'duration': 3600000}]), (2, 3))
+
+
+def test_period_rollover():
+    obj = coordinator()
+    timers = []
+
+    def track(hass, action, when):
+        timers.append(when)
+        return lambda: timers.remove(when)
+
+    class Entity:
+        def __init__(self, unique_id):
+            self.unique_id = unique_id
+            self.writes = 0
+            obj.async_add_snapshot_source(unique_id, lambda now: now.date())
+
+        def async_write_state_if_changed(self):
+            self.writes += 1
+
+    track_point_in_time = rollover_module.async_track_point_in_time
+    rollover_module.async_track_point_in_time = track
+    try:
+        rollover = obj.rollover
+        sunday = dt.datetime(2025, 3, 30, 12, 0, tzinfo=dt.timezone.utc)
+        rolling = Entity("rolling")
+        this_week = Entity("this_week")
+        this_month = Entity("this_month")
+        removes = [rollover.async_add_entity(period, entity)
+                   for period, entity in (("day", rolling), ("week", this_week),
+                                          ("month", this_month))]
+        rollover._async_schedule(sunday)
+
+        # one timer for the nearest boundary
+        do_assert(len(timers), 1)
+        monday = rollover.next_rollover(sunday)
+        do_assert(monday.date(), dt.date(2025, 3, 31))
+
+        def fire(when):
+            timers.remove(when)
+            rollover._async_rollover(when)
+
+        # only sensors whose period ended are recomputed and written
+        fire(monday)
+        do_assert((rolling.writes, this_week.writes, this_month.writes),
+                  (1, 1, 0))
+        do_assert(obj.snapshot["this_week"], dt.date.today())
+        do_assert(len(timers), 1)
+
+        fire(timers[0])
+        do_assert((rolling.writes, this_week.writes, this_month.writes),
+                  (2, 1, 1))
+
+        # nothing is left scheduled once the sensors are gone
+        for remove in removes:
+            remove()
+        do_assert(timers, [])
+    finally:
+        rollover_module.async_track_point_in_time = track_point_in_time
+
+
+def test_burst_polling():
+    obj = coordinator()
+
+    obj._update_burst("on")
+    do_assert(obj.update_interval, BURST_UPDATE_INTERVAL)
+
+    # give up on the burst once it has made too many calls
+    for _ in range(BURST_MAX_CALLS):
+        obj._update_burst("on")
+    do_assert(obj.update_interval, DEFAULT_UPDATE_INTERVAL)
+    obj._update_burst("on")
+    do_assert(obj.update_interval, DEFAULT_UPDATE_INTERVAL)
+
+    # checking out resets the limits for the next visit
+    obj._update_burst("off")
+    do_assert(obj.update_interval, DEFAULT_UPDATE_INTERVAL)
+    obj._update_burst("on")
+    do_assert(obj.update_interval, BURST_UPDATE_INTERVAL)
+
+
+def test_poll_schedule():
+    schedule = PollSchedule(min_interval=dt.timedelta(minutes=5),
+                            max_interval=dt.timedelta(minutes=60))
+    thursday = dt.datetime(2025, 4, 3, 7, 0, 0)
+
+    # not enough visits to go on yet
+    schedule.add_check_in(thursday)
+    do_assert(schedule.next_interval(thursday), DEFAULT_UPDATE_INTERVAL)
+
+    for week in range(1, 12):
+        schedule.add_check_in(thursday - dt.timedelta(weeks=week))
+
+    # usual check in and check out hours poll fast, others slowly
+    do_assert(schedule.next_interval(thursday), dt.timedelta(minutes=5))
+    do_assert(schedule.next_interval(thursday.replace(hour=8)),
+              dt.timedelta(minutes=5))
+    do_assert(schedule.next_interval(thursday.replace(hour=14)),
+              dt.timedelta(minutes=60))
+    do_assert(schedule.next_interval(thursday, "closed"),
+              dt.timedelta(minutes=60))
+    # an interval running into the usual hour doesn't stretch past it
+    do_assert(schedule.next_interval(thursday.replace(hour=6, minute=30)),
+              dt.timedelta(minutes=5))
+    do_assert(schedule.next_interval(thursday.replace(hour=5)),
+              dt.timedelta(minutes=60))
+    do_assert(schedule.polls, 7)
+
+
+def test_occupancy_forecast():
+    forecast = OccupancyForecast(decay=0.5)
+    thursday = dt.datetime(2025, 4, 3, 19, 30, 0)
+
+    do_assert(forecast.expected(thursday), None)
+    forecast.add_occupancy(thursday, build_gym_data())
+    # the busyness curve fills both hours of each point
+    do_assert(forecast.expected(thursday.replace(hour=20)), 68)
+    do_assert(forecast.expected(thursday.replace(hour=21)), 68)
+    # the sample is blended with the curve for the current hour
+    do_assert(forecast.expected(thursday), 44)
+    do_assert(forecast.quietest_today(thursday), thursday.replace(hour=19,
+                                                                  minute=0))
+    # the curve is only counted once a day
+    forecast.add_occupancy(thursday.replace(hour=20), build_gym_data())
+    do_assert(forecast.expected(thursday.replace(hour=20)), 56)
+    do_assert(forecast.expected(thursday + dt.timedelta(days=1)), None)
+
+    restored = OccupancyForecast()
+    restored.restore(json.loads(json.dumps(forecast.as_dict())))
+    do_assert(restored.expected(thursday.replace(hour=20)), 56)
+    do_assert(restored.historical_date, thursday.date())
+
+
+def test_unchanged_refresh():
+    obj = coordinator()
+    obj.profile = {'uuid': 'user', 'homeClubUuid': 'gym'}
+    obj.headers["cookie"] = "session"
+    # occupancy is polled by a pipeline of its own
+    responses = {
+        'history': [{'checkIns': []}, None, {'checkIns': []}],
+    }
+
+    async def fetch(url, cache_key=None, check_ins=None):
+        return responses[cache_key].pop(0)
+    obj.fetch = fetch
+
+    obj.refreshed = True
+    obj.store = MagicMock()
+    synced = GymGroupSyncSensor("account", obj, SYNC_ENTITIES[0])
+    synced.async_write_ha_state = MagicMock()
+    obj.async_add_snapshot_source(synced.unique_id, synced.compute_state)
+    obj.async_add_sync_entity(synced)
+
+    data = asyncio.run(obj.async_refresh_data())
+    obj.data = data
+    last_sync = obj.last_sync
+
+    # nothing new upstream, the same data is handed back without rebuilding
+    do_assert(asyncio.run(obj.async_refresh_data()) is data, True)
+    do_assert(obj.unchanged_cycles, 1)
+    # but it was still synced, only the sync time sensor is written
+    do_assert(obj.last_sync > last_sync, True)
+    do_assert(synced.native_value, obj.last_sync)
+    do_assert(synced.async_write_ha_state.call_count, 1)
+    do_assert(obj.store.async_schedule_save.call_count, 2)
+
+    # changed history is processed again
+    do_assert(asyncio.run(obj.async_refresh_data()) is data, False)
+    do_assert(obj.unchanged_cycles, 1)
+    do_assert(obj.refresh_cycles, 3)
+
+
+def test_occupancy_pipeline():
+    obj = coordinator()
+    obj.profile = {'uuid': 'user', 'homeClubUuid': 'gym'}
+    obj.headers["cookie"] = "session"
+    obj._tracked_gyms = ("other",)
+    occupancy = obj.occupancy_coordinator
+    responses = {
+        'occupancy/gym': [build_gym_data(), None],
+        'occupancy/other': [{**build_gym_data(), 'currentCapacity': 3}, None],
+    }
+
+    async def fetch(url, cache_key=None, check_ins=None):
+        return responses[cache_key].pop(0)
+    obj.fetch = fetch
+
+    # no check in history is fetched
+    data = asyncio.run(occupancy.async_refresh_data())
+    do_assert(data['currentCapacity'], 105)
+    do_assert(data['gyms']['other']['currentCapacity'], 3)
+    do_assert(occupancy.refreshed, True)
+    do_assert(obj.refreshed, False)
+    occupancy.data = data
+
+    # unchanged occupancy compares equal, so listeners are skipped
+    do_assert(asyncio.run(occupancy.async_refresh_data()), data)
+
+    # occupancy fetched by another account is pushed to the pipeline
+    occupancy.async_set_updated_data = MagicMock()
+    obj.async_set_occupancy("other", {**build_gym_data(), 'currentCapacity': 9})
+    pushed = occupancy.async_set_updated_data.call_args[0][0]
+    do_assert(pushed['currentCapacity'], 105)
+    do_assert(pushed['gyms']['other']['currentCapacity'], 9)
+
+    # and restored with the rest of the sync state
+    restored = TheGymGroupCoordinator(obj.hass, obj.entry, gyms=["other"])
+    restored.restore(json.loads(json.dumps(obj.as_stored(), default=str)))
+    do_assert(restored.occupancy_coordinator.data['currentCapacity'], 105)
+    do_assert(restored.occupancy_coordinator.gyms['other']['currentCapacity'], 9)
+
+
+def test_tracked_gyms():
+    hass = MagicMock()
+    entry = MagicMock()
+    gyms = [f"gym{i}" for i in range(20)]
+    obj = TheGymGroupCoordinator(hass, entry, gyms=gyms + ["gym0", "home"],
+                                 gym_fetch_timeout=0.01)
+    obj.profile = {'uuid': 'user', 'homeClubUuid': 'home'}
+
+    # duplicates and the home gym are only fetched once
+    do_assert(obj.tracked_gyms, tuple(gyms))
+
+    started, started_before_done = [], []
+
+    async def fetch_occupancy(gym_id):
+        started.append(gym_id)
+        if gym_id == "gym3":
+            # never answers
+            await asyncio.Event().wait()
+        await asyncio.sleep(0)
+        started_before_done.append(len(started))
+        return {**build_gym_data(), 'gymLocationId': gym_id}
+    obj.async_fetch_occupancy = fetch_occupancy
+
+    changed = asyncio.run(obj.async_sync_gyms())
+
+    # gyms are fetched together and the slow one doesn't hold up the rest
+    do_assert(changed, True)
+    do_assert(set(started_before_done), {20})
+    do_assert(len(obj.gyms), 19)
+    do_assert("gym3" in obj.gyms, False)
+    do_assert(obj.gyms["gym7"]["gymLocationId"], "gym7")
+
+    restored = TheGymGroupCoordinator(hass, entry, gyms=["gym7"])
+    restored.restore(json.loads(json.dumps(obj.as_stored(), default=str)))
+    do_assert(list(restored.gyms), ["gym7"])
+
+
+class FakeResponse:
+    def __init__(self, status, body=b'{}'):
+        self.status = status
+        self.body = body
+        self.headers = {}
+        self.pos = 0
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        return False
+
+    async def text(self):
+        return self.body.decode()
+
+    async def read(self):
+        return self.body
+
+    def raise_for_status(self):
+        assert self.status < 400, self.status
+
+    @property
+    def content(self):
+        return self
+
+    async def iter_chunked(self, size):
+        # a stream, reading again carries on from where it stopped
+        while self.pos < len(self.body):
+            self.pos += size
+            yield self.body[self.pos - size:self.pos]
+
+
+def test_single_login_on_expired_cookie():
+    obj = coordinator()
+    obj.hass.async_create_task = asyncio.ensure_future
+    obj.retry.base_delay = 0
+    obj.headers["cookie"] = "expired"
+    logins = []
+
+    async def login():
+        logins.append(1)
+        await asyncio.sleep(0)
+        obj.headers["cookie"] = "fresh"
+        return True
+    obj.async_login = login
+
+    session = MagicMock()
+    session.get = lambda url, headers, timeout: FakeResponse(
+        200 if headers["cookie"] == "fresh" else 401)
+    obj.session = session
+
+    async def fetch_both():
+        return await asyncio.gather(obj.fetch("one"), obj.fetch("two"))
+
+    do_assert(asyncio.run(fetch_both()), [{}, {}])
+    do_assert(len(logins), 1)
+
+    # each rejected request is retried once the single login is done
+    stats = obj.telemetry.endpoint("one")
+    do_assert((stats.requests, stats.retries), (2, 1))
+    do_assert(dict(stats.statuses), {"401": 1, "200": 1})
+    do_assert(stats.bytes, 4)
+    do_assert(obj.telemetry.endpoint("login").relogins, 1)
+    do_assert(obj.telemetry.summary()["requests"], 4)
+
+
+def test_login_updates_profile():
+    obj = coordinator()
+    obj.profile_coordinator.async_set_updated_data = MagicMock()
+    profile = {'uuid': 'user', 'homeClubUuid': 'gym'}
+    response = FakeResponse(200, json.dumps(profile).encode())
+    response.headers = MagicMock()
+    response.headers.getall.return_value = ['session=1; Max-Age=3600']
+    obj.session = MagicMock()
+    obj.session.post = lambda url, data, timeout: response
+
+    # a login after the cookie expired shows the profile it answered with
+    do_assert(asyncio.run(obj.async_login()), True)
+    do_assert(obj.headers["cookie"], "session=1")
+    do_assert(obj.profile_coordinator.async_set_updated_data.call_args[0][0], profile)
+
+
+def test_streamed_history():
+    obj = coordinator()
+    obj.profile = {'uuid': 'user', 'homeClubUuid': 'gym'}
+    obj.headers["cookie"] = "session"
+    obj.last_sync = dt.datetime(2025, 4, 3, 6, 0, 0)
+    check_ins = [{'gymLocationName': 'London Leyton',
+                  'gymLocationAddress': 'Marshall Road',
+                  'checkInDate': f'2025-04-0{day}T07:00:00',
+                  'timezone': 'Europe/London',
+                  'duration': 3600000}
+                 for day in range(1, 5)]
+    body = json.dumps({'checkIns': check_ins}).encode()
+
+    session = MagicMock()
+    session.get = lambda url, headers, timeout: FakeResponse(200, body)
+    obj.session = session
+
+    # check ins before the last sync day are dropped as they arrive
+    batch = asyncio.run(obj.fetch("history", cache_key="history",
+                                  check_ins=obj.check_in_batch()))
+    do_assert(len(batch), 2)
+    data = obj.build_visit_data(dt.datetime(2025, 4, 4, 9, 0, 0), {}, batch)
+    do_assert(data['monthlyVisitCount'], {(2025, 4): 2})
+    do_assert(data['checkIns'].last.check_in_date, dt.datetime(2025, 4, 4, 8, 0, 0))
+    do_assert(obj.telemetry.endpoint("history").bytes, len(body))
+
+    # the same body again is unchanged
+    obj.data = data
+    do_assert(asyncio.run(obj.fetch("history", cache_key="history",
+                                    check_ins=obj.check_in_batch())), None)
+
+
+def test_history_sync():
+    obj = coordinator()
+    obj.profile = {'uuid': 'user', 'homeClubUuid': 'gym'}
+    obj.headers["cookie"] = "session"
+    obj.retry.base_delay = 0
+    # a visit every other day through 2024
+    history = [{'gymLocationName': 'London Leyton',
+                'gymLocationAddress': 'Marshall Road',
+                'checkInDate': (dt.datetime(2024, 1, 1, 7) +
+                                dt.timedelta(days=2 * i)).isoformat(),
+                'timezone': 'Europe/London',
+                'duration': 3600000}
+               for i in range(183)]
+    in_flight, calls, failed = [0], [], set()
+
+    async def fetch_history(url, cache_key=None, check_ins=None):
+        query = dict(part.split('=') for part in url.split('?')[1].split('&'))
+        calls.append(query['startDate'])
+        in_flight[0] += 1
+        calls.append(in_flight[0])
+        await asyncio.sleep(0.01)
+        in_flight[0] -= 1
+        # the window from march is asked for from the day before
+        if query['startDate'] == '2024-02-29T00:00:00' and not failed:
+            failed.add(url)
+            raise UpdateFailed("timed out")
+        check_ins.reset()
+        check_ins.extend(c for c in history
+                         if query['startDate'] <= c['checkInDate'] <= query['endDate'])
+        return check_ins
+    obj.async_fetch_history = fetch_history
+
+    do_assert(history_windows(dt.date(2024, 1, 1), dt.date(2024, 3, 1),
+                              dt.timedelta(days=30)),
+              [(dt.date(2024, 1, 1), dt.date(2024, 1, 31)),
+               (dt.date(2024, 1, 31), dt.date(2024, 3, 1))])
+
+    sync = HistorySync(obj, window=dt.timedelta(days=30), limit=3)
+    try:
+        asyncio.run(sync.async_sync(dt.date(2024, 1, 1), dt.date(2025, 1, 1)))
+    except UpdateFailed as e:
+        do_assert("1 of 13 history windows failed" in str(e), True)
+    # windows are fetched together, within the limit, each once
+    do_assert(max(c for c in calls if isinstance(c, int)), 3)
+    do_assert(len([c for c in calls if isinstance(c, str)]), 13)
+    do_assert(len(failed), 1)
+    # the others are kept, 15 visits in march are still missing
+    do_assert(obj.data['yearlyVisitCount'], {2024: 168})
+
+    count = asyncio.run(sync.async_sync(dt.date(2024, 3, 1), dt.date(2024, 3, 31)))
+    do_assert(count, 15)
+    do_assert(obj.data['yearlyVisitCount'], {2024: 183})
+    do_assert(obj.data['monthlyVisitCount'][(2024, 2)], 14)
+    do_assert(obj.data['dailyTotals'].window("this_year", dt.date(2024, 6, 1)),
+              (183 * 60, 183))
+    do_assert(obj.data['checkIns'].last.check_in_date.date(),
+              dt.date(2024, 12, 30))
+
+    # syncing part of it again replaces those days rather than adding to them
+    history = [c for c in history if not c['checkInDate'].startswith('2024-02')]
+    asyncio.run(HistorySync(obj).async_sync(dt.date(2024, 2, 1),
+                                            dt.date(2024, 3, 1)))
+    do_assert(obj.data['yearlyVisitCount'], {2024: 169})
+    do_assert(obj.data['monthlyVisitCount'][(2024, 2)], 0)
+    do_assert(obj.data['yearlyTotal'], {2024: 169 * 60})
+
+    # no windows are fetched while the api is down
+    calls.clear()
+    obj.breaker.opened = time.monotonic()
+    try:
+        asyncio.run(HistorySync(obj).async_sync(dt.date(2024, 2, 1),
+                                                dt.date(2024, 3, 1)))
+    except UpdateFailed as e:
+        do_assert("API unavailable" in str(e), True)
+    do_assert(calls, [])
+
+
+def test_circuit_breaker():
+    obj = coordinator()
+    obj.profile = {'uuid': 'user', 'homeClubUuid': 'gym'}
+    obj.headers["cookie"] = "session"
+    calls = []
+
+    async def fetch(url, cache_key=None, check_ins=None):
+        calls.append(url)
+        raise UpdateFailed("down")
+    obj.fetch = fetch
+
+    for _ in range(obj.breaker.threshold):
+        try:
+            asyncio.run(obj.async_refresh_data())
+        except UpdateFailed:
+            pass
+    made = len(calls)
+
+    # open breaker fails fast without calling the API
+    try:
+        asyncio.run(obj.async_refresh_data())
+    except UpdateFailed as e:
+        do_assert("API unavailable" in str(e), True)
+    do_assert(len(calls), made)
+
+
+def test_client_errors_not_retried():
+    obj = coordinator()
+    obj.retry.base_delay = 0
+    obj.profile = {'uuid': 'user', 'homeClubUuid': 'gym'}
+    obj.headers["cookie"] = "session"
+    statuses = []
+
+    def get(url, headers, timeout):
+        statuses.append(status)
+        return FakeResponse(status)
+    obj.session = MagicMock()
+    obj.session.get = get
+
+    # the server is struggling, it may answer a retry
+    for status in (503, 429):
+        statuses.clear()
+        try:
+            asyncio.run(obj.fetch("history"))
+        except UpdateFailed:
+            pass
+        do_assert(len(statuses), obj.retry.max_attempts)
+
+    # a request the api rejects fails straight away
+    status = 404
+    statuses.clear()
+    try:
+        asyncio.run(obj.async_refresh_data())
+    except RequestRejected as e:
+        do_assert("404" in str(e), True)
+    do_assert(statuses, [404])
+    # the api answered, it isn't down
+    do_assert(obj.breaker.failures, 0)
+
+
 if __name__ == "__main__":
     obj = coordinator()
     test_build_visit_data(obj)
+    test_restore_sync_state()
+    test_check_in_window()
+    test_check_in_local_time()
+    test_entity_snapshot()
+    test_change_only_writes()
+    test_period_rollover()
+    test_burst_polling()
+    test_poll_schedule()
+    test_occupancy_forecast()
+    test_unchanged_refresh()
+    test_occupancy_pipeline()
+    test_tracked_gyms()
+    test_single_login_on_expired_cookie()
+    test_login_updates_profile()
+    test_streamed_history()
+    test_history_sync()
+    test_circuit_breaker()
+    test_client_errors_not_retried()
@@ -0,0 +1,73 @@
+import os
+import sys
+path = os.path.abspath(os.path.join(os.path.abspath(__file__),
+                                    '../../custom_components'))
+sys.path.insert(0, path)
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import thegymgroup
+
+
+def do_assert(v1, v2):
+    assert v1 == v2, f"{v1} does not match {v2}"
+
+
+def test_migrate_unique_ids():
+    entities = [SimpleNamespace(entity_id="sensor.gym_capacity",
+                                unique_id="thegymgroup_gym_capacity"),
+                SimpleNamespace(entity_id="sensor.visits",
+                                unique_id="member_workout_visits")]
+    migrated = {}
+
+    async def migrate_entries(hass, entry_id, migrate):
+        for entity in entities:
+            if (updates := migrate(entity)) is not None:
+                migrated[entity.entity_id] = updates["new_unique_id"]
+
+    entry = MagicMock()
+    with patch.object(thegymgroup.er, "async_migrate_entries", migrate_entries):
+        asyncio.run(thegymgroup._async_migrate_unique_ids(MagicMock(), entry,
+                                                          "member"))
+
+    # entities on the shared prefix move to the account, others are left
+    do_assert(migrated, {"sensor.gym_capacity": "member_gym_capacity"})
+
+
+def test_backfill_after_failed_start():
+    coordinator = MagicMock()
+    coordinator.last_update_success = False
+    listeners = []
+
+    async def async_start():
+        pass
+    coordinator.async_start = async_start
+
+    def add_listener(listener):
+        listeners.append(listener)
+        return lambda: listeners.remove(listener)
+    coordinator.async_add_listener = add_listener
+
+    backfill = MagicMock()
+    with patch.object(thegymgroup, "GymGroupBackfill", backfill):
+        asyncio.run(thegymgroup._async_start(MagicMock(), coordinator))
+        # no backfill while the api is unreachable
+        do_assert(backfill.call_count, 0)
+        listeners[0]()
+        do_assert(backfill.call_count, 0)
+
+        # it starts with the first refresh that succeeds, once
+        coordinator.last_update_success = True
+        listeners[0]()
+        do_assert((backfill.call_count, listeners), (1, []))
+        started = coordinator.entry.async_create_background_task.call_args[0][1]
+        do_assert(started, backfill.return_value.async_run.return_value)
+
+    # removing it on unload after that does nothing
+    coordinator.entry.async_on_unload.call_args[0][0]()
+
+
+if __name__ == "__main__":
+    test_migrate_unique_ids()
+    test_backfill_after_failed_start()
@@ -0,0 +1,177 @@
+import os
+import sys
+path = os.path.abspath(os.path.join(os.path.abspath(__file__),
+                                    '../../custom_components'))
+sys.path.insert(0, path)
+import asyncio
+import tempfile
+import datetime as dt
+from unittest.mock import MagicMock
+
+from thegymgroup.checkins import CheckInBatch
+from thegymgroup.coordinator import TheGymGroupCoordinator
+from thegymgroup.journal import CheckInJournal, RECORD, remove_journal
+
+
+def do_assert(v1, v2):
+    assert v1 == v2, f"{v1} does not match {v2}"
+
+
+def raw(check_in_date, duration=3600000, gym='London Leyton'):
+    return {'gymLocationName': gym,
+            'gymLocationAddress': 'Marshall Road',
+            'checkInDate': check_in_date,
+            'timezone': 'Europe/London',
+            'duration': duration}
+
+
+def journal_records(journal, check_ins):
+    batch = CheckInBatch(None, dt.datetime(1970, 1, 1), journal=journal)
+    batch.extend(check_ins)
+    return bytes(batch.records)
+
+
+def test_journal_ranges():
+    with tempfile.TemporaryDirectory() as tmp:
+        journal = CheckInJournal(None, os.path.join(tmp, "journal"))
+        journal.open()
+        journal.append(journal_records(journal, [
+            raw('2025-03-31T07:00:00'),
+            raw('2025-04-01T07:00:00', gym='London Bow'),
+            # still at the gym, then checked out
+            raw('2025-04-03T07:00:00', duration=0),
+        ]))
+        maps = list(journal._maps)
+        journal.append(journal_records(journal, [
+            raw('2025-04-03T07:00:00', duration=4500000)]))
+
+        # appending grows the maps already open
+        do_assert(journal._maps, maps)
+        do_assert(len(journal), 4)
+        do_assert(journal.sorted, True)
+        # times are indexed in the gym's local time
+        april = journal.check_ins(dt.datetime(2025, 4, 1), dt.datetime(2025, 5, 1))
+        do_assert([c.check_in_date for c in april],
+                  [dt.datetime(2025, 4, 1, 8), dt.datetime(2025, 4, 3, 8)])
+        do_assert(april[0].gym_location_name, 'London Bow')
+        do_assert(april[1].duration, 75)
+        do_assert(journal.day_totals(), {dt.date(2025, 3, 31): (60, 1),
+                                         dt.date(2025, 4, 1): (60, 1),
+                                         dt.date(2025, 4, 3): (75, 1)})
+
+        # a resync of an older day leaves the journal out of order
+        journal.append(journal_records(journal, [raw('2025-03-20T07:00:00')]))
+        do_assert(journal.sorted, False)
+        do_assert(journal.newest, dt.datetime(2025, 4, 3, 8))
+        do_assert(len(journal.check_ins(end=dt.datetime(2025, 4, 1))), 2)
+
+        # compacting drops the superseded check in and sorts the rest
+        do_assert(journal.compact(), 1)
+        do_assert((len(journal), journal.sorted), (4, True))
+        do_assert(journal.compact(), 0)
+        journal.close()
+
+        # places and records are read back, a torn write is dropped
+        with open(journal.path, "ab") as f:
+            f.write(RECORD.pack(0, 0, 0, 0)[:10])
+        journal = CheckInJournal(None, journal.path)
+        journal.open()
+        do_assert(len(journal), 4)
+        do_assert(journal.check_ins()[0].as_dict(), raw('2025-03-20T07:00:00'))
+        journal.close()
+
+        remove_journal(journal.path)
+        do_assert(os.listdir(tmp), [])
+
+
+def test_rebuild_totals():
+    async def executor_job(func, *args):
+        return func(*args)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        hass = MagicMock()
+        hass.async_add_executor_job = executor_job
+        journal = CheckInJournal(hass, os.path.join(tmp, "journal"))
+        journal.open()
+        journal.append(journal_records(journal, [
+            raw(f'2025-04-0{day}T07:00:00') for day in range(1, 6)]))
+
+        # the stored state was lost, the journal still has every visit
+        obj = TheGymGroupCoordinator(hass, MagicMock(), journal=journal)
+        asyncio.run(obj.async_rebuild_totals())
+        do_assert(obj.data['monthlyVisitCount'], {(2025, 4): 5})
+        do_assert(obj.data['monthlyTotal'], {(2025, 4): 300})
+        do_assert(obj.data['dailyTotals'].total(dt.date(2025, 4, 1),
+                                                dt.date(2025, 4, 6)), (300, 5))
+        # only the newest day is loaded, history is fetched again from it
+        do_assert(len(obj.data['checkIns']), 1)
+        do_assert(obj.last_sync, dt.datetime(2025, 4, 5))
+
+        # check ins already journaled are not counted again
+        data = obj.build_visit_data(dt.datetime(2025, 4, 5, 9, 0, 0), {},
+                                    {'checkIns': [raw('2025-04-05T07:00:00')]})
+        do_assert(data['monthlyVisitCount'], {(2025, 4): 5})
+        journal.close()
+
+
+def test_failed_writes():
+    async def executor_job(func, *args):
+        return func(*args)
+
+    async def run(tmp):
+        hass = MagicMock()
+        hass.async_add_executor_job = executor_job
+        hass.async_create_background_task = lambda coro, name: \
+            asyncio.ensure_future(coro)
+        journal = CheckInJournal(hass, os.path.join(tmp, "journal"))
+        journal.open()
+        journal.reset()
+        do_assert(journal.complete, True)
+
+        append = journal.append
+
+        def disk_full(records):
+            raise OSError("No space left on device")
+        journal.append = disk_full
+        journal.async_append(journal_records(journal, [raw('2025-04-01T07:00:00')]))
+        await journal._write_task
+
+        # the records are kept, but a restart now would lose them
+        do_assert((len(journal), journal._pending != b""), (0, True))
+        do_assert(journal.complete, False)
+        reopened = CheckInJournal(hass, journal.path)
+        reopened.open()
+        do_assert(reopened.complete, False)
+        reopened.close()
+
+        # they are written with the next append
+        journal.append = append
+        journal.async_append(journal_records(journal, [raw('2025-04-02T07:00:00')]))
+        await journal._write_task
+        do_assert((len(journal), journal.complete), (2, True))
+        await journal.async_close()
+
+        reopened = CheckInJournal(hass, journal.path)
+        reopened.open()
+        do_assert((len(reopened), reopened.complete), (2, True))
+        reopened.close()
+
+        # an incomplete journal is emptied and synced again from scratch
+        reopened.open()
+        reopened.complete = False
+        reopened.save_meta()
+        reopened.close()
+        obj = TheGymGroupCoordinator(hass, MagicMock(), journal=reopened)
+        await obj.async_restore()
+        do_assert((obj.data, len(reopened), reopened.complete), ({}, 0, True))
+        do_assert(obj.last_sync, dt.datetime(1970, 1, 1))
+        reopened.close()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(run(tmp))
+
+
+if __name__ == "__main__":
+    test_journal_ranges()
+    test_rebuild_totals()
+    test_failed_writes()
@@ -0,0 +1,70 @@
+import os
+import sys
+path = os.path.abspath(os.path.join(os.path.abspath(__file__),
+                                    '../../custom_components'))
+sys.path.insert(0, path)
+import asyncio
+from unittest.mock import MagicMock
+
+from homeassistant.const import CONF_ID
+
+from thegymgroup.coordinator import TheGymGroupCoordinator
+from thegymgroup.scheduler import GymGroupScheduler
+
+
+def do_assert(v1, v2):
+    assert v1 == v2, f"{v1} does not match {v2}"
+
+
+def account(hass, scheduler, name, fetches):
+    entry = MagicMock()
+    entry.entry_id = name
+    entry.data = {CONF_ID: f"{name}@example.com"}
+    coordinator = TheGymGroupCoordinator(hass, entry, scheduler=scheduler)
+    coordinator.profile = {'uuid': name, 'homeClubUuid': 'leyton'}
+    coordinator.occupancy_coordinator.async_set_updated_data = MagicMock()
+
+    async def fetch_occupancy(gym_id):
+        fetches.append((name, gym_id))
+        await asyncio.sleep(0)
+        return {'gymLocationId': gym_id, 'currentCapacity': len(fetches)}
+    coordinator.async_fetch_occupancy = fetch_occupancy
+    scheduler.register(coordinator)
+    return coordinator
+
+
+def test_shared_occupancy():
+    async def run():
+        hass = MagicMock()
+        hass.async_create_task = asyncio.ensure_future
+        scheduler = GymGroupScheduler(hass)
+        fetches = []
+        one = account(hass, scheduler, "one", fetches)
+        two = account(hass, scheduler, "two", fetches)
+        do_assert(list(scheduler.gyms), ["leyton"])
+
+        # accounts at the same gym polling together share one fetch
+        both = await asyncio.gather(one.async_sync_occupancy("leyton"),
+                                    two.async_sync_occupancy("leyton"))
+        do_assert(fetches, [("one", "leyton")])
+        do_assert(both[0], both[1])
+        # and the other account is handed it without polling
+        pushed = two.occupancy_coordinator.async_set_updated_data.call_args[0][0]
+        do_assert(pushed['currentCapacity'], 1)
+
+        # polling within the cycle reuses the other account's fetch
+        await two.async_sync_occupancy("leyton")
+        do_assert(len(fetches), 1)
+        # an account never reuses its own fetch
+        await one.async_sync_occupancy("leyton")
+        do_assert(fetches, [("one", "leyton"), ("one", "leyton")])
+
+        # the fetch of an account that is removed isn't handed out
+        scheduler.unregister(one)
+        await two.async_sync_occupancy("leyton")
+        do_assert(fetches[-1], ("two", "leyton"))
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    test_shared_occupancy()
@@ -0,0 +1,73 @@
+import os
+import sys
+path = os.path.abspath(os.path.join(os.path.abspath(__file__),
+                                    '../../custom_components'))
+sys.path.insert(0, path)
+import json
+import asyncio
+import hashlib
+
+from thegymgroup.stream import async_iter_items, async_read_items
+
+
+def do_assert(v1, v2):
+    assert v1 == v2, f"{v1} does not match {v2}"
+
+
+class FakeContent:
+    def __init__(self, body):
+        self.body = body
+        self.pos = 0
+
+    async def iter_chunked(self, size):
+        while self.pos < len(self.body):
+            chunk = self.body[self.pos:self.pos + size]
+            self.pos += size
+            yield chunk
+
+
+def build_body():
+    check_ins = [{'gymLocationName': 'London Leyton £',
+                  'checkInDate': f'2025-04-0{day}T07:00:00',
+                  'duration': day * 60000}
+                 for day in range(1, 8)]
+    return check_ins, json.dumps({'checkIns': check_ins, 'total': 7},
+                                 ensure_ascii=False).encode()
+
+
+def test_iter_items():
+    check_ins, body = build_body()
+
+    async def collect(chunk_size):
+        content = FakeContent(body)
+        return [item async for item in
+                async_iter_items(content.iter_chunked(chunk_size), "checkIns")]
+
+    # items split across chunks, even mid character, are put back together
+    for chunk_size in (1, 3, 64, len(body)):
+        do_assert(asyncio.run(collect(chunk_size)), check_ins)
+
+
+def test_read_items():
+    check_ins, body = build_body()
+
+    items = []
+    size, digest = asyncio.run(async_read_items(
+        FakeContent(body), "checkIns", items.append, 16))
+    do_assert(items, check_ins)
+    do_assert(size, len(body))
+    do_assert(digest, hashlib.sha1(body).digest())
+
+    # a body cut off inside the array is an error
+    try:
+        asyncio.run(async_read_items(FakeContent(body[:50]), "checkIns",
+                                     items.append, 16))
+    except ValueError:
+        pass
+    else:
+        assert False, "truncated body was accepted"
+
+
+if __name__ == "__main__":
+    test_iter_items()
+    test_read_items()